@@ -1,7 +1,5 @@
 from datetime import datetime, timedelta
 from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
 import os
 from dotenv import load_dotenv
 
@@ -11,9 +9,18 @@ load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secure-secret-key-here-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "1440"))  # 24 hours
+PROFILING_TOKEN_EXPIRE_MINUTES = int(os.getenv("PROFILING_TOKEN_EXPIRE_MINUTES", "30"))
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing context; jose and passlib are imported on first use to keep them off startup
+_pwd_context = None
+
+def get_pwd_context():
+    """Return the bcrypt hashing context, creating it on first use"""
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
@@ -26,7 +33,7 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     Returns:
         True if password matches, False otherwise
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     """
@@ -38,7 +45,7 @@ def get_password_hash(password: str) -> str:
     Returns:
         The hashed password
     """
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """
@@ -51,6 +58,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     Returns:
         The encoded JWT token
     """
+    from jose import jwt
+    
     to_encode = data.copy()
     
     if expires_delta:
@@ -76,6 +85,8 @@ def verify_token(token: str) -> Optional[str]:
     Returns:
         The email (sub) from the token if valid, None otherwise
     """
+    from jose import JWTError, jwt
+    
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
@@ -87,3 +98,47 @@ def verify_token(token: str) -> Optional[str]:
         return email
     except JWTError:
         return None
+
+def create_profiling_token(email: str, expires_delta: Optional[timedelta] = None) -> str:
+    """
+    Create a short-lived token that enables request profiling
+    
+    Profiling tokens carry their own type, so they can't be used to
+    authenticate API calls and access tokens can't trigger profiling.
+    
+    Args:
+        email: The admin requesting the token
+        expires_delta: Optional custom expiration time
+        
+    Returns:
+        The encoded JWT token
+    """
+    from jose import jwt
+    
+    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=PROFILING_TOKEN_EXPIRE_MINUTES))
+    return jwt.encode(
+        {"sub": email, "exp": expire, "iat": datetime.utcnow(), "type": "profiling"},
+        SECRET_KEY,
+        algorithm=ALGORITHM,
+    )
+
+def verify_profiling_token(token: str) -> Optional[str]:
+    """
+    Verify a profiling token
+    
+    Args:
+        token: The JWT token to verify
+        
+    Returns:
+        The admin email (sub) from the token if valid, None otherwise
+    """
+    from jose import JWTError, jwt
+    
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    if payload.get("type") != "profiling":
+        return None
+    return payload.get("sub")
+
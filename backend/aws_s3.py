@@ -2,16 +2,25 @@
 AWS S3 integration for video and file uploads
 """
 
-import boto3
 from botocore.exceptions import ClientError
 import os
 from datetime import datetime, timedelta
 import uuid
+import threading
+import time
 from typing import Optional
 import logging
 
+from services.metrics import observe_s3_call
+
 logger = logging.getLogger(__name__)
 
+# Presigned URLs are reused within a time bucket instead of signed per request
+PRESIGNED_URL_BUCKET_SECONDS = int(os.getenv("PRESIGNED_URL_BUCKET_SECONDS", "900"))
+# Never hand out a cached URL with less validity than this left
+PRESIGNED_URL_MIN_REMAINING = int(os.getenv("PRESIGNED_URL_MIN_REMAINING", "300"))
+PRESIGNED_URL_CACHE_SIZE = int(os.getenv("PRESIGNED_URL_CACHE_SIZE", "10000"))
+
 class S3Manager:
     def __init__(self):
         # AWS S3 Configuration
@@ -20,18 +29,56 @@ class S3Manager:
         self.aws_region = os.getenv("AWS_REGION", "us-east-1")
         self.bucket_name = os.getenv("S3_BUCKET_NAME", "architecture-academics-videos")
         
-        # Initialize S3 client
-        self.s3_client = boto3.client(
-            's3',
-            aws_access_key_id=self.aws_access_key_id,
-            aws_secret_access_key=self.aws_secret_access_key,
-            region_name=self.aws_region
-        )
+        # boto3 is slow to import and build a client for; done on first use
+        self._s3_client = None
+        self._client_lock = threading.Lock()
         
         # Folder structure
         self.video_folder = "course-videos/"
         self.material_folder = "course-materials/"
         self.image_folder = "course-images/"
+        
+        # (file_url, expiration, bucket) -> (presigned_url, expires_at)
+        self._presigned_cache = {}
+        self._presigned_bucket = None
+        self._presigned_lock = threading.Lock()
+        self.presigned_stats = {"hits": 0, "misses": 0}
+    
+    @property
+    def s3_client(self):
+        """boto3 S3 client, created on first access"""
+        if self._s3_client is None:
+            with self._client_lock:
+                if self._s3_client is None:
+                    import boto3
+                    
+                    client = boto3.client(
+                        's3',
+                        aws_access_key_id=self.aws_access_key_id,
+                        aws_secret_access_key=self.aws_secret_access_key,
+                        region_name=self.aws_region
+                    )
+                    # Time every S3 API call for the /metrics latency histogram
+                    client.meta.events.register("before-call.s3", self._start_call_timer)
+                    client.meta.events.register("after-call.s3", self._observe_call)
+                    client.meta.events.register("after-call-error.s3", self._observe_call_error)
+                    self._s3_client = client
+        return self._s3_client
+    
+    def _start_call_timer(self, model, context, **kwargs):
+        context["metrics_started"] = time.perf_counter()
+        context["metrics_operation"] = model.name
+    
+    def _observe_call(self, http_response, context, **kwargs):
+        started = context.get("metrics_started")
+        if started is not None:
+            outcome = "ok" if http_response.status_code < 300 else "error"
+            observe_s3_call(context["metrics_operation"], outcome, time.perf_counter() - started)
+    
+    def _observe_call_error(self, context, **kwargs):
+        started = context.get("metrics_started")
+        if started is not None:
+            observe_s3_call(context["metrics_operation"], "error", time.perf_counter() - started)
     
     def generate_unique_filename(self, original_filename: str, folder: str = "") -> str:
         """Generate a unique filename with timestamp and UUID"""
@@ -104,7 +151,7 @@ class S3Manager:
             logger.error(f"Error uploading material to S3: {e}")
             return None
     
-    def upload_course_image(self, file_content: bytes, filename: str, course_id: int) -> Optional[str]:
+    def upload_course_image(self, file_content: bytes, filename: str, course_id: int, content_type: str = 'image/jpeg') -> Optional[str]:
         """Upload course thumbnail image to S3 and return public URL"""
         try:
             # Generate unique filename
@@ -115,7 +162,8 @@ class S3Manager:
                 Bucket=self.bucket_name,
                 Key=s3_key,
                 Body=file_content,
-                ContentType='image/jpeg',
+                ContentType=content_type,
+                CacheControl='public, max-age=31536000, immutable',
                 Metadata={
                     'course_id': str(course_id),
                     'uploaded_at': datetime.now().isoformat()
@@ -164,6 +212,41 @@ class S3Manager:
         except (ClientError, IndexError) as e:
             logger.error(f"Error generating presigned URL: {e}")
             return None
+    
+    def get_cached_presigned_url(self, file_url: str, expiration: int = 3600) -> Optional[str]:
+        """Presigned URL reused per (key, expiry bucket) until shortly before it expires.
+        
+        Everyone asking for the same video within a bucket gets the same URL, which
+        also lets browsers and CDNs cache the object across viewers.
+        """
+        now = time.time()
+        bucket = int(now // PRESIGNED_URL_BUCKET_SECONDS)
+        cache_key = (file_url, expiration, bucket)
+        
+        with self._presigned_lock:
+            if bucket != self._presigned_bucket:
+                # Entries from earlier buckets are never looked up again
+                self._presigned_cache = {
+                    key: value for key, value in self._presigned_cache.items() if key[2] == bucket
+                }
+                self._presigned_bucket = bucket
+            cached = self._presigned_cache.get(cache_key)
+            if cached and cached[1] - now > PRESIGNED_URL_MIN_REMAINING:
+                self.presigned_stats["hits"] += 1
+                return cached[0]
+            self.presigned_stats["misses"] += 1
+        
+        presigned_url = self.generate_presigned_url(file_url, expiration=expiration)
+        if presigned_url:
+            with self._presigned_lock:
+                if len(self._presigned_cache) >= PRESIGNED_URL_CACHE_SIZE:
+                    self._presigned_cache.clear()
+                self._presigned_cache[cache_key] = (presigned_url, now + expiration)
+        return presigned_url
+    
+    def is_s3_url(self, file_url: Optional[str]) -> bool:
+        """Whether a stored URL points into this manager's bucket"""
+        return bool(file_url) and f"{self.bucket_name}.s3.{self.aws_region}.amazonaws.com/" in file_url
 
 # Global S3 manager instance
 s3_manager = S3Manager()
\ No newline at end of file
@@ -0,0 +1,299 @@
+"""
+Endpoint benchmark suite with latency and query budgets.
+
+Drives the FastAPI app in-process through httpx's ASGI transport (no server,
+no network) against a seeded database and reports, per hot endpoint,
+p50/p95/p99 latency, throughput and SQL statements per request. Results are
+written as JSON tagged with the git commit so runs can be compared across
+commits, and the process exits non-zero when an endpoint exceeds its budget
+in benchmark_budgets.json.
+
+The benchmark database defaults to ./benchmark.db and is filled by
+seed_synthetic.py on first use, so the development database is never touched.
+
+Usage:
+    python benchmark_endpoints.py                                  # seed if needed, run, check budgets
+    python benchmark_endpoints.py --requests 500 --output benchmark_results/$(git rev-parse --short HEAD).json
+    python benchmark_endpoints.py --compare benchmark_results/base.json --only search,jobs_list
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+BUDGETS_PATH = Path(__file__).parent / "benchmark_budgets.json"
+DEFAULT_DATABASE_URL = "sqlite:///./benchmark.db"
+DEFAULT_SEED_SCALE = 0.02
+SEARCH_TERMS = ["design", "urban", "timber", "housing", "studio", "light", "facade", "research"]
+
+
+class StatementCounter:
+    """Counts SQL statements sent to the database by the app's engine"""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+class Fixtures:
+    """Ids and credentials the scenarios need, picked from the seeded data"""
+
+    def __init__(self, db, seed: int):
+        from sqlalchemy import func
+        from auth import create_access_token
+        from database import Blog, Course, CourseEnrollment, CourseLesson, User
+        import schemas
+
+        rng = random.Random(seed)
+        # The busiest learner exercises the heaviest dashboard
+        student_id, _ = (
+            db.query(CourseEnrollment.student_id, func.count(CourseEnrollment.id))
+            .group_by(CourseEnrollment.student_id)
+            .order_by(func.count(CourseEnrollment.id).desc())
+            .first()
+        )
+        self.user = db.query(User).filter(User.id == student_id).first()
+        self.token = create_access_token(data={"sub": self.user.email})
+
+        enrollments = db.query(CourseEnrollment).filter(CourseEnrollment.student_id == student_id).all()
+        self.heartbeats = [
+            (enrollment.id, lesson_id)
+            for enrollment in enrollments
+            for (lesson_id,) in db.query(CourseLesson.id).filter(CourseLesson.course_id == enrollment.course_id)
+        ]
+        popular_courses = (
+            db.query(Course.id)
+            .join(CourseEnrollment, CourseEnrollment.course_id == Course.id)
+            .filter(Course.status == schemas.CourseStatus.PUBLISHED)
+            .group_by(Course.id)
+            .order_by(func.count(CourseEnrollment.id).desc())
+            .limit(20)
+            .all()
+        )
+        self.course_ids = [course_id for (course_id,) in popular_courses]
+        blog_ids = [
+            blog_id for (blog_id,) in
+            db.query(Blog.id).filter(Blog.status == schemas.BlogStatus.PUBLISHED).order_by(Blog.id).all()
+        ]
+        self.blog_ids = rng.sample(blog_ids, min(50, len(blog_ids)))
+        if not (self.heartbeats and self.course_ids and self.blog_ids):
+            raise SystemExit("❌ Benchmark database has no enrollments/courses/blogs; seed it first")
+
+
+def build_scenarios(fixtures: Fixtures, seed: int):
+    """name -> callable(client, iteration) that issues one request"""
+    rng = random.Random(seed)
+    auth = {"Authorization": f"Bearer {fixtures.token}"}
+
+    def pick(values, iteration):
+        return values[iteration % len(values)]
+
+    return {
+        "search": lambda client, i: client.get("/api/search", params={"q": pick(SEARCH_TERMS, i)}),
+        "jobs_list": lambda client, i: client.get("/api/jobs", params={"limit": 20, "skip": (i % 5) * 20}),
+        "blogs_list": lambda client, i: client.get("/api/blogs", params={"limit": 20, "skip": (i % 5) * 20}),
+        "course_detail": lambda client, i: client.get(f"/api/courses/{pick(fixtures.course_ids, i)}"),
+        "dashboard": lambda client, i: client.get("/api/users/dashboard", headers=auth),
+        "notifications_unread": lambda client, i: client.get("/api/notifications/unread-count", headers=auth),
+        "messages_unread": lambda client, i: client.get("/api/messages/unread-count", headers=auth),
+        "like_toggle": lambda client, i: client.post(f"/api/blogs/{pick(fixtures.blog_ids, i // 2)}/like", headers=auth),
+        "progress_heartbeat": lambda client, i: client.post(
+            "/api/courses/progress",
+            headers=auth,
+            data={
+                "enrollment_id": pick(fixtures.heartbeats, i)[0],
+                "lesson_id": pick(fixtures.heartbeats, i)[1],
+                "current_time": rng.randint(0, 600),
+            },
+        ),
+    }
+
+
+def percentile(quantiles, p: int) -> float:
+    return round(quantiles[p - 1] * 1000, 3)
+
+
+async def run_scenario(client, counter: StatementCounter, issue, requests: int, warmup: int, concurrency: int) -> dict:
+    for i in range(warmup):
+        response = await issue(client, i)
+        if response.status_code >= 400:
+            raise RuntimeError(f"warm-up request failed with {response.status_code}: {response.text[:200]}")
+
+    latencies = []
+    response_bytes = 0
+    errors = 0
+    statements_before = counter.count
+    next_iteration = iter(range(warmup, warmup + requests))
+
+    async def worker():
+        nonlocal response_bytes, errors
+        for i in next_iteration:
+            started = time.perf_counter()
+            response = await issue(client, i)
+            latencies.append(time.perf_counter() - started)
+            response_bytes += len(response.content)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    quantiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "requests": requests,
+        "errors": errors,
+        "p50_ms": percentile(quantiles, 50),
+        "p95_ms": percentile(quantiles, 95),
+        "p99_ms": percentile(quantiles, 99),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+        "throughput_rps": round(requests / elapsed, 1),
+        "queries_per_request": round((counter.count - statements_before) / requests, 2),
+        "bytes_per_response": int(response_bytes / requests),
+    }
+
+
+def check_budgets(results: dict, budgets: dict) -> list:
+    """Return human-readable budget violations"""
+    violations = []
+    for name, stats in results.items():
+        for metric, limit in budgets.get(name, {}).items():
+            value = stats.get(metric)
+            if value is not None and value > limit:
+                violations.append(f"{name}: {metric} {value} > budget {limit}")
+    return violations
+
+
+def print_table(results: dict, baseline: dict = None):
+    header = f"{'endpoint':<22}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}{'queries':>9}{'bytes':>9}"
+    print(header)
+    print("-" * len(header))
+    for name, stats in results.items():
+        line = (
+            f"{name:<22}{stats['p50_ms']:>9.2f}{stats['p95_ms']:>9.2f}{stats['p99_ms']:>9.2f}"
+            f"{stats['throughput_rps']:>9.1f}{stats['queries_per_request']:>9.2f}{stats['bytes_per_response']:>9}"
+        )
+        previous = (baseline or {}).get(name)
+        if previous:
+            delta = (stats["p95_ms"] - previous["p95_ms"]) / previous["p95_ms"] * 100 if previous["p95_ms"] else 0
+            line += f"   p95 {delta:+.0f}%, queries {stats['queries_per_request'] - previous['queries_per_request']:+.2f}"
+        print(line)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def run(args) -> dict:
+    import httpx
+    import main
+    from database import SessionLocal, engine
+
+    db = SessionLocal()
+    try:
+        fixtures = Fixtures(db, args.seed)
+    finally:
+        db.close()
+
+    scenarios = build_scenarios(fixtures, args.seed)
+    if args.only:
+        wanted = args.only.split(",")
+        unknown = set(wanted) - set(scenarios)
+        if unknown:
+            raise SystemExit(f"❌ Unknown scenarios: {', '.join(sorted(unknown))}")
+        scenarios = {name: scenarios[name] for name in wanted}
+
+    counter = StatementCounter(engine)
+    results = {}
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        for name, issue in scenarios.items():
+            results[name] = await run_scenario(client, counter, issue, args.requests, args.warmup, args.concurrency)
+            print(f"   {name}: p95 {results[name]['p95_ms']:.2f} ms")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark hot API endpoints in-process")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", DEFAULT_DATABASE_URL))
+    parser.add_argument("--seed", type=int, default=42, help="seed for data generation and request order")
+    parser.add_argument("--seed-scale", type=float, default=DEFAULT_SEED_SCALE,
+                        help="seed_synthetic.py scale used when the database is empty")
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=1, help="in-flight requests per endpoint")
+    parser.add_argument("--only", help="comma-separated scenario names")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--compare", help="previous results JSON to diff against")
+    parser.add_argument("--no-budgets", action="store_true", help="report only, never fail")
+    args = parser.parse_args()
+
+    # Must be set before the app's database module is imported
+    os.environ["DATABASE_URL"] = args.database_url
+    from database import SessionLocal, User
+    from seed_synthetic import Generator, SYNTHETIC_PASSWORD_HASH
+
+    db = SessionLocal()
+    try:
+        seeded = db.query(User.id).filter(User.hashed_password == SYNTHETIC_PASSWORD_HASH).first()
+    except Exception:
+        seeded = None
+    finally:
+        db.close()
+    if not seeded:
+        from database import engine
+        print(f"🌱 Seeding {args.database_url} at scale {args.seed_scale}")
+        Generator(engine, args.seed, args.seed_scale, datetime(2025, 6, 1), 730).run()
+
+    print(f"⏱️  Benchmarking {args.requests} requests per endpoint (concurrency {args.concurrency})")
+    results = asyncio.run(run(args))
+
+    baseline = None
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())["results"]
+    print()
+    print_table(results, baseline)
+
+    report = {
+        "commit": git_commit(),
+        "created_at": datetime.utcnow().isoformat(),
+        "database_url": args.database_url,
+        "settings": {"requests": args.requests, "warmup": args.warmup, "concurrency": args.concurrency, "seed": args.seed},
+        "results": results,
+    }
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"\n📝 Results written to {args.output}")
+
+    if args.no_budgets:
+        return 0
+    violations = check_budgets(results, json.loads(BUDGETS_PATH.read_text()))
+    if violations:
+        print("\n❌ Budget exceeded:")
+        for violation in violations:
+            print(f"   {violation}")
+        return 1
+    print("\n✅ All endpoints within budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
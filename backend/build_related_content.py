@@ -0,0 +1,29 @@
+"""
+Rebuild the related-content lists for blogs, discussions and courses.
+
+Fits the vocabulary on the current items and recomputes every item's
+nearest neighbours in batches (services/related_content.py). The running
+API keeps the lists current between builds, but only with the vocabulary
+it last fitted, so run this after bulk imports and periodically (e.g.
+nightly from cron).
+
+Usage:
+    python build_related_content.py
+    RELATED_TOP_N=20 python build_related_content.py
+"""
+import sys
+
+from services.related_content import rebuild_related_content
+
+
+def main():
+    result = rebuild_related_content()
+    print(
+        f"🔗 {result['items']} items, {result['terms']} terms, "
+        f"{result['links']} related links in {result['seconds']:.2f}s"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""
+Import-time regression check for the API.
+
+Imports main in a fresh interpreter under `python -X importtime` and fails
+when
+  - a module that must stay off the startup path (heavy clients and
+    libraries that are loaded lazily on first use) gets imported eagerly, or
+  - the cumulative import time regresses by more than MAX_REGRESSION over
+    the baseline recorded in import_time_baseline.json.
+Both checks also run as tests (tests/test_import_time.py). Worker restarts
+(e.g. PM2 max_memory_restart) pay the import cost before serving again.
+
+Raw milliseconds depend on the machine, so the baseline is stored next to
+the cumulative time of REFERENCE_MODULES (the framework, whose code we don't
+change) measured in the same run; the recorded time is scaled by how much
+faster or slower the reference imports on the current machine. Re-record
+with --record after an intended change, and commit the file.
+
+The import runs against a throwaway SQLite database so the development
+database is never touched.
+
+Usage:
+    python check_import_time.py                     # 3 runs, compare with the baseline
+    python check_import_time.py --top 25
+    python check_import_time.py --record            # update import_time_baseline.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+BASELINE_PATH = Path(__file__).parent / "import_time_baseline.json"
+# Largest accepted increase over the (machine-scaled) baseline
+MAX_REGRESSION = float(os.getenv("IMPORT_TIME_MAX_REGRESSION", "0.25"))
+# Third-party imports that measure the machine's speed
+REFERENCE_MODULES = ("fastapi", "sqlalchemy")
+# Must only be imported when first used, never at startup
+DEFERRED_MODULES = (
+    "boto3", "httpx", "pyinstrument", "pandas", "openpyxl", "aiohttp", "PIL", "numpy",
+    "jose", "passlib", "smtplib",
+)
+
+
+def measure(module: str, database_url: str) -> dict:
+    """module name -> (self_us, cumulative_us) for one cold import"""
+    env = {**os.environ, "DATABASE_URL": database_url}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=Path(__file__).parent, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"❌ import {module} failed:\n{result.stderr[-2000:]}")
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings
+
+
+def measure_best(module: str, runs: int = 3) -> dict:
+    """Timings of the fastest of several cold imports"""
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{Path(tmp) / 'import_check.db'}"
+        timings = [measure(module, database_url) for _ in range(runs)]
+    return min(timings, key=lambda t: t[module][1])
+
+
+def total_ms(timings: dict, module: str) -> float:
+    return timings[module][1] / 1000
+
+
+def reference_ms(timings: dict) -> float:
+    return sum(timings[name][1] for name in REFERENCE_MODULES if name in timings) / 1000
+
+
+def deferred_imports(timings: dict) -> List[str]:
+    """DEFERRED_MODULES that an import pulled in"""
+    return [name for name in DEFERRED_MODULES if name in timings]
+
+
+def load_baseline(module: str) -> Optional[dict]:
+    if not BASELINE_PATH.exists():
+        return None
+    return json.loads(BASELINE_PATH.read_text()).get(module)
+
+
+def budget_ms(timings: dict, baseline: dict) -> float:
+    """Recorded import time scaled to this machine, plus the allowed regression"""
+    scale = reference_ms(timings) / baseline["reference_ms"]
+    return baseline["import_ms"] * scale * (1 + MAX_REGRESSION)
+
+
+def regression(timings: dict, module: str, baseline: dict) -> Optional[str]:
+    """Describe the regression over the baseline, or None"""
+    limit = budget_ms(timings, baseline)
+    took = total_ms(timings, module)
+    if took <= limit:
+        return None
+    return (
+        f"import {module} took {took:.0f} ms > {limit:.0f} ms "
+        f"(baseline {baseline['import_ms']:.0f} ms scaled to this machine, +{MAX_REGRESSION:.0%})"
+    )
+
+
+def record_baseline(timings: dict, module: str):
+    baselines = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+    baselines[module] = {
+        "import_ms": round(total_ms(timings, module)),
+        "reference_ms": round(reference_ms(timings)),
+        "recorded_at": datetime.utcnow().strftime("%Y-%m-%d"),
+    }
+    BASELINE_PATH.write_text(json.dumps(baselines, indent=2) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail if API startup imports regress")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--runs", type=int, default=3, help="imports to time; the fastest counts")
+    parser.add_argument("--top", type=int, default=15, help="slowest modules to list by self time")
+    parser.add_argument("--record", action="store_true", help=f"write the result to {BASELINE_PATH.name}")
+    args = parser.parse_args()
+
+    fastest = measure_best(args.module, args.runs)
+    took = total_ms(fastest, args.module)
+    print(
+        f"⏱️  import {args.module}: {took:.0f} ms (best of {args.runs}; "
+        f"reference {'+'.join(REFERENCE_MODULES)}: {reference_ms(fastest):.0f} ms)"
+    )
+    print(f"\n{'self ms':>9}{'cumul ms':>10}  module")
+    slowest = sorted(fastest.items(), key=lambda item: item[1][0], reverse=True)[:args.top]
+    for name, (self_us, cumulative_us) in slowest:
+        print(f"{self_us / 1000:>9.1f}{cumulative_us / 1000:>10.1f}  {name}")
+
+    violations = [
+        f"{name} is imported at startup ({fastest[name][1] / 1000:.0f} ms); import it on first use"
+        for name in deferred_imports(fastest)
+    ]
+    if args.record:
+        if violations:
+            print("\n❌ Not recording a baseline with deferred modules imported")
+        else:
+            record_baseline(fastest, args.module)
+            print(f"\n📝 Recorded {took:.0f} ms as the baseline in {BASELINE_PATH.name}")
+    else:
+        baseline = load_baseline(args.module)
+        if baseline is None:
+            print(f"\n⚠️  No baseline for {args.module}; record one with --record")
+        else:
+            print(f"   budget here: {budget_ms(fastest, baseline):.0f} ms")
+            message = regression(fastest, args.module, baseline)
+            if message:
+                violations.append(message)
+
+    if violations:
+        print("\n❌ Import-time check failed:")
+        for violation in violations:
+            print(f"   {violation}")
+        return 1
+    print("\n✅ Startup import check passed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,14 @@
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, or_, func
+from sqlalchemy.orm import Session, joinedload, load_only, with_expression
+from sqlalchemy import and_, or_, func, case, cast, update, Float
 from database import User, Job, JobApplication, SavedJob, Course, CourseEnrollment, Workshop, WorkshopRegistration, Event, EventRegistration, SystemSettings, CourseLesson, CourseMaterial, LessonProgress, CourseReview
 import schemas
 from auth import get_password_hash, verify_password
 from typing import Optional, List
 from datetime import datetime, timedelta
-from email_service import generate_otp, send_otp_email  # Use real email sending
+from services.tags import filter_by_tag
+
+# Characters of long descriptions shipped in list (summary) responses
+LIST_EXCERPT_LENGTH = 300
 
 # User CRUD operations
 def get_user_by_email(db: Session, email: str) -> Optional[User]:
@@ -177,6 +180,8 @@ def resend_otp(db: Session, email: str) -> bool:
     if not user or user.is_verified:
         return False
     
+    from email_service import generate_otp, send_otp_email
+    
     # Generate new OTP
     otp = generate_otp()
     otp_expires = datetime.utcnow() + timedelta(minutes=10)
@@ -261,7 +266,10 @@ def update_user_profile(db: Session, user_id: int, profile_data: schemas.UserPro
         return None
     
     # Update profile fields
-    for field, value in profile_data.dict(exclude_unset=True).items():
+    update_data = profile_data.dict(exclude_unset=True)
+    if "profile_image_url" in update_data and update_data["profile_image_url"] != user.profile_image_url:
+        user.profile_image_variants = None  # Variants belong to the previous image
+    for field, value in update_data.items():
         setattr(user, field, value)
     
     user.updated_at = datetime.utcnow()
@@ -287,6 +295,17 @@ def create_job(db: Session, job: schemas.JobCreate, recruiter_id: int):
 def get_job(db: Session, job_id: int):
     return db.query(Job).filter(Job.id == job_id).first()
 
+def _job_summary_options():
+    # Only the columns a job card shows, with a truncated description
+    return (
+        load_only(
+            Job.id, Job.title, Job.company, Job.location, Job.work_mode, Job.job_type,
+            Job.experience_level, Job.salary_min, Job.salary_max, Job.currency, Job.tags,
+            Job.application_deadline, Job.status, Job.created_at, Job.updated_at, Job.recruiter_id
+        ),
+        with_expression(Job.description_excerpt, func.substr(Job.description, 1, LIST_EXCERPT_LENGTH)),
+    )
+
 def get_jobs(
     db: Session, 
     search: Optional[str] = None,
@@ -296,10 +315,15 @@ def get_jobs(
     location: Optional[str] = None,
     min_salary: Optional[float] = None,
     max_salary: Optional[float] = None,
+    tag: Optional[str] = None,
     skip: int = 0, 
-    limit: int = 50
+    limit: int = 50,
+    summary: bool = False
 ):
     query = db.query(Job).filter(Job.status == "published")
+
+    if summary:
+        query = query.options(*_job_summary_options())
     
     if search:
         query = query.filter(
@@ -329,8 +353,22 @@ def get_jobs(
     if max_salary:
         query = query.filter(Job.salary_max <= max_salary)
     
+    if tag:
+        query = filter_by_tag(query, "job", tag)
+    
     return query.offset(skip).limit(limit).all()
 
+def get_jobs_by_ids(db: Session, job_ids: List[int]):
+    """Job summaries for the given ids, in the order given"""
+    if not job_ids:
+        return []
+    jobs = db.query(Job).options(*_job_summary_options()).filter(Job.id.in_(job_ids)).all()
+    by_id = {job.id: job for job in jobs}
+    return [by_id[job_id] for job_id in job_ids if job_id in by_id]
+
+def get_applied_job_ids(db: Session, applicant_id: int) -> List[int]:
+    return [row.job_id for row in db.query(JobApplication.job_id).filter(JobApplication.applicant_id == applicant_id)]
+
 def get_recruiter_jobs(db: Session, recruiter_id: int, skip: int = 0, limit: int = 50):
     jobs = db.query(Job).filter(Job.recruiter_id == recruiter_id).offset(skip).limit(limit).all()
     # Enrich with applications count
@@ -447,8 +485,13 @@ def delete_application(db: Session, application_id: int, user_id: int):
     if not db_application:
         return None
     
+    resume_url = db_application.resume_url
     db.delete(db_application)
     db.commit()
+    
+    if resume_url:
+        from utils.file_utils import delete_uploaded_file
+        delete_uploaded_file(db, resume_url)
     return db_application
 
 def get_job_applications(db: Session, job_id: int, recruiter_id: int, skip: int = 0, limit: int = 50):
@@ -659,9 +702,18 @@ def get_courses(db: Session, skip: int = 0, limit: int = 100, status: Optional[s
         course.enrolled_count = db.query(CourseEnrollment).filter(CourseEnrollment.course_id == course.id).count()
     return courses
 
-def get_published_courses(db: Session, skip: int = 0, limit: int = 100, level: str = None, search: str = None) -> List[Course]:
+def get_published_courses(db: Session, skip: int = 0, limit: int = 100, level: str = None, search: str = None, sort: Optional[str] = None) -> List[Course]:
     """Get published courses for public viewing with optional filtering"""
-    query = db.query(Course).filter(Course.status == schemas.CourseStatus.PUBLISHED)
+    query = db.query(Course).filter(Course.status == schemas.CourseStatus.PUBLISHED).options(
+        # Syllabus and prerequisites are only needed on the detail page
+        load_only(
+            Course.id, Course.title, Course.short_description, Course.level, Course.duration,
+            Course.max_students, Course.price, Course.start_date, Course.end_date, Course.image_url,
+            Course.image_variants, Course.status, Course.created_at, Course.updated_at, Course.instructor_id,
+            Course.rating_avg, Course.rating_count, Course.total_video_duration
+        ),
+        with_expression(Course.description_excerpt, func.substr(Course.description, 1, LIST_EXCERPT_LENGTH))
+    )
     
     # Filter by level if provided
     if level:
@@ -681,16 +733,40 @@ def get_published_courses(db: Session, skip: int = 0, limit: int = 100, level: s
                 Course.short_description.ilike(search_term)
             )
         )
+
+    if sort == "rating":
+        # Served by ix_courses_status_rating; unrated courses sort last
+        query = query.order_by(Course.rating_avg.desc(), Course.rating_count.desc())
     
     courses = query.offset(skip).limit(limit).all()
-    
-    # Add computed fields
+    course_ids = [course.id for course in courses]
+    if not course_ids:
+        return courses
+
+    # Add computed fields with one grouped query per table instead of per course
+    enrolled = dict(
+        db.query(CourseEnrollment.course_id, func.count(CourseEnrollment.id))
+        .filter(CourseEnrollment.course_id.in_(course_ids))
+        .group_by(CourseEnrollment.course_id)
+        .all()
+    )
+    lesson_stats = {
+        row.course_id: row
+        for row in db.query(
+            CourseLesson.course_id,
+            func.count(CourseLesson.id).label("total_lessons"),
+            func.max(CourseLesson.is_free).label("has_free_preview"),
+        )
+        .filter(CourseLesson.course_id.in_(course_ids))
+        .group_by(CourseLesson.course_id)
+        .all()
+    }
     for course in courses:
-        course.enrolled_count = db.query(CourseEnrollment).filter(CourseEnrollment.course_id == course.id).count()
-        lessons = db.query(CourseLesson).filter(CourseLesson.course_id == course.id).all()
-        course.total_lessons = len(lessons)
-        course.total_duration = sum(lesson.video_duration or 0 for lesson in lessons)
-        course.has_free_preview = any(lesson.is_free for lesson in lessons)
+        stats = lesson_stats.get(course.id)
+        course.enrolled_count = enrolled.get(course.id, 0)
+        course.total_lessons = stats.total_lessons if stats else 0
+        course.total_duration = course.total_video_duration or 0
+        course.has_free_preview = bool(stats.has_free_preview) if stats else False
     
     return courses
 
@@ -703,7 +779,7 @@ def get_course_by_id(db: Session, course_id: int) -> Optional[Course]:
         course.lessons = db.query(CourseLesson).filter(CourseLesson.course_id == course.id).order_by(CourseLesson.order_index).all()
         course.materials = db.query(CourseMaterial).filter(CourseMaterial.course_id == course.id).order_by(CourseMaterial.order_index).all()
         course.total_lessons = len(course.lessons)
-        course.total_duration = sum(lesson.video_duration or 0 for lesson in course.lessons)
+        course.total_duration = course.total_video_duration or 0
     return course
 
 def create_or_update_course_review(db: Session, course_id: int, user_id: int, rating: int, review_text: Optional[str] = None):
@@ -728,9 +804,11 @@ def create_or_update_course_review(db: Session, course_id: int, user_id: int, ra
     ).first()
 
     if existing:
+        previous_rating = existing.rating
         existing.rating = rating_val
         existing.review_text = review_text
         existing.created_at = datetime.utcnow()
+        _apply_course_rating_delta(db, course_id, added=rating_val, removed=previous_rating)
         db.commit()
         db.refresh(existing)
         return existing
@@ -744,20 +822,85 @@ def create_or_update_course_review(db: Session, course_id: int, user_id: int, ra
         created_at=datetime.utcnow()
     )
     db.add(new_review)
+    _apply_course_rating_delta(db, course_id, added=rating_val)
     db.commit()
     db.refresh(new_review)
     return new_review
 
+def _rating_bucket(rating: int):
+    """Histogram column on Course counting reviews with the given star rating"""
+    return getattr(Course, f"rating_{rating}_count")
+
+def _apply_course_rating_delta(db: Session, course_id: int, added: Optional[int] = None, removed: Optional[int] = None):
+    """Adjust a course's stored rating aggregates in SQL for one review change.
+
+    Runs in the caller's transaction, so the aggregates commit (or roll back)
+    together with the review itself.
+    """
+    sum_delta = (added or 0) - (removed or 0)
+    count_delta = (1 if added else 0) - (1 if removed else 0)
+    new_count = Course.rating_count + count_delta
+
+    values = {
+        Course.rating_sum: Course.rating_sum + sum_delta,
+        Course.rating_count: new_count,
+        Course.rating_avg: case(
+            (new_count > 0, cast(Course.rating_sum + sum_delta, Float) / new_count),
+            else_=None
+        ),
+    }
+    if added != removed:
+        if removed:
+            values[_rating_bucket(removed)] = _rating_bucket(removed) - 1
+        if added:
+            values[_rating_bucket(added)] = _rating_bucket(added) + 1
+
+    db.query(Course).filter(Course.id == course_id).execution_options(
+        course_document_ids=[course_id]
+    ).update(values, synchronize_session=False)
+
+def recompute_course_rating_aggregates(db: Session, course_ids: Optional[List[int]] = None) -> int:
+    """Rebuild stored rating aggregates from course_reviews in bulk; returns courses updated"""
+    aggregate_query = db.query(
+        CourseReview.course_id,
+        func.sum(CourseReview.rating),
+        func.count(CourseReview.id),
+        *[func.sum(case((CourseReview.rating == stars, 1), else_=0)) for stars in range(1, 6)]
+    ).group_by(CourseReview.course_id)
+    course_query = db.query(Course.id)
+    if course_ids is not None:
+        aggregate_query = aggregate_query.filter(CourseReview.course_id.in_(course_ids))
+        course_query = course_query.filter(Course.id.in_(course_ids))
+
+    aggregates = {row[0]: row[1:] for row in aggregate_query.all()}
+    mappings = []
+    for (course_id,) in course_query.all():
+        total, count, *histogram = aggregates.get(course_id, (0, 0, 0, 0, 0, 0, 0))
+        mapping = {
+            "id": course_id,
+            "rating_sum": total or 0,
+            "rating_count": count,
+            "rating_avg": (total / count) if count else None,
+        }
+        for stars, stars_count in enumerate(histogram, start=1):
+            mapping[f"rating_{stars}_count"] = stars_count or 0
+        mappings.append(mapping)
+
+    if mappings:
+        db.execute(update(Course), mappings)
+        db.commit()
+    return len(mappings)
+
 def get_course_reviews(db: Session, course_id: int):
     """Return list of reviews for a course ordered by created_at desc"""
     reviews = db.query(CourseReview).filter(CourseReview.course_id == course_id).order_by(CourseReview.created_at.desc()).all()
     return reviews
 
 def get_course_average_rating(db: Session, course_id: int):
-    """Return average rating and count for a course"""
-    result = db.query(func.avg(CourseReview.rating).label('avg'), func.count(CourseReview.id).label('count')).filter(CourseReview.course_id == course_id).first()
-    avg = float(result.avg) if result and result.avg is not None else None
-    count = int(result.count) if result and result.count is not None else 0
+    """Return average rating and count for a course from its stored aggregates"""
+    result = db.query(Course.rating_avg, Course.rating_count).filter(Course.id == course_id).first()
+    avg = float(result.rating_avg) if result and result.rating_avg is not None else None
+    count = int(result.rating_count) if result and result.rating_count is not None else 0
     return {"average": avg, "count": count}
 
 def create_course(db: Session, course: schemas.CourseCreate) -> Course:
@@ -780,7 +923,10 @@ def update_course(db: Session, course_id: int, course_update: schemas.CourseUpda
     if not course:
         return None
     
-    for field, value in course_update.dict(exclude_unset=True).items():
+    update_data = course_update.dict(exclude_unset=True)
+    if "image_url" in update_data and update_data["image_url"] != course.image_url:
+        course.image_variants = None  # Variants belong to the previous image
+    for field, value in update_data.items():
         setattr(course, field, value)
     
     db.commit()
@@ -794,10 +940,25 @@ def delete_course(db: Session, course_id: int) -> bool:
     if not course:
         return False
     
+    file_urls = [lesson.video_url for lesson in course.lessons if lesson.video_url]
+    file_urls += [material.file_url for material in course.materials if material.file_url]
+    hls_urls = {lesson.hls_playlist_url for lesson in course.lessons if lesson.hls_playlist_url}
+    image = (course.image_url, course.image_variants)
+    
     # Delete enrollments first
     db.query(CourseEnrollment).filter(CourseEnrollment.course_id == course_id).delete()
     db.delete(course)
     db.commit()
+    
+    # Release the course image, stored lesson videos and materials, and HLS ladders no other lesson uses
+    from utils.file_utils import delete_uploaded_file
+    from services.image_service import release_image
+    from services.video_service import release_hls_output
+    release_image(db, *image)
+    for file_url in file_urls:
+        delete_uploaded_file(db, file_url)
+    for hls_url in hls_urls:
+        release_hls_output(db, hls_url)
     return True
 
 # Workshop CRUD operations
@@ -947,8 +1108,12 @@ def delete_admin_user(db: Session, user_id: int) -> bool:
     db.query(Course).filter(Course.instructor_id == user_id).update({Course.instructor_id: None})
     db.query(Workshop).filter(Workshop.instructor_id == user_id).update({Workshop.instructor_id: None})
     
+    image = (user.profile_image_url, user.profile_image_variants)
     db.delete(user)
     db.commit()
+    
+    from services.image_service import release_image
+    release_image(db, *image)
     return True
 
 # Course Lesson CRUD operations
@@ -970,6 +1135,12 @@ def create_course_lesson(db: Session, lesson: schemas.CourseLessonCreate, video_
     db.add(db_lesson)
     db.commit()
     db.refresh(db_lesson)
+    # The lesson total changed, so every enrollment's percentage did too
+    recompute_enrollment_progress(db, course_ids=[db_lesson.course_id])
+    recompute_course_video_durations(db, course_ids=[db_lesson.course_id])
+    if db_lesson.video_url:
+        from services.video_service import submit_video_probe
+        submit_video_probe(db_lesson.id, db_lesson.video_url)
     return db_lesson
 
 def update_course_lesson(db: Session, lesson_id: int, lesson_update: schemas.CourseLessonUpdate, video_url: str = None) -> Optional[CourseLesson]:
@@ -981,11 +1152,22 @@ def update_course_lesson(db: Session, lesson_id: int, lesson_update: schemas.Cou
     for field, value in lesson_update.dict(exclude_unset=True).items():
         setattr(lesson, field, value)
     
-    if video_url is not None:
+    video_changed = video_url is not None and video_url != lesson.video_url
+    if video_changed:
         lesson.video_url = video_url
+        # The old HLS ladder and metadata belong to the replaced video
+        lesson.hls_status = None
+        lesson.hls_playlist_url = None
+        lesson.hls_renditions = None
+        lesson.video_probed_at = None
     
     db.commit()
     db.refresh(lesson)
+    if "video_duration" in lesson_update.dict(exclude_unset=True):
+        recompute_course_video_durations(db, course_ids=[lesson.course_id])
+    if video_changed:
+        from services.video_service import submit_video_probe
+        submit_video_probe(lesson.id, lesson.video_url)
     return lesson
 
 def delete_course_lesson(db: Session, lesson_id: int) -> bool:
@@ -994,10 +1176,14 @@ def delete_course_lesson(db: Session, lesson_id: int) -> bool:
     if not lesson:
         return False
     
+    course_id = lesson.course_id
     # Delete progress records first
     db.query(LessonProgress).filter(LessonProgress.lesson_id == lesson_id).delete()
     db.delete(lesson)
     db.commit()
+    # Completions of the deleted lesson no longer count towards the course
+    recompute_enrollment_progress(db, course_ids=[course_id])
+    recompute_course_video_durations(db, course_ids=[course_id])
     return True
 
 def reorder_course_lessons(db: Session, course_id: int, lesson_orders: List[dict]) -> bool:
@@ -1030,11 +1216,44 @@ def update_course_lesson_video_url(db: Session, lesson_id: int, video_url: str)
     lesson = get_course_lesson_by_id(db, lesson_id)
     if lesson:
         lesson.video_url = video_url
+        lesson.hls_status = None
+        lesson.hls_playlist_url = None
+        lesson.hls_renditions = None
+        lesson.video_probed_at = None
         lesson.updated_at = datetime.utcnow()
         db.commit()
         db.refresh(lesson)
+        from services.video_service import submit_video_probe
+        submit_video_probe(lesson.id, video_url)
     return lesson
 
+def recompute_course_video_durations(db: Session, course_ids: Optional[List[int]] = None) -> int:
+    """Re-aggregate each course's total lesson video duration in bulk; returns courses updated"""
+    totals_query = db.query(
+        CourseLesson.course_id, func.coalesce(func.sum(CourseLesson.video_duration), 0)
+    ).group_by(CourseLesson.course_id)
+    course_query = db.query(Course.id)
+    if course_ids is not None:
+        totals_query = totals_query.filter(CourseLesson.course_id.in_(course_ids))
+        course_query = course_query.filter(Course.id.in_(course_ids))
+
+    totals = dict(totals_query.all())
+    mappings = [
+        {"id": course_id, "total_video_duration": int(totals.get(course_id, 0))}
+        for (course_id,) in course_query.all()
+    ]
+    if mappings:
+        db.execute(update(Course).execution_options(course_document_ids=[m["id"] for m in mappings]), mappings)
+        db.commit()
+    return len(mappings)
+
+def get_lessons_missing_video_metadata(db: Session) -> List[CourseLesson]:
+    """Lessons with a video that hasn't been probed yet"""
+    return db.query(CourseLesson).filter(
+        CourseLesson.video_url.isnot(None),
+        CourseLesson.video_probed_at.is_(None)
+    ).all()
+
 # Course Material CRUD operations
 def get_course_materials(db: Session, course_id: int) -> List[CourseMaterial]:
     """Get all materials for a course"""
@@ -1074,8 +1293,13 @@ def delete_course_material(db: Session, material_id: int) -> bool:
     if not material:
         return False
     
+    file_url = material.file_url
     db.delete(material)
     db.commit()
+    
+    if file_url:
+        from utils.file_utils import delete_uploaded_file
+        delete_uploaded_file(db, file_url)
     return True
 
 # Blog CRUD operations
@@ -1111,12 +1335,28 @@ def get_blogs(
     category: Optional[schemas.BlogCategory] = None,
     author_id: Optional[int] = None,
     is_featured: Optional[bool] = None,
-    status: Optional[schemas.BlogStatus] = None
+    status: Optional[schemas.BlogStatus] = None,
+    tag: Optional[str] = None,
+    summary: bool = False
 ):
     """Get blogs with filters"""
     from database import Blog
     
     query = db.query(Blog)
+
+    if summary:
+        # Cards show the excerpt, never the full content
+        query = query.options(
+            load_only(
+                Blog.id, Blog.title, Blog.slug, Blog.excerpt, Blog.category, Blog.tags,
+                Blog.featured_image, Blog.featured_image_variants, Blog.is_featured, Blog.status,
+                Blog.author_id, Blog.created_at, Blog.updated_at, Blog.views_count,
+                Blog.likes_count, Blog.comments_count
+            ),
+            joinedload(Blog.author).load_only(
+                User.id, User.first_name, User.last_name, User.username, User.profile_image_url
+            )
+        )
     
     # Apply filters
     if search:
@@ -1137,6 +1377,9 @@ def get_blogs(
     if is_featured is not None:
         query = query.filter(Blog.is_featured == is_featured)
     
+    if tag:
+        query = filter_by_tag(query, "blog", tag)
+    
     if status:
         query = query.filter(Blog.status == status)
     else:
@@ -1167,7 +1410,10 @@ def update_blog(db: Session, blog_id: int, blog_update: schemas.BlogUpdate):
         return None
     
     # Update fields
-    for field, value in blog_update.dict(exclude_unset=True).items():
+    update_data = blog_update.dict(exclude_unset=True)
+    if "featured_image" in update_data and update_data["featured_image"] != blog.featured_image:
+        blog.featured_image_variants = None  # Variants belong to the previous image
+    for field, value in update_data.items():
         setattr(blog, field, value)
     
     blog.updated_at = datetime.utcnow()
@@ -1183,8 +1429,12 @@ def delete_blog(db: Session, blog_id: int) -> bool:
     if not blog:
         return False
     
+    image = (blog.featured_image, blog.featured_image_variants)
     db.delete(blog)
     db.commit()
+    
+    from services.image_service import release_image
+    release_image(db, *image)
     return True
 
 def increment_blog_views(db: Session, blog_id: int):
@@ -1469,66 +1719,66 @@ def delete_blog_comment(db: Session, comment_id: int) -> bool:
     db.commit()
     return True
 
+# Like toggle helpers
+def _insert_ignore_conflict(db: Session, model, **values) -> int:
+    """INSERT a row unless it violates a unique constraint; returns the number of rows inserted"""
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    result = db.execute(insert(model).values(**values).on_conflict_do_nothing())
+    return result.rowcount
+
+def _toggle_like(db: Session, like_model, target_column: str, parent_model, target_id: int, user_id: int):
+    """Atomically toggle a (target, user) like row and adjust the parent's likes_count in SQL.
+
+    Relies on the unique (target_id, user_id) constraint on the like table: the DELETE
+    or INSERT reports whether a row actually changed, and the counter is only moved
+    when it did, so concurrent clicks can neither double count nor create duplicates.
+    """
+    from sqlalchemy import delete, update, case
+
+    like_target = getattr(like_model, target_column)
+    deleted = db.execute(
+        delete(like_model).where(like_target == target_id, like_model.user_id == user_id)
+    ).rowcount
+
+    if deleted:
+        liked = False
+        delta = case((parent_model.likes_count > 0, parent_model.likes_count - 1), else_=0)
+        changed = True
+    else:
+        liked = True
+        delta = parent_model.likes_count + 1
+        changed = _insert_ignore_conflict(db, like_model, **{target_column: target_id, "user_id": user_id}) > 0
+
+    if changed:
+        updated = db.execute(
+            update(parent_model).where(parent_model.id == target_id).values(likes_count=delta)
+        ).rowcount
+        if not updated:
+            db.rollback()
+            return None
+
+    likes_count = db.query(parent_model.likes_count).filter(parent_model.id == target_id).scalar()
+    if likes_count is None:
+        db.rollback()
+        return None
+
+    db.commit()
+    return {"liked": liked, "likes_count": likes_count or 0}
+
 # Blog Like CRUD operations
 def toggle_blog_like(db: Session, blog_id: int, user_id: int):
     """Toggle like on a blog post"""
     from database import BlogLike, Blog
-    
-    # Check if already liked
-    existing_like = db.query(BlogLike).filter(
-        and_(
-            BlogLike.blog_id == blog_id,
-            BlogLike.user_id == user_id
-        )
-    ).first()
-    
-    blog = db.query(Blog).filter(Blog.id == blog_id).first()
-    if not blog:
-        return None
-    
-    if existing_like:
-        # Unlike
-        db.delete(existing_like)
-        blog.likes_count = max(0, blog.likes_count - 1)
-        db.commit()
-        return {"liked": False, "likes_count": blog.likes_count}
-    else:
-        # Like
-        new_like = BlogLike(blog_id=blog_id, user_id=user_id)
-        db.add(new_like)
-        blog.likes_count += 1
-        db.commit()
-        return {"liked": True, "likes_count": blog.likes_count}
+    return _toggle_like(db, BlogLike, "blog_id", Blog, blog_id, user_id)
 
 def toggle_comment_like(db: Session, comment_id: int, user_id: int):
     """Toggle like on a comment"""
     from database import CommentLike, BlogComment
-    
-    # Check if already liked
-    existing_like = db.query(CommentLike).filter(
-        and_(
-            CommentLike.comment_id == comment_id,
-            CommentLike.user_id == user_id
-        )
-    ).first()
-    
-    comment = db.query(BlogComment).filter(BlogComment.id == comment_id).first()
-    if not comment:
-        return None
-    
-    if existing_like:
-        # Unlike
-        db.delete(existing_like)
-        comment.likes_count = max(0, comment.likes_count - 1)
-        db.commit()
-        return {"liked": False, "likes_count": comment.likes_count}
-    else:
-        # Like
-        new_like = CommentLike(comment_id=comment_id, user_id=user_id)
-        db.add(new_like)
-        comment.likes_count += 1
-        db.commit()
-        return {"liked": True, "likes_count": comment.likes_count}
+    return _toggle_like(db, CommentLike, "comment_id", BlogComment, comment_id, user_id)
 
 def check_user_liked_blog(db: Session, blog_id: int, user_id: int) -> bool:
     """Check if user has liked a blog"""
@@ -1578,6 +1828,7 @@ def get_discussions(
     author_id: Optional[int] = None,
     is_solved: Optional[bool] = None,
     is_pinned: Optional[bool] = None,
+    tag: Optional[str] = None,
     skip: int = 0,
     limit: int = 20
 ):
@@ -1609,6 +1860,9 @@ def get_discussions(
     if is_pinned is not None:
         query = query.filter(Discussion.is_pinned == is_pinned)
     
+    if tag:
+        query = filter_by_tag(query, "discussion", tag)
+    
     # Order by pinned first, then by creation date
     query = query.order_by(Discussion.is_pinned.desc(), Discussion.created_at.desc())
     
@@ -1756,62 +2010,12 @@ def mark_reply_as_solution(db: Session, reply_id: int, discussion_id: int):
 def toggle_discussion_like(db: Session, discussion_id: int, user_id: int):
     """Toggle like on a discussion"""
     from database import DiscussionLike, Discussion
-    
-    # Check if already liked
-    existing_like = db.query(DiscussionLike).filter(
-        and_(
-            DiscussionLike.discussion_id == discussion_id,
-            DiscussionLike.user_id == user_id
-        )
-    ).first()
-    
-    discussion = db.query(Discussion).filter(Discussion.id == discussion_id).first()
-    if not discussion:
-        return None
-    
-    if existing_like:
-        # Unlike
-        db.delete(existing_like)
-        discussion.likes_count = max(0, discussion.likes_count - 1)
-        db.commit()
-        return {"liked": False, "likes_count": discussion.likes_count}
-    else:
-        # Like
-        new_like = DiscussionLike(discussion_id=discussion_id, user_id=user_id)
-        db.add(new_like)
-        discussion.likes_count += 1
-        db.commit()
-        return {"liked": True, "likes_count": discussion.likes_count}
+    return _toggle_like(db, DiscussionLike, "discussion_id", Discussion, discussion_id, user_id)
 
 def toggle_discussion_reply_like(db: Session, reply_id: int, user_id: int):
     """Toggle like on a discussion reply"""
     from database import DiscussionReplyLike, DiscussionReply
-    
-    # Check if already liked
-    existing_like = db.query(DiscussionReplyLike).filter(
-        and_(
-            DiscussionReplyLike.reply_id == reply_id,
-            DiscussionReplyLike.user_id == user_id
-        )
-    ).first()
-    
-    reply = db.query(DiscussionReply).filter(DiscussionReply.id == reply_id).first()
-    if not reply:
-        return None
-    
-    if existing_like:
-        # Unlike
-        db.delete(existing_like)
-        reply.likes_count = max(0, reply.likes_count - 1)
-        db.commit()
-        return {"liked": False, "likes_count": reply.likes_count}
-    else:
-        # Like
-        new_like = DiscussionReplyLike(reply_id=reply_id, user_id=user_id)
-        db.add(new_like)
-        reply.likes_count += 1
-        db.commit()
-        return {"liked": True, "likes_count": reply.likes_count}
+    return _toggle_like(db, DiscussionReplyLike, "reply_id", DiscussionReply, reply_id, user_id)
 
 def check_user_liked_discussion(db: Session, discussion_id: int, user_id: int) -> bool:
     """Check if user has liked a discussion"""
@@ -1826,6 +2030,39 @@ def check_user_liked_discussion(db: Session, discussion_id: int, user_id: int) -
     
     return like is not None
 
+# ============= Batch Membership Lookups =============
+
+def _get_member_ids(db: Session, target_column, user_column, target_ids: List[int], user_id: int) -> List[int]:
+    """Return the subset of target_ids the user is linked to, using a single IN query"""
+    if not target_ids:
+        return []
+
+    rows = db.query(target_column).filter(
+        user_column == user_id,
+        target_column.in_(set(target_ids))
+    ).all()
+
+    return sorted({row[0] for row in rows})
+
+def get_user_memberships(db: Session, user_id: int, lookup: schemas.MembershipLookupRequest) -> dict:
+    """Batch version of the like/registration/enrollment status checks.
+
+    Runs at most one query per entity type regardless of how many ids are requested.
+    """
+    from database import BlogLike, CommentLike, DiscussionLike, DiscussionReplyLike
+
+    return {
+        "liked_blog_ids": _get_member_ids(db, BlogLike.blog_id, BlogLike.user_id, lookup.blog_ids, user_id),
+        "liked_comment_ids": _get_member_ids(db, CommentLike.comment_id, CommentLike.user_id, lookup.comment_ids, user_id),
+        "liked_discussion_ids": _get_member_ids(db, DiscussionLike.discussion_id, DiscussionLike.user_id, lookup.discussion_ids, user_id),
+        "liked_discussion_reply_ids": _get_member_ids(db, DiscussionReplyLike.reply_id, DiscussionReplyLike.user_id, lookup.discussion_reply_ids, user_id),
+        "registered_event_ids": _get_member_ids(db, EventRegistration.event_id, EventRegistration.participant_id, lookup.event_ids, user_id),
+        "registered_workshop_ids": _get_member_ids(db, WorkshopRegistration.workshop_id, WorkshopRegistration.participant_id, lookup.workshop_ids, user_id),
+        "enrolled_course_ids": _get_member_ids(db, CourseEnrollment.course_id, CourseEnrollment.student_id, lookup.course_ids, user_id),
+        "saved_job_ids": _get_member_ids(db, SavedJob.job_id, SavedJob.user_id, lookup.job_ids, user_id),
+        "applied_job_ids": _get_member_ids(db, JobApplication.job_id, JobApplication.applicant_id, lookup.job_ids, user_id),
+    }
+
 # Event CRUD operations
 def create_event(db: Session, event: schemas.EventCreate, organizer_id: Optional[int] = None):
     """Create a new event"""
@@ -1848,18 +2085,34 @@ def get_event(db: Session, event_id: int):
         event.participants_count = len(event.registrations)
     return event
 
-def get_events(db: Session, skip: int = 0, limit: int = 50, status: Optional[str] = None):
+def get_events(db: Session, skip: int = 0, limit: int = 50, status: Optional[str] = None, summary: bool = False):
     """Get all events with optional filtering"""
     query = db.query(Event)
+
+    if summary:
+        # Description, requirements and meeting link are only needed on the detail view
+        query = query.options(load_only(
+            Event.id, Event.title, Event.short_description, Event.date, Event.duration,
+            Event.location, Event.image_url, Event.image_variants, Event.max_participants,
+            Event.is_online, Event.status, Event.created_at, Event.updated_at
+        ))
     
     if status:
         query = query.filter(Event.status == status)
     
     events = query.order_by(Event.date.desc()).offset(skip).limit(limit).all()
     
-    # Add participants_count to each event
+    # Add participants_count to each event from a single grouped count
+    counts = {}
+    if events:
+        counts = dict(
+            db.query(EventRegistration.event_id, func.count(EventRegistration.id))
+            .filter(EventRegistration.event_id.in_([event.id for event in events]))
+            .group_by(EventRegistration.event_id)
+            .all()
+        )
     for event in events:
-        event.participants_count = len(event.registrations)
+        event.participants_count = counts.get(event.id, 0)
     
     return events
 
@@ -1870,6 +2123,8 @@ def update_event(db: Session, event_id: int, event_update: schemas.EventUpdate):
         return None
     
     update_data = event_update.dict(exclude_unset=True)
+    if "image_url" in update_data and update_data["image_url"] != db_event.image_url:
+        db_event.image_variants = None  # Variants belong to the previous image
     for field, value in update_data.items():
         setattr(db_event, field, value)
     
@@ -1885,8 +2140,12 @@ def delete_event(db: Session, event_id: int):
     """Delete event"""
     db_event = db.query(Event).filter(Event.id == event_id).first()
     if db_event:
+        image = (db_event.image_url, db_event.image_variants)
         db.delete(db_event)
         db.commit()
+        
+        from services.image_service import release_image
+        release_image(db, *image)
         return True
     return False
 
@@ -1981,8 +2240,12 @@ def delete_user(db: Session, user_id: int):
     """Delete user"""
     user = db.query(User).filter(User.id == user_id).first()
     if user:
+        image = (user.profile_image_url, user.profile_image_variants)
         db.delete(user)
         db.commit()
+        
+        from services.image_service import release_image
+        release_image(db, *image)
         return True
     return False
 
@@ -2050,24 +2313,83 @@ def get_course_enrollments(db: Session, course_id: int):
         CourseEnrollment.course_id == course_id
     ).all()
 
-def update_enrollment_progress(db: Session, enrollment_id: int, progress_percentage: float):
-    """Update enrollment progress"""
+def _enrollment_progress_values(completed_lessons, total_lessons: int) -> dict:
+    """progress_percentage/completed for a completed lesson count (a number or SQL expression)"""
+    if total_lessons <= 0:
+        return {"progress_percentage": 0, "completed": False}
+    return {
+        "progress_percentage": case(
+            (completed_lessons >= total_lessons, 100),
+            else_=func.round(completed_lessons * 100.0 / total_lessons, 2)
+        ),
+        "completed": completed_lessons >= total_lessons,
+    }
+
+def _apply_enrollment_completion_delta(db: Session, enrollment_id: int, delta: int):
+    """Move an enrollment's completed lesson count by one transition, in SQL and in O(1)"""
     from database import CourseEnrollment
-    enrollment = db.query(CourseEnrollment).filter(
-        CourseEnrollment.id == enrollment_id
-    ).first()
-    
-    if enrollment:
-        enrollment.progress_percentage = progress_percentage
-        enrollment.last_accessed_at = datetime.utcnow()
-        
-        if progress_percentage >= 100:
-            enrollment.completed = True
-        
+    from services.course_documents import get_course_lesson_total
+
+    course_id = db.query(CourseEnrollment.course_id).filter(CourseEnrollment.id == enrollment_id).scalar()
+    if course_id is None:
+        return
+    total_lessons = get_course_lesson_total(db, course_id)
+
+    completed_lessons = case(
+        (CourseEnrollment.completed_lessons + delta < 0, 0),
+        else_=CourseEnrollment.completed_lessons + delta
+    )
+    db.execute(
+        update(CourseEnrollment)
+        .where(CourseEnrollment.id == enrollment_id)
+        .values(
+            completed_lessons=completed_lessons,
+            last_accessed_at=datetime.utcnow(),
+            **_enrollment_progress_values(completed_lessons, total_lessons)
+        )
+    )
+
+def recompute_enrollment_progress(db: Session, course_ids: Optional[List[int]] = None, enrollment_ids: Optional[List[int]] = None) -> int:
+    """Rebuild completed_lessons/progress_percentage/completed from lesson progress rows in bulk"""
+    from database import CourseEnrollment
+
+    totals_query = db.query(CourseLesson.course_id, func.count(CourseLesson.id)).group_by(CourseLesson.course_id)
+    # Only completions of lessons that still belong to the enrollment's course count
+    completed_query = db.query(LessonProgress.enrollment_id, func.count(LessonProgress.id)).join(
+        CourseLesson, CourseLesson.id == LessonProgress.lesson_id
+    ).join(
+        CourseEnrollment, and_(
+            CourseEnrollment.id == LessonProgress.enrollment_id,
+            CourseEnrollment.course_id == CourseLesson.course_id
+        )
+    ).filter(LessonProgress.completed == True).group_by(LessonProgress.enrollment_id)
+    enrollment_query = db.query(CourseEnrollment.id, CourseEnrollment.course_id)
+
+    if course_ids is not None:
+        totals_query = totals_query.filter(CourseLesson.course_id.in_(course_ids))
+        completed_query = completed_query.filter(CourseEnrollment.course_id.in_(course_ids))
+        enrollment_query = enrollment_query.filter(CourseEnrollment.course_id.in_(course_ids))
+    if enrollment_ids is not None:
+        completed_query = completed_query.filter(LessonProgress.enrollment_id.in_(enrollment_ids))
+        enrollment_query = enrollment_query.filter(CourseEnrollment.id.in_(enrollment_ids))
+
+    totals = dict(totals_query.all())
+    completed = dict(completed_query.all())
+    mappings = []
+    for enrollment_id, course_id in enrollment_query.all():
+        total_lessons = totals.get(course_id, 0)
+        completed_lessons = min(completed.get(enrollment_id, 0), total_lessons)
+        mappings.append({
+            "id": enrollment_id,
+            "completed_lessons": completed_lessons,
+            "progress_percentage": round(completed_lessons * 100.0 / total_lessons, 2) if total_lessons else 0,
+            "completed": bool(total_lessons) and completed_lessons >= total_lessons,
+        })
+
+    if mappings:
+        db.execute(update(CourseEnrollment), mappings)
         db.commit()
-        db.refresh(enrollment)
-    
-    return enrollment
+    return len(mappings)
 
 # ===========================
 # Lesson Progress CRUD
@@ -2080,31 +2402,40 @@ def create_or_update_lesson_progress(
     current_time: int = 0,
     completed: bool = False
 ):
-    """Create or update lesson progress"""
+    """Create or update lesson progress, keeping the enrollment's completion count in step.
+
+    The completed flag is flipped with a conditional UPDATE (or an INSERT that
+    yields to an existing row), so the row count says whether this call made
+    the transition and concurrent completions are counted exactly once.
+    """
     from database import LessonProgress
     
-    progress = db.query(LessonProgress).filter(
-        LessonProgress.lesson_id == lesson_id,
-        LessonProgress.enrollment_id == enrollment_id
-    ).first()
-    
-    if progress:
-        progress.current_time = current_time
-        progress.completed = completed
-        progress.last_watched_at = datetime.utcnow()
+    now = datetime.utcnow()
+    pair = and_(LessonProgress.lesson_id == lesson_id, LessonProgress.enrollment_id == enrollment_id)
+    position = {"current_time": current_time, "last_watched_at": now, "updated_at": now}
+    
+    delta = 0
+    flipped = db.execute(
+        update(LessonProgress)
+        .where(pair, func.coalesce(LessonProgress.completed, False) != completed)
+        .values(completed=completed, **position)
+    ).rowcount
+    if flipped:
+        delta = 1 if completed else -1
+    elif _insert_ignore_conflict(
+        db, LessonProgress, lesson_id=lesson_id, enrollment_id=enrollment_id,
+        completed=completed, created_at=now, **position
+    ):
+        delta = 1 if completed else 0
     else:
-        progress = LessonProgress(
-            lesson_id=lesson_id,
-            enrollment_id=enrollment_id,
-            current_time=current_time,
-            completed=completed,
-            last_watched_at=datetime.utcnow()
-        )
-        db.add(progress)
+        # Row exists with the same completion state; only the position moves
+        db.execute(update(LessonProgress).where(pair).values(**position))
+    
+    if delta:
+        _apply_enrollment_completion_delta(db, enrollment_id, delta)
     
     db.commit()
-    db.refresh(progress)
-    return progress
+    return db.query(LessonProgress).filter(pair).first()
 
 def get_lesson_progress(db: Session, lesson_id: int, enrollment_id: int):
     """Get progress for a specific lesson"""
@@ -2251,10 +2582,24 @@ def delete_question_reply(db: Session, reply_id: int):
 
 
 # NATA Course CRUD operations
-def get_all_nata_courses(db: Session, skip: int = 0, limit: int = 100, category: Optional[str] = None, status: str = "active") -> List:
-    """Get all NATA courses with optional filtering"""
+def get_all_nata_courses(db: Session, skip: int = 0, limit: int = 100, category: Optional[str] = None, status: Optional[str] = "active", summary: bool = False) -> List:
+    """Get all NATA courses with optional filtering (status=None returns every status)"""
     from database import NATACourse
-    query = db.query(NATACourse).filter(NATACourse.status == status)
+    query = db.query(NATACourse)
+
+    if status:
+        query = query.filter(NATACourse.status == status)
+
+    if summary:
+        # The syllabus JSON is only needed on the detail page
+        query = query.options(load_only(
+            NATACourse.id, NATACourse.title, NATACourse.description, NATACourse.instructor,
+            NATACourse.duration, NATACourse.difficulty, NATACourse.price, NATACourse.original_price,
+            NATACourse.rating, NATACourse.students_enrolled, NATACourse.lessons_count,
+            NATACourse.certificate_included, NATACourse.moodle_url, NATACourse.thumbnail,
+            NATACourse.category, NATACourse.skills, NATACourse.features, NATACourse.status,
+            NATACourse.created_at, NATACourse.updated_at
+        ))
     
     if category and category != "All":
         query = query.filter(NATACourse.category == category)
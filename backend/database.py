@@ -1,12 +1,15 @@
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, DateTime, Text, Enum, ForeignKey, Numeric
+from sqlalchemy import create_engine, Column, Integer, String, Boolean, DateTime, Text, Enum, ForeignKey, Numeric, Float, UniqueConstraint, Index
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import sessionmaker, relationship, query_expression
 from datetime import datetime
+import os
 import schemas
+from services.metrics import TimedQueuePool
 
-DATABASE_URL = "sqlite:///./architecture_academics.db"
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./architecture_academics.db")
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+# QueuePool is the default for file databases too; the subclass times checkouts
+engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=TimedQueuePool)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -55,6 +58,7 @@ class User(Base):
     linkedin = Column(String, nullable=True)
     portfolio = Column(String, nullable=True)
     profile_image_url = Column(String, nullable=True)
+    profile_image_variants = Column(Text, nullable=True)  # JSON list of resized variants
     
     # User type specific fields
     cao_number = Column(String, nullable=True)  # For architects
@@ -123,6 +127,9 @@ class Job(Base):
     status = Column(Enum(JobStatus, values_callable=lambda x: [e.value for e in x]), default=JobStatus.PUBLISHED)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Truncated description, populated by list queries via with_expression()
+    description_excerpt = query_expression()
     
     # Foreign key
     recruiter_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -180,11 +187,26 @@ class Course(Base):
     start_date = Column(DateTime, nullable=True)
     end_date = Column(DateTime, nullable=True)
     image_url = Column(String, nullable=True)
+    image_variants = Column(Text, nullable=True)  # JSON list of resized variants
     syllabus = Column(Text, nullable=True)  # JSON or text format
     prerequisites = Column(Text, nullable=True)
     status = Column(Enum(CourseStatus, values_callable=lambda x: [e.value for e in x]), default=CourseStatus.DRAFT)
+    # Review aggregates, kept in step with course_reviews by crud.create_or_update_course_review
+    rating_sum = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_avg = Column(Float, nullable=True)
+    rating_1_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_2_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_3_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_4_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_5_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # Sum of lesson video durations in seconds, kept current by crud
+    total_video_duration = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Truncated description, populated by list queries via with_expression()
+    description_excerpt = query_expression()
     
     # Foreign key
     instructor_id = Column(Integer, ForeignKey("users.id"), nullable=True)
@@ -195,6 +217,9 @@ class Course(Base):
     lessons = relationship("CourseLesson", back_populates="course", cascade="all, delete-orphan")
     materials = relationship("CourseMaterial", back_populates="course", cascade="all, delete-orphan")
 
+    # Catalog pages filter by status and sort by rating
+    __table_args__ = (Index("ix_courses_status_rating", "status", "rating_avg", "rating_count"),)
+
 class CourseLesson(Base):
     __tablename__ = "course_lessons"
 
@@ -203,9 +228,17 @@ class CourseLesson(Base):
     description = Column(Text, nullable=True)
     video_url = Column(String, nullable=True)  # Path to video file
     video_duration = Column(Integer, nullable=True)  # Duration in seconds
+    video_width = Column(Integer, nullable=True)  # Probed from the uploaded file
+    video_height = Column(Integer, nullable=True)
+    video_bitrate = Column(Integer, nullable=True)  # Overall bitrate in kbps
+    video_codec = Column(String, nullable=True)
+    video_probed_at = Column(DateTime, nullable=True)
     order_index = Column(Integer, nullable=False, default=0)  # Lesson order
     is_free = Column(Boolean, default=False)  # Free preview lesson
     transcript = Column(Text, nullable=True)  # Video transcript
+    hls_status = Column(String, nullable=True)  # queued, processing, ready, failed
+    hls_playlist_url = Column(String, nullable=True)  # HLS master playlist
+    hls_renditions = Column(Text, nullable=True)  # JSON list of ladder renditions
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -253,6 +286,9 @@ class LessonProgress(Base):
     lesson = relationship("CourseLesson", back_populates="progress")
     enrollment = relationship("CourseEnrollment", back_populates="lesson_progress")
 
+    # One row per (enrollment, lesson); heartbeat flushes upsert against it
+    __table_args__ = (UniqueConstraint("enrollment_id", "lesson_id", name="uq_lesson_progress_enrollment_id_lesson_id"),)
+
 class CourseEnrollment(Base):
     __tablename__ = "course_enrollments"
 
@@ -260,6 +296,7 @@ class CourseEnrollment(Base):
     enrolled_at = Column(DateTime, default=datetime.utcnow)
     completed = Column(Boolean, default=False)
     progress_percentage = Column(Numeric(5, 2), default=0.0)  # Percentage 0.00-100.00
+    completed_lessons = Column(Integer, nullable=False, default=0, server_default="0")  # Maintained on completion transitions
     last_accessed_at = Column(DateTime, nullable=True)
     
     # Foreign keys
@@ -382,6 +419,7 @@ class Event(Base):
     duration = Column(Integer, nullable=False)  # Duration in hours
     location = Column(String, nullable=True)
     image_url = Column(String, nullable=True)
+    image_variants = Column(Text, nullable=True)  # JSON list of resized variants
     max_participants = Column(Integer, default=50)
     is_online = Column(Boolean, default=False)
     meeting_link = Column(String, nullable=True)
@@ -438,6 +476,7 @@ class Blog(Base):
     category = Column(Enum(BlogCategory, values_callable=lambda x: [e.value for e in x]), nullable=False)
     tags = Column(String, nullable=True)  # Comma-separated tags
     featured_image = Column(String, nullable=True)
+    featured_image_variants = Column(Text, nullable=True)  # JSON list of resized variants
     is_featured = Column(Boolean, default=False)
     status = Column(Enum(BlogStatus, values_callable=lambda x: [e.value for e in x]), default=BlogStatus.DRAFT)
     views_count = Column(Integer, default=0)
@@ -472,6 +511,7 @@ class BlogComment(Base):
 
 class BlogLike(Base):
     __tablename__ = "blog_likes"
+    __table_args__ = (UniqueConstraint("blog_id", "user_id", name="uq_blog_likes_blog_id_user_id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     blog_id = Column(Integer, ForeignKey("blogs.id"), nullable=False)
@@ -484,6 +524,7 @@ class BlogLike(Base):
 
 class CommentLike(Base):
     __tablename__ = "comment_likes"
+    __table_args__ = (UniqueConstraint("comment_id", "user_id", name="uq_comment_likes_comment_id_user_id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     comment_id = Column(Integer, ForeignKey("blog_comments.id"), nullable=False)
@@ -538,6 +579,7 @@ class DiscussionReply(Base):
 
 class DiscussionLike(Base):
     __tablename__ = "discussion_likes"
+    __table_args__ = (UniqueConstraint("discussion_id", "user_id", name="uq_discussion_likes_discussion_id_user_id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     discussion_id = Column(Integer, ForeignKey("discussions.id"), nullable=False)
@@ -550,6 +592,7 @@ class DiscussionLike(Base):
 
 class DiscussionReplyLike(Base):
     __tablename__ = "discussion_reply_likes"
+    __table_args__ = (UniqueConstraint("reply_id", "user_id", name="uq_discussion_reply_likes_reply_id_user_id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     reply_id = Column(Integer, ForeignKey("discussion_replies.id"), nullable=False)
@@ -612,6 +655,62 @@ class Notification(Base):
     
     recipient = relationship("User", back_populates="notifications")
 
+class StoredFile(Base):
+    __tablename__ = "stored_files"
+
+    id = Column(Integer, primary_key=True, index=True)
+    digest = Column(String, unique=True, index=True, nullable=False)  # SHA-256 of the content
+    url = Column(String, unique=True, index=True, nullable=False)
+    size = Column(Integer, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=1)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class Tag(Base):
+    """Normalized tag (lowercase, single-spaced); services/tags.py keeps it in step with the tags strings"""
+    __tablename__ = "tags"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, index=True, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class EntityTag(Base):
+    """A tag on a job, blog or discussion"""
+    __tablename__ = "entity_tags"
+
+    # Ordered for "entities with tag X" joins
+    tag_id = Column(Integer, ForeignKey("tags.id"), primary_key=True)
+    entity_type = Column(String, primary_key=True)  # "job", "blog" or "discussion"
+    entity_id = Column(Integer, primary_key=True)
+
+    # An entity's own tags, read when it is retagged or deleted
+    __table_args__ = (Index("ix_entity_tags_entity", "entity_type", "entity_id"),)
+
+class TagCount(Base):
+    """Number of published entities of one type carrying a tag, for tag clouds"""
+    __tablename__ = "tag_counts"
+
+    entity_type = Column(String, primary_key=True)
+    tag_id = Column(Integer, ForeignKey("tags.id"), primary_key=True)
+    count = Column(Integer, nullable=False, default=0, server_default="0")
+
+    __table_args__ = (Index("ix_tag_counts_type_count", "entity_type", "count"),)
+
+class RelatedContent(Base):
+    """Precomputed nearest neighbours of a blog, discussion or course (services/related_content.py)"""
+    __tablename__ = "related_content"
+
+    # Keyed by source so an item's list is a primary-key range read
+    source_type = Column(String, primary_key=True)  # "blog", "discussion" or "course"
+    source_id = Column(Integer, primary_key=True)
+    rank = Column(Integer, primary_key=True)
+    target_type = Column(String, nullable=False)
+    target_id = Column(Integer, nullable=False)
+    score = Column(Float, nullable=False)
+    computed_at = Column(DateTime, default=datetime.utcnow)
+
+    # Finding the lists an item appears in when it changes or is deleted
+    __table_args__ = (Index("ix_related_content_target", "target_type", "target_id"),)
+
 def get_db():
     db = SessionLocal()
     try:
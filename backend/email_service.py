@@ -10,6 +10,8 @@ from typing import Optional
 import os
 from dotenv import load_dotenv
 
+from services.metrics import time_smtp_send
+
 # Load environment variables
 load_dotenv()
 
@@ -48,12 +50,13 @@ def send_email(to_email: str, subject: str, body: str, is_html: bool = True) ->
             msg.attach(MIMEText(body, 'plain'))
         
         # Send email
-        server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
-        server.starttls()
-        server.login(SMTP_USERNAME, SMTP_PASSWORD)
-        text = msg.as_string()
-        server.sendmail(FROM_EMAIL, to_email, text)
-        server.quit()
+        with time_smtp_send():
+            server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
+            server.starttls()
+            server.login(SMTP_USERNAME, SMTP_PASSWORD)
+            text = msg.as_string()
+            server.sendmail(FROM_EMAIL, to_email, text)
+            server.quit()
         
         print(f"✅ Email sent successfully to {to_email}")
         return True
@@ -1,5 +1,4 @@
-from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, Response
 from pathlib import Path
 import crud
 import schemas
@@ -26,7 +25,8 @@ from routes import (
     user_routes,
     message_routes,
     notification_routes,
-    search_routes
+    search_routes,
+    tag_routes
 )
 from routes import analytics_routes
 
@@ -34,6 +34,14 @@ from routes import analytics_routes
 import os
 import ast
 from fastapi.middleware.cors import CORSMiddleware
+from middleware.static_files import UploadStaticFiles
+from middleware.compression import CompressionMiddleware
+from middleware.query_stats import QueryStatsMiddleware
+from middleware.metrics import MetricsMiddleware
+from middleware.profiling import ProfilingMiddleware, PYINSTRUMENT_AVAILABLE
+from middleware.read_your_writes import ReadYourWritesMiddleware
+from services.db_routing import replica_engines
+from services.metrics import PROMETHEUS_AVAILABLE, CONTENT_TYPE_LATEST, render_metrics
 
 # Create FastAPI app
 app = FastAPI(
@@ -52,8 +60,8 @@ VIDEO_DIR.mkdir(exist_ok=True)
 MATERIAL_DIR.mkdir(exist_ok=True)
 RESUME_DIR.mkdir(exist_ok=True)
 
-# Serve static files
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+# Serve static files (immutable caching, ETags and precompressed siblings)
+app.mount("/uploads", UploadStaticFiles(directory="uploads"), name="uploads")
 
 
 # Configure CORS middleware
@@ -67,6 +75,24 @@ origins = [
     "http://15.206.47.135:8000",
 ]
 
+# Compress JSON/text responses (br/gzip); streaming responses pass through
+app.add_middleware(CompressionMiddleware)
+
+# Per-request SQL counts/time by route, slow-query log (X-DB-* headers with SQL_DEBUG_HEADERS=1)
+app.add_middleware(QueryStatsMiddleware)
+
+# Prometheus request counts/latency by route template, served at /metrics
+if PROMETHEUS_AVAILABLE:
+    app.add_middleware(MetricsMiddleware)
+
+# Route reads to replicas, keeping recent writers on the primary
+if replica_engines:
+    app.add_middleware(ReadYourWritesMiddleware)
+
+# Admin-triggered request profiles (X-Profile-Token), listed at /api/admin/profiles
+if PYINSTRUMENT_AVAILABLE:
+    app.add_middleware(ProfilingMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -92,6 +118,7 @@ app.include_router(user_routes.router, prefix="/api")
 app.include_router(message_routes.router, prefix="/api")
 app.include_router(notification_routes.router, prefix="/api")
 app.include_router(search_routes.router, prefix="/api")
+app.include_router(tag_routes.router, prefix="/api")
 app.include_router(analytics_routes.router, prefix="/api")
 
 # Root endpoint
@@ -106,6 +133,14 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "message": "Jobs Portal API is running"}
 
+# Prometheus scrape endpoint
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics in text exposition format"""
+    if not PROMETHEUS_AVAILABLE:
+        return Response("prometheus_client is not installed\n", status_code=503, media_type="text/plain")
+    return Response(render_metrics(), headers={"Content-Type": CONTENT_TYPE_LATEST})
+
 # Development route for creating predefined recruiter
 @app.post("/dev/create-recruiter")
 async def create_predefined_recruiter():
@@ -329,6 +364,26 @@ Any advice on cost-effective sustainable alternatives to traditional materials w
     finally:
         db.close()
 
+@app.on_event("startup")
+async def start_background_tasks():
+    """Start periodic background flushers"""
+    from services.progress_buffer import start_progress_flusher
+    start_progress_flusher()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background worker pools and flush buffered writes"""
+    from services.image_service import shutdown_executor
+    from services.video_service import shutdown_hls_executor
+    from services.backup_service import shutdown_backup_executor
+    from services.related_content import shutdown_related_executor
+    from services.progress_buffer import stop_progress_flusher
+    shutdown_executor()
+    shutdown_hls_executor()
+    shutdown_backup_executor()
+    shutdown_related_executor()
+    await stop_progress_flusher()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="127.0.0.1", port=8000, reload=True)
\ No newline at end of file
@@ -0,0 +1,195 @@
+"""
+Negotiated Brotli/GZip compression for API responses.
+
+Only complete, single-message bodies (regular JSON/text responses) are
+compressed. Streaming responses such as video ranges, file downloads and
+server-sent events arrive in several body messages and are passed through
+untouched. Compression time and ratio are recorded per route template.
+"""
+
+import gzip
+import os
+import time
+from typing import Dict, List
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/",
+)
+EXCLUDED_TYPES = ("text/event-stream",)
+
+# Route template -> counters, e.g. "GET /api/jobs/{job_id}"
+COMPRESSION_STATS: Dict[str, Dict] = {}
+
+
+def parse_accept_encoding(accept_encoding: str) -> set:
+    """Parse Accept-Encoding into the set of codings with a non-zero q-value"""
+    accepted = set()
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if q > 0:
+            accepted.add(coding)
+    return accepted
+
+
+def route_template(scope: Scope) -> str:
+    """Label a request by method and matched route path rather than raw URL"""
+    route = scope.get("route")
+    path = getattr(route, "path", None) or "unmatched"
+    return f"{scope.get('method', '')} {path}"
+
+
+def _is_compressible(content_type: str) -> bool:
+    content_type = content_type.lower()
+    if content_type.startswith(EXCLUDED_TYPES):
+        return False
+    return content_type.startswith(COMPRESSIBLE_TYPES) or content_type.endswith(("+json", "+xml"))
+
+
+def _record(label: str, size_in: int, size_out: int, seconds: float):
+    stats = COMPRESSION_STATS.setdefault(label, {
+        "responses": 0,
+        "bytes_in": 0,
+        "bytes_out": 0,
+        "compress_seconds": 0.0,
+    })
+    stats["responses"] += 1
+    stats["bytes_in"] += size_in
+    stats["bytes_out"] += size_out
+    stats["compress_seconds"] += seconds
+
+
+def get_compression_stats() -> List[Dict]:
+    """Per-route compression totals, largest savings first"""
+    results = []
+    for label, stats in COMPRESSION_STATS.items():
+        results.append({
+            "route": label,
+            "responses": stats["responses"],
+            "bytes_in": stats["bytes_in"],
+            "bytes_out": stats["bytes_out"],
+            "ratio": round(stats["bytes_out"] / stats["bytes_in"], 4) if stats["bytes_in"] else None,
+            "avg_compress_ms": round(stats["compress_seconds"] * 1000 / stats["responses"], 3),
+        })
+    results.sort(key=lambda r: r["bytes_in"] - r["bytes_out"], reverse=True)
+    return results
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = COMPRESSION_MIN_SIZE,
+        gzip_level: int = COMPRESSION_GZIP_LEVEL,
+        brotli_quality: int = COMPRESSION_BROTLI_QUALITY,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accepted = parse_accept_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if BROTLI_AVAILABLE and "br" in accepted:
+            encoding = "br"
+        elif "gzip" in accepted:
+            encoding = "gzip"
+        else:
+            encoding = None
+
+        responder = _CompressionResponder(self, scope, send, encoding)
+        await self.app(scope, receive, responder.send)
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+
+class _CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, scope: Scope, send: Send, encoding):
+        self.middleware = middleware
+        self.scope = scope
+        self.downstream = send
+        self.encoding = encoding
+        self.start_message: Message = None
+        self.passthrough = False
+
+    async def send(self, message: Message) -> None:
+        if self.passthrough:
+            await self.downstream(message)
+            return
+
+        if message["type"] == "http.response.start":
+            # Hold the headers until the first body chunk tells us what we're sending
+            self.start_message = message
+            return
+
+        if message["type"] != "http.response.body":
+            # pathsend/zerocopysend and other extensions are never compressed
+            self.passthrough = True
+            await self.downstream(self.start_message)
+            await self.downstream(message)
+            return
+
+        self.passthrough = True
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        body = message.get("body", b"")
+        streaming = message.get("more_body", False)
+
+        eligible = (
+            "content-encoding" not in headers
+            and _is_compressible(headers.get("content-type", ""))
+        )
+        if eligible:
+            headers.add_vary_header("Accept-Encoding")
+
+        if not eligible or streaming or not self.encoding or len(body) < self.middleware.minimum_size:
+            await self.downstream(self.start_message)
+            await self.downstream(message)
+            return
+
+        started = time.perf_counter()
+        compressed = self.middleware.compress(body, self.encoding)
+        elapsed = time.perf_counter() - started
+        _record(route_template(self.scope), len(body), len(compressed), elapsed)
+
+        if len(compressed) >= len(body):
+            await self.downstream(self.start_message)
+            await self.downstream(message)
+            return
+
+        headers["content-encoding"] = self.encoding
+        headers["content-length"] = str(len(compressed))
+        await self.downstream(self.start_message)
+        await self.downstream({"type": "http.response.body", "body": compressed, "more_body": False})
@@ -0,0 +1,185 @@
+"""
+On-demand sampling profiles of individual requests.
+
+An admin mints a short-lived profiling token (POST /api/admin/profiles/token)
+and sends it with the request to investigate, either as an X-Profile-Token
+header or a profile_token query parameter. That one request runs under
+pyinstrument's statistical profiler and the result is written to
+PROFILE_DIR as a pyinstrument HTML flamegraph or speedscope JSON
+(X-Profile-Format / profile_format). The response carries X-Profile-Id,
+and recent profiles are listed at /api/admin/profiles.
+
+Requests without a token only pay for a header/query-string scan. The
+profiler samples the event loop thread, so async endpoints are profiled in
+full while sync endpoints show up as the await on their threadpool call.
+Only one request is profiled at a time; further tokens are ignored until it
+finishes.
+"""
+
+import asyncio
+import importlib.util
+import json
+import logging
+import os
+import re
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from auth import verify_profiling_token
+from middleware.compression import route_template
+
+# Only imported once a request is actually profiled
+PYINSTRUMENT_AVAILABLE = importlib.util.find_spec("pyinstrument") is not None
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", "profiles"))
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.001"))
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "50"))
+PROFILE_MAX_AGE_HOURS = int(os.getenv("PROFILE_MAX_AGE_HOURS", "72"))
+
+TOKEN_HEADER = b"x-profile-token"
+FORMAT_HEADER = b"x-profile-format"
+TOKEN_PARAM = "profile_token"
+FORMAT_PARAM = "profile_format"
+PROFILE_FORMATS = {"html": ".html", "speedscope": ".speedscope.json"}
+
+PROFILE_ID_RE = re.compile(r"^\d{8}T\d{6}-[0-9a-f]{8}$")
+
+_busy = False
+
+
+def _requested_profile(scope: Scope):
+    """(token, format) when the request asks to be profiled, else None"""
+    token = output_format = None
+    for name, value in scope["headers"]:
+        if name == TOKEN_HEADER:
+            token = value.decode("latin-1")
+        elif name == FORMAT_HEADER:
+            output_format = value.decode("latin-1")
+    query_string = scope.get("query_string", b"")
+    if TOKEN_PARAM.encode() in query_string:
+        params = parse_qs(query_string.decode("latin-1"))
+        token = token or params.get(TOKEN_PARAM, [None])[0]
+        output_format = output_format or params.get(FORMAT_PARAM, [None])[0]
+    if not token:
+        return None
+    return token, output_format if output_format in PROFILE_FORMATS else "html"
+
+
+def _metadata_path(profile_id: str) -> Path:
+    return PROFILE_DIR / f"{profile_id}.meta.json"
+
+
+def _save_profile(profiler, metadata: dict):
+    from pyinstrument.renderers import HTMLRenderer, SpeedscopeRenderer
+
+    renderer = SpeedscopeRenderer() if metadata["format"] == "speedscope" else HTMLRenderer()
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    (PROFILE_DIR / metadata["file"]).write_text(profiler.output(renderer=renderer), encoding="utf-8")
+    _metadata_path(metadata["id"]).write_text(json.dumps(metadata), encoding="utf-8")
+    prune_profiles()
+
+
+def prune_profiles():
+    """Keep the newest PROFILE_MAX_FILES profiles younger than PROFILE_MAX_AGE_HOURS"""
+    cutoff = (datetime.utcnow() - timedelta(hours=PROFILE_MAX_AGE_HOURS)).isoformat()
+    for index, metadata in enumerate(list_profiles()):
+        if index < PROFILE_MAX_FILES and metadata["created_at"] >= cutoff:
+            continue
+        (PROFILE_DIR / metadata["file"]).unlink(missing_ok=True)
+        _metadata_path(metadata["id"]).unlink(missing_ok=True)
+
+
+def list_profiles() -> List[Dict]:
+    """Stored profiles, newest first"""
+    if not PROFILE_DIR.is_dir():
+        return []
+    profiles = []
+    for path in PROFILE_DIR.glob("*.meta.json"):
+        try:
+            profiles.append(json.loads(path.read_text(encoding="utf-8")))
+        except (OSError, ValueError):
+            continue
+    profiles.sort(key=lambda p: p["created_at"], reverse=True)
+    return profiles
+
+
+def get_profile_path(profile_id: str) -> Optional[Path]:
+    """Path of a stored profile's output, or None if it doesn't exist"""
+    if not PROFILE_ID_RE.match(profile_id):
+        return None
+    try:
+        metadata = json.loads(_metadata_path(profile_id).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    path = PROFILE_DIR / metadata["file"]
+    return path if path.is_file() else None
+
+
+class ProfilingMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        global _busy
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        requested = _requested_profile(scope)
+        if requested is None or _busy:
+            await self.app(scope, receive, send)
+            return
+        token, output_format = requested
+        admin_email = verify_profiling_token(token)
+        if admin_email is None:
+            await self.app(scope, receive, send)
+            return
+
+        now = datetime.utcnow()
+        profile_id = f"{now:%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        status_code = 500
+
+        async def send_with_profile_id(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message)["X-Profile-Id"] = profile_id
+            await send(message)
+
+        from pyinstrument import Profiler
+
+        _busy = True
+        profiler = Profiler(interval=PROFILE_INTERVAL, async_mode="enabled")
+        started = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profiler.stop()
+            _busy = False
+            method, _, route = route_template(scope).partition(" ")
+            metadata = {
+                "id": profile_id,
+                "created_at": now.isoformat(),
+                "method": method,
+                "route": route,
+                "path": scope.get("path"),
+                "status": status_code,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+                "format": output_format,
+                "file": profile_id + PROFILE_FORMATS[output_format],
+                "requested_by": admin_email,
+            }
+            try:
+                # Rendering takes a while on big profiles; keep it off the event loop
+                await asyncio.get_running_loop().run_in_executor(None, _save_profile, profiler, metadata)
+            except Exception as e:
+                logger.error(f"Failed to store profile {profile_id}: {e}")
@@ -0,0 +1,182 @@
+"""
+Per-request SQL instrumentation and slow-query log.
+
+Cursor execution hooks on every SQLAlchemy Engine count statements and time
+spent in the database, attributing both to the request being served through
+a context variable (which Starlette copies into the threadpool running sync
+dependencies and endpoints). Totals are aggregated per route template so the
+routes costing the most database time can be found, and statements slower
+than SLOW_QUERY_MS are logged with the shape of their parameters - types and
+counts, never values, so credentials and personal data stay out of the log.
+
+With SQL_DEBUG_HEADERS=1 each response also carries X-DB-Queries and
+X-DB-Time-Ms for the request that produced it.
+"""
+
+import logging
+import os
+import re
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from middleware.compression import route_template
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", "200"))
+SQL_DEBUG_HEADERS = os.getenv("SQL_DEBUG_HEADERS", "").lower() in ("1", "true", "yes")
+
+MAX_STATEMENT_LENGTH = 1000
+MAX_PARAMETER_SHAPES = 20
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_START_KEY = "query_stats_started"
+
+
+class RequestQueries:
+    """Statements and database time accumulated by one request"""
+
+    __slots__ = ("scope", "count", "seconds")
+
+    def __init__(self, scope: Scope):
+        self.scope = scope
+        self.count = 0
+        self.seconds = 0.0
+
+
+_current: ContextVar[Optional[RequestQueries]] = ContextVar("request_queries", default=None)
+
+# Route template -> counters, e.g. "GET /api/jobs/{job_id}"
+QUERY_STATS: Dict[str, Dict] = {}
+SLOW_QUERIES: deque = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+
+
+def normalize_statement(statement: str) -> str:
+    statement = _WHITESPACE_RE.sub(" ", statement).strip()
+    if len(statement) > MAX_STATEMENT_LENGTH:
+        statement = statement[:MAX_STATEMENT_LENGTH] + "..."
+    return statement
+
+
+def _value_shapes(values) -> List[str]:
+    shapes = [type(value).__name__ for value in list(values)[:MAX_PARAMETER_SHAPES]]
+    if len(values) > MAX_PARAMETER_SHAPES:
+        shapes.append(f"... {len(values) - MAX_PARAMETER_SHAPES} more")
+    return shapes
+
+
+def parameter_shape(parameters, executemany: bool):
+    """Describe bound parameters by type and count without their values"""
+    if executemany:
+        rows = list(parameters or [])
+        return {"rows": len(rows), "row": parameter_shape(rows[0], False) if rows else None}
+    if parameters is None:
+        return None
+    if isinstance(parameters, dict):
+        keys = list(parameters)[:MAX_PARAMETER_SHAPES]
+        return {key: type(parameters[key]).__name__ for key in keys}
+    return _value_shapes(parameters)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault(_START_KEY, []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info[_START_KEY].pop()
+    elapsed = time.perf_counter() - started
+
+    current = _current.get()
+    if current is not None:
+        current.count += 1
+        current.seconds += elapsed
+
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        route = route_template(current.scope) if current is not None else "background"
+        entry = {
+            "at": time.time(),
+            "route": route,
+            "duration_ms": round(elapsed * 1000, 3),
+            "statement": normalize_statement(statement),
+            "parameters": parameter_shape(parameters, executemany),
+        }
+        SLOW_QUERIES.append(entry)
+        logger.warning(
+            "Slow query (%.1f ms) on %s: %s params=%s",
+            entry["duration_ms"], route, entry["statement"], entry["parameters"],
+        )
+
+
+def _record(label: str, queries: RequestQueries):
+    stats = QUERY_STATS.setdefault(label, {
+        "requests": 0,
+        "queries": 0,
+        "db_seconds": 0.0,
+        "max_queries": 0,
+        "max_db_seconds": 0.0,
+    })
+    stats["requests"] += 1
+    stats["queries"] += queries.count
+    stats["db_seconds"] += queries.seconds
+    stats["max_queries"] = max(stats["max_queries"], queries.count)
+    stats["max_db_seconds"] = max(stats["max_db_seconds"], queries.seconds)
+
+
+def get_query_stats(limit: int = 20) -> List[Dict]:
+    """Per-route statement counts and database time, most total time first"""
+    results = []
+    for label, stats in QUERY_STATS.items():
+        results.append({
+            "route": label,
+            "requests": stats["requests"],
+            "queries": stats["queries"],
+            "db_ms": round(stats["db_seconds"] * 1000, 3),
+            "avg_queries": round(stats["queries"] / stats["requests"], 2),
+            "avg_db_ms": round(stats["db_seconds"] * 1000 / stats["requests"], 3),
+            "max_queries": stats["max_queries"],
+            "max_db_ms": round(stats["max_db_seconds"] * 1000, 3),
+        })
+    results.sort(key=lambda r: r["db_ms"], reverse=True)
+    return results[:limit]
+
+
+def get_slow_queries(limit: int = 50) -> List[Dict]:
+    """Most recent slow statements, newest first"""
+    return list(reversed(SLOW_QUERIES))[:limit]
+
+
+class QueryStatsMiddleware:
+    def __init__(self, app: ASGIApp, debug_headers: bool = SQL_DEBUG_HEADERS) -> None:
+        self.app = app
+        self.debug_headers = debug_headers
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        queries = RequestQueries(scope)
+        token = _current.set(queries)
+
+        async def send_with_totals(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["X-DB-Queries"] = str(queries.count)
+                headers["X-DB-Time-Ms"] = f"{queries.seconds * 1000:.3f}"
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_totals if self.debug_headers else send)
+        finally:
+            _current.reset(token)
+            _record(route_template(scope), queries)
@@ -0,0 +1,22 @@
+"""
+Identify the caller of each request for read/write session routing.
+"""
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from services.db_routing import caller_key, request_caller
+
+
+class ReadYourWritesMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = request_caller.set(caller_key(scope))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_caller.reset(token)
@@ -0,0 +1,142 @@
+"""
+Cache-aware static file serving for /uploads.
+
+Content-addressed blobs (see utils/file_utils) never change under a given
+name, so they are served with a one-year immutable Cache-Control and an ETag
+derived from their SHA-256; HLS ladders, stored under their source's hash,
+are cached the same way. Precompressed .br/.gz siblings written at upload
+time are negotiated from Accept-Encoding, and large bodies are handed to the
+server's zero-copy/pathsend extension when it offers one.
+"""
+
+import os
+import re
+from mimetypes import guess_type
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles, NotModifiedResponse
+from starlette.types import Scope, Receive, Send
+
+from middleware.compression import parse_accept_encoding
+from utils.file_utils import COMPRESSIBLE_EXTENSIONS
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+DEFAULT_CACHE_CONTROL = "public, max-age=86400"
+
+# Bodies at least this large skip the chunked read loop when possible
+SENDFILE_THRESHOLD = int(os.getenv("UPLOADS_SENDFILE_THRESHOLD", str(1024 * 1024)))
+LARGE_CHUNK_SIZE = 1024 * 1024
+
+# <sha256>.<ext> blobs and their <sha256>_w<width>.<ext> image variants
+CONTENT_NAME_RE = re.compile(r"^([0-9a-f]{64}(?:_w\d+)?)\.")
+# HLS ladders live under hls/<source sha256>/ and never change once published
+HLS_PATH_RE = re.compile(r"(?:^|/)hls/[0-9a-f]{64}/")
+HLS_MEDIA_TYPES = {
+    ".m3u8": "application/vnd.apple.mpegurl",
+    ".ts": "video/mp2t",
+}
+
+# Preferred first
+PRECOMPRESSED_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+class UploadFileResponse(FileResponse):
+    """FileResponse that avoids the 64KB read loop for large bodies"""
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        size = self.stat_result.st_size if self.stat_result is not None else 0
+        extensions = scope.get("extensions") or {}
+
+        if self.send_header_only or size < SENDFILE_THRESHOLD:
+            await super().__call__(scope, receive, send)
+            return
+
+        if "http.response.pathsend" in extensions:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            await send({"type": "http.response.pathsend", "path": str(self.path)})
+        elif "http.response.zerocopysend" in extensions:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            with open(self.path, "rb") as file:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file.fileno(),
+                    "count": size,
+                    "more_body": False,
+                })
+        else:
+            # Server has no sendfile extension (e.g. uvicorn); use fewer, larger reads
+            self.chunk_size = LARGE_CHUNK_SIZE
+            await super().__call__(scope, receive, send)
+            return
+
+        if self.background is not None:
+            await self.background()
+
+
+class UploadStaticFiles(StaticFiles):
+    """StaticFiles with long-lived caching, strong ETags and precompressed siblings"""
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        name = os.path.basename(full_path)
+        content_name = CONTENT_NAME_RE.match(name)
+        hls_file = HLS_PATH_RE.search(str(full_path).replace(os.sep, "/"))
+
+        headers = {
+            "cache-control": IMMUTABLE_CACHE_CONTROL if content_name or hls_file else DEFAULT_CACHE_CONTROL,
+        }
+        extension = os.path.splitext(name)[1].lower()
+        media_type = HLS_MEDIA_TYPES.get(extension) or guess_type(name)[0] or "text/plain"
+
+        serve_path, serve_stat, encoding = full_path, stat_result, None
+        if extension in COMPRESSIBLE_EXTENSIONS:
+            headers["vary"] = "Accept-Encoding"
+            accepted = parse_accept_encoding(request_headers.get("accept-encoding", ""))
+            for coding, suffix in PRECOMPRESSED_ENCODINGS:
+                if coding not in accepted:
+                    continue
+                try:
+                    sibling_stat = os.stat(f"{full_path}{suffix}")
+                except OSError:
+                    continue
+                serve_path, serve_stat, encoding = f"{full_path}{suffix}", sibling_stat, coding
+                headers["content-encoding"] = coding
+                break
+
+        if content_name:
+            # The name is the content hash, so the tag is strong by construction
+            tag = content_name.group(1)
+        else:
+            tag = f"{int(serve_stat.st_mtime_ns)}-{serve_stat.st_size}"
+        headers["etag"] = f'"{tag}-{encoding}"' if encoding else f'"{tag}"'
+
+        response = UploadFileResponse(
+            serve_path,
+            status_code=status_code,
+            headers=headers,
+            media_type=media_type,
+            stat_result=serve_stat,
+            method=scope["method"],
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+    def is_not_modified(self, response_headers: Headers, request_headers: Headers) -> bool:
+        """Match If-None-Match lists (and W/ prefixes) before falling back to dates"""
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is None:
+            return super().is_not_modified(response_headers, request_headers)
+
+        etag = response_headers.get("etag", "")
+        if if_none_match.strip() == "*":
+            return True
+        candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return etag.removeprefix("W/") in candidates
@@ -0,0 +1,58 @@
+from sqlalchemy import create_engine, text
+
+DATABASE_URL = "sqlite:///./architecture_academics.db"
+
+# Denormalized review aggregates stored on courses
+RATING_COLUMNS = [
+    ("rating_sum", "INTEGER NOT NULL DEFAULT 0"),
+    ("rating_count", "INTEGER NOT NULL DEFAULT 0"),
+    ("rating_avg", "FLOAT"),
+    ("rating_1_count", "INTEGER NOT NULL DEFAULT 0"),
+    ("rating_2_count", "INTEGER NOT NULL DEFAULT 0"),
+    ("rating_3_count", "INTEGER NOT NULL DEFAULT 0"),
+    ("rating_4_count", "INTEGER NOT NULL DEFAULT 0"),
+    ("rating_5_count", "INTEGER NOT NULL DEFAULT 0"),
+]
+
+BACKFILL_SQL = """
+UPDATE courses SET
+    rating_sum = COALESCE((SELECT SUM(rating) FROM course_reviews WHERE course_id = courses.id), 0),
+    rating_count = (SELECT COUNT(*) FROM course_reviews WHERE course_id = courses.id),
+    rating_avg = (SELECT AVG(rating) FROM course_reviews WHERE course_id = courses.id),
+    rating_1_count = (SELECT COUNT(*) FROM course_reviews WHERE course_id = courses.id AND rating = 1),
+    rating_2_count = (SELECT COUNT(*) FROM course_reviews WHERE course_id = courses.id AND rating = 2),
+    rating_3_count = (SELECT COUNT(*) FROM course_reviews WHERE course_id = courses.id AND rating = 3),
+    rating_4_count = (SELECT COUNT(*) FROM course_reviews WHERE course_id = courses.id AND rating = 4),
+    rating_5_count = (SELECT COUNT(*) FROM course_reviews WHERE course_id = courses.id AND rating = 5)
+"""
+
+def migrate():
+    print("Starting migration to add course rating aggregates...")
+
+    engine = create_engine(DATABASE_URL)
+
+    with engine.begin() as connection:
+        try:
+            result = connection.execute(text("PRAGMA table_info(courses)"))
+            columns = [row[1] for row in result]
+
+            for column, ddl in RATING_COLUMNS:
+                if column not in columns:
+                    print(f"Adding courses.{column} column...")
+                    connection.execute(text(f"ALTER TABLE courses ADD COLUMN {column} {ddl}"))
+                else:
+                    print(f"Column courses.{column} already exists.")
+
+            print("Creating rating sort index...")
+            connection.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_courses_status_rating ON courses (status, rating_avg, rating_count)"
+            ))
+
+            print("Backfilling rating aggregates from course_reviews...")
+            connection.execute(text(BACKFILL_SQL))
+            print("Migration completed successfully.")
+        except Exception as e:
+            print(f"An error occurred: {e}")
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,54 @@
+from sqlalchemy import create_engine, text
+
+DATABASE_URL = "sqlite:///./architecture_academics.db"
+
+# Derive every enrollment's progress from its lesson progress rows
+RECOMPUTE_SQL = """
+UPDATE course_enrollments SET
+    completed_lessons = (
+        SELECT COUNT(*) FROM lesson_progress
+        JOIN course_lessons ON course_lessons.id = lesson_progress.lesson_id
+        WHERE lesson_progress.enrollment_id = course_enrollments.id
+        AND course_lessons.course_id = course_enrollments.course_id
+        AND lesson_progress.completed = 1
+    )
+"""
+
+PERCENTAGE_SQL = """
+UPDATE course_enrollments SET
+    progress_percentage = CASE
+        WHEN (SELECT COUNT(*) FROM course_lessons WHERE course_id = course_enrollments.course_id) = 0 THEN 0
+        ELSE ROUND(completed_lessons * 100.0 /
+            (SELECT COUNT(*) FROM course_lessons WHERE course_id = course_enrollments.course_id), 2)
+    END,
+    completed = (SELECT COUNT(*) FROM course_lessons WHERE course_id = course_enrollments.course_id) > 0
+        AND completed_lessons >= (SELECT COUNT(*) FROM course_lessons WHERE course_id = course_enrollments.course_id)
+"""
+
+def migrate():
+    print("Starting migration to add server-side enrollment progress...")
+
+    engine = create_engine(DATABASE_URL)
+
+    with engine.begin() as connection:
+        try:
+            result = connection.execute(text("PRAGMA table_info(course_enrollments)"))
+            columns = [row[1] for row in result]
+
+            if "completed_lessons" not in columns:
+                print("Adding course_enrollments.completed_lessons column...")
+                connection.execute(text(
+                    "ALTER TABLE course_enrollments ADD COLUMN completed_lessons INTEGER NOT NULL DEFAULT 0"
+                ))
+            else:
+                print("Column course_enrollments.completed_lessons already exists.")
+
+            print("Recomputing enrollment progress from lesson progress...")
+            connection.execute(text(RECOMPUTE_SQL))
+            connection.execute(text(PERCENTAGE_SQL))
+            print("Migration completed successfully.")
+        except Exception as e:
+            print(f"An error occurred: {e}")
+
+if __name__ == "__main__":
+    migrate()
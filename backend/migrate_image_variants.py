@@ -0,0 +1,36 @@
+from sqlalchemy import create_engine, text
+
+DATABASE_URL = "sqlite:///./architecture_academics.db"
+
+# (table, column) pairs holding JSON lists of resized image variants
+VARIANT_COLUMNS = [
+    ("users", "profile_image_variants"),
+    ("courses", "image_variants"),
+    ("events", "image_variants"),
+    ("blogs", "featured_image_variants"),
+]
+
+def migrate():
+    print("Starting migration to add image variant columns...")
+    
+    engine = create_engine(DATABASE_URL)
+    
+    with engine.begin() as connection:
+        for table, column in VARIANT_COLUMNS:
+            try:
+                # Check if column exists
+                result = connection.execute(text(f"PRAGMA table_info({table})"))
+                columns = [row[1] for row in result]
+                
+                if column not in columns:
+                    print(f"Adding {table}.{column} column...")
+                    connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} TEXT"))
+                    print("Column added successfully.")
+                else:
+                    print(f"Column {table}.{column} already exists.")
+                    
+            except Exception as e:
+                print(f"An error occurred: {e}")
+
+if __name__ == "__main__":
+    migrate()
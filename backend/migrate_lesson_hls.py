@@ -0,0 +1,35 @@
+from sqlalchemy import create_engine, text
+
+DATABASE_URL = "sqlite:///./architecture_academics.db"
+
+# HLS packaging state recorded on each lesson
+HLS_COLUMNS = [
+    ("hls_status", "VARCHAR"),
+    ("hls_playlist_url", "VARCHAR"),
+    ("hls_renditions", "TEXT"),
+]
+
+def migrate():
+    print("Starting migration to add HLS columns to course_lessons...")
+
+    engine = create_engine(DATABASE_URL)
+
+    with engine.begin() as connection:
+        try:
+            result = connection.execute(text("PRAGMA table_info(course_lessons)"))
+            columns = [row[1] for row in result]
+
+            for column, ddl in HLS_COLUMNS:
+                if column not in columns:
+                    print(f"Adding course_lessons.{column} column...")
+                    connection.execute(text(f"ALTER TABLE course_lessons ADD COLUMN {column} {ddl}"))
+                else:
+                    print(f"Column course_lessons.{column} already exists.")
+
+            print("Migration completed successfully.")
+            print("Queue existing uploads with POST /api/admin/lessons/{lesson_id}/hls.")
+        except Exception as e:
+            print(f"An error occurred: {e}")
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,53 @@
+"""
+Database migration script for lesson progress
+Merges duplicate (enrollment_id, lesson_id) rows and adds the unique index
+that batched heartbeat flushes upsert against
+"""
+import sqlite3
+from pathlib import Path
+
+DB_PATH = Path(__file__).parent / "architecture_academics.db"
+
+INDEX_NAME = "uq_lesson_progress_enrollment_id_lesson_id"
+
+def migrate_database():
+    """Deduplicate lesson progress rows and enforce uniqueness"""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    try:
+        # The newest row per pair survives, but a completion on any duplicate is kept
+        cursor.execute("""
+            UPDATE lesson_progress
+            SET completed = 1
+            WHERE id IN (SELECT MAX(id) FROM lesson_progress GROUP BY enrollment_id, lesson_id)
+            AND EXISTS (
+                SELECT 1 FROM lesson_progress AS dup
+                WHERE dup.enrollment_id = lesson_progress.enrollment_id
+                AND dup.lesson_id = lesson_progress.lesson_id
+                AND dup.completed = 1
+            )
+        """)
+        cursor.execute("""
+            DELETE FROM lesson_progress
+            WHERE id NOT IN (
+                SELECT MAX(id) FROM lesson_progress GROUP BY enrollment_id, lesson_id
+            )
+        """)
+        removed = cursor.rowcount
+
+        cursor.execute(
+            f"CREATE UNIQUE INDEX IF NOT EXISTS {INDEX_NAME} ON lesson_progress (enrollment_id, lesson_id)"
+        )
+        conn.commit()
+        print(f"✅ lesson_progress: removed {removed} duplicate rows, unique index {INDEX_NAME} in place")
+
+    except Exception as e:
+        print(f"❌ Error migrating lesson_progress: {e}")
+        conn.rollback()
+
+    conn.close()
+
+if __name__ == "__main__":
+    print("Starting lesson progress constraint migration...")
+    migrate_database()
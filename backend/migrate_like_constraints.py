@@ -0,0 +1,57 @@
+"""
+Database migration script for like tables
+Removes duplicate like rows, adds unique (target_id, user_id) indexes
+and recomputes the denormalized likes_count columns
+"""
+import sqlite3
+from pathlib import Path
+
+DB_PATH = Path(__file__).parent / "architecture_academics.db"
+
+# (like table, target column, parent table)
+LIKE_TABLES = [
+    ("blog_likes", "blog_id", "blogs"),
+    ("comment_likes", "comment_id", "blog_comments"),
+    ("discussion_likes", "discussion_id", "discussions"),
+    ("discussion_reply_likes", "reply_id", "discussion_replies"),
+]
+
+def migrate_database():
+    """Deduplicate likes, enforce uniqueness and repair like counters"""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    for table, column, parent in LIKE_TABLES:
+        try:
+            # Keep the oldest like per (target, user) pair
+            cursor.execute(f"""
+                DELETE FROM {table}
+                WHERE id NOT IN (
+                    SELECT MIN(id) FROM {table} GROUP BY {column}, user_id
+                )
+            """)
+            removed = cursor.rowcount
+
+            index_name = f"uq_{table}_{column}_user_id"
+            cursor.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {index_name} ON {table} ({column}, user_id)")
+
+            # Recompute counters from the like rows
+            cursor.execute(f"""
+                UPDATE {parent}
+                SET likes_count = (
+                    SELECT COUNT(*) FROM {table} WHERE {table}.{column} = {parent}.id
+                )
+            """)
+            conn.commit()
+            print(f"✅ {table}: removed {removed} duplicate likes, unique index {index_name} in place")
+
+        except Exception as e:
+            print(f"❌ Error migrating {table}: {e}")
+            conn.rollback()
+
+    conn.close()
+    print("\n✅ Like constraint migration completed!")
+
+if __name__ == "__main__":
+    print("Starting like constraint migration...")
+    migrate_database()
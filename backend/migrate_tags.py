@@ -0,0 +1,27 @@
+"""
+Database migration script for normalized tags
+Creates the tags, entity_tags and tag_counts tables if needed and fills
+them from the comma-separated tags strings on jobs, blogs and discussions.
+Safe to rerun: existing association rows and counts are rebuilt.
+"""
+from database import SessionLocal, Base, engine
+from services.tags import backfill_tags
+
+def migrate():
+    print("Starting migration to normalized tags...")
+    Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    try:
+        tagged = backfill_tags(db)
+        for entity_type, count in tagged.items():
+            print(f"Tagged {count} {entity_type} rows")
+        print("Migration completed successfully.")
+    except Exception as e:
+        db.rollback()
+        print(f"An error occurred: {e}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    migrate()
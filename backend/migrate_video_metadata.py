@@ -0,0 +1,51 @@
+from sqlalchemy import create_engine, text
+
+DATABASE_URL = "sqlite:///./architecture_academics.db"
+
+# Probed video metadata stored on each lesson
+LESSON_COLUMNS = [
+    ("video_width", "INTEGER"),
+    ("video_height", "INTEGER"),
+    ("video_bitrate", "INTEGER"),
+    ("video_codec", "VARCHAR"),
+    ("video_probed_at", "DATETIME"),
+]
+
+BACKFILL_SQL = """
+UPDATE courses SET
+    total_video_duration = COALESCE((SELECT SUM(video_duration) FROM course_lessons WHERE course_id = courses.id), 0)
+"""
+
+def migrate():
+    print("Starting migration to add video metadata columns...")
+
+    engine = create_engine(DATABASE_URL)
+
+    with engine.begin() as connection:
+        try:
+            result = connection.execute(text("PRAGMA table_info(course_lessons)"))
+            columns = [row[1] for row in result]
+
+            for column, ddl in LESSON_COLUMNS:
+                if column not in columns:
+                    print(f"Adding course_lessons.{column} column...")
+                    connection.execute(text(f"ALTER TABLE course_lessons ADD COLUMN {column} {ddl}"))
+                else:
+                    print(f"Column course_lessons.{column} already exists.")
+
+            result = connection.execute(text("PRAGMA table_info(courses)"))
+            if "total_video_duration" not in [row[1] for row in result]:
+                print("Adding courses.total_video_duration column...")
+                connection.execute(text("ALTER TABLE courses ADD COLUMN total_video_duration INTEGER NOT NULL DEFAULT 0"))
+            else:
+                print("Column courses.total_video_duration already exists.")
+
+            print("Backfilling course durations from lesson durations...")
+            connection.execute(text(BACKFILL_SQL))
+            print("Migration completed successfully.")
+            print("Probe existing videos with POST /api/admin/lessons/probe-videos.")
+        except Exception as e:
+            print(f"An error occurred: {e}")
+
+if __name__ == "__main__":
+    migrate()
@@ -1,52 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Form, BackgroundTasks
+from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 from typing import Optional, List
 from pathlib import Path
 from datetime import datetime
-import shutil
 
 import crud
 import schemas
 from database import get_db, User, Job, Event, Workshop, Course, SystemSettings, EventRegistration, WorkshopRegistration, CourseLesson
 from routes.auth_routes import get_current_admin
 from aws_s3 import s3_manager
+from services.image_service import process_uploaded_image, release_image
+from services.db_routing import get_db_routing_stats
+from services.job_recommendations import get_job_index_stats
+from services.related_content import submit_rebuild, get_related_content_stats
+from services.backup_service import submit_backup, get_backup_job, list_backup_jobs, list_backups
+from services.video_service import submit_hls_job, submit_video_probe, get_hls_job, list_hls_jobs, release_hls_output
+from utils.file_utils import save_uploaded_file, delete_uploaded_file
+from middleware.compression import get_compression_stats
+from middleware.query_stats import get_query_stats, get_slow_queries
+from middleware.profiling import PYINSTRUMENT_AVAILABLE, TOKEN_PARAM, list_profiles, get_profile_path
+from auth import create_profiling_token, PROFILING_TOKEN_EXPIRE_MINUTES
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
-# File upload utilities
+# Upload directories
 UPLOAD_DIR = Path("uploads")
 VIDEO_DIR = UPLOAD_DIR / "videos"
 MATERIAL_DIR = UPLOAD_DIR / "materials"
 VIDEO_DIR.mkdir(exist_ok=True)
 MATERIAL_DIR.mkdir(exist_ok=True)
 
-def save_uploaded_file(file: UploadFile, directory: Path) -> str:
-    """Save uploaded file and return the file path"""
-    import uuid
-    # Generate unique filename
-    file_extension = file.filename.split(".")[-1] if "." in file.filename else ""
-    unique_filename = f"{uuid.uuid4()}.{file_extension}"
-    file_path = directory / unique_filename
-    
-    # Save file
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    
-    # Return relative path for URL
-    return f"/uploads/{directory.name}/{unique_filename}"
-
-def delete_uploaded_file(file_path: str) -> bool:
-    """Delete uploaded file"""
-    try:
-        if file_path.startswith("/uploads/"):
-            full_path = Path("." + file_path)
-            if full_path.exists():
-                full_path.unlink()
-                return True
-    except Exception:
-        pass
-    return False
-
 # Dashboard Stats
 @router.get("/stats")
 async def get_admin_dashboard_stats(
@@ -56,6 +40,81 @@ async def get_admin_dashboard_stats(
     """Get admin dashboard statistics"""
     return crud.get_admin_stats(db)
 
+@router.get("/compression-stats")
+async def get_admin_compression_stats(
+    current_user: User = Depends(get_current_admin)
+):
+    """Get per-route response compression ratio and time"""
+    return get_compression_stats()
+
+@router.get("/query-stats")
+async def get_admin_query_stats(
+    limit: int = Query(20, ge=1, le=200),
+    current_user: User = Depends(get_current_admin)
+):
+    """Get the routes spending the most total time in the database, plus recent slow queries"""
+    return {
+        "routes": get_query_stats(limit),
+        "slow_queries": get_slow_queries(limit),
+        "db_routing": get_db_routing_stats(),
+    }
+
+@router.get("/recommendation-index")
+async def get_admin_recommendation_index(
+    current_user: User = Depends(get_current_admin)
+):
+    """Get the size and freshness of the job recommendation index"""
+    return get_job_index_stats()
+
+@router.get("/related-content")
+async def get_admin_related_content(
+    current_user: User = Depends(get_current_admin)
+):
+    """Get related-content index size and refresh counters"""
+    return get_related_content_stats()
+
+@router.post("/related-content/rebuild")
+async def rebuild_related_content(
+    current_user: User = Depends(get_current_admin)
+):
+    """Queue a full rebuild of the related-content lists"""
+    submit_rebuild()
+    return {"message": "Related content rebuild queued", "stats": get_related_content_stats()}
+
+@router.post("/profiles/token")
+async def create_admin_profiling_token(
+    current_user: User = Depends(get_current_admin)
+):
+    """Issue a short-lived token that profiles any request carrying it"""
+    if not PYINSTRUMENT_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Profiling is unavailable: pyinstrument is not installed")
+    return {
+        "token": create_profiling_token(current_user.email),
+        "expires_in": PROFILING_TOKEN_EXPIRE_MINUTES * 60,
+        "header": "X-Profile-Token",
+        "query_param": TOKEN_PARAM,
+        "formats": ["html", "speedscope"],
+    }
+
+@router.get("/profiles")
+async def get_admin_profiles(
+    current_user: User = Depends(get_current_admin)
+):
+    """List recently captured request profiles, newest first"""
+    return list_profiles()
+
+@router.get("/profiles/{profile_id}")
+async def download_admin_profile(
+    profile_id: str,
+    current_user: User = Depends(get_current_admin)
+):
+    """Download a captured profile (HTML flamegraph or speedscope JSON)"""
+    path = get_profile_path(profile_id)
+    if not path:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    media_type = "text/html" if path.suffix == ".html" else "application/json"
+    return FileResponse(path, media_type=media_type, filename=path.name)
+
 # ==================== JOB MANAGEMENT ====================
 
 @router.get("/jobs", response_model=List[schemas.JobResponse])
@@ -268,6 +327,45 @@ async def create_admin_course(
     """Create a new course"""
     return crud.create_course(db, course)
 
+@router.post("/courses/ratings/recompute")
+async def recompute_admin_course_ratings(
+    db: Session = Depends(get_db),
+    current_admin: User = Depends(get_current_admin)
+):
+    """Rebuild every course's stored rating aggregates from its reviews"""
+    updated = crud.recompute_course_rating_aggregates(db)
+    return {"message": "Course ratings recomputed", "courses_updated": updated}
+
+@router.post("/courses/progress/recompute")
+async def recompute_admin_enrollment_progress(
+    db: Session = Depends(get_db),
+    current_admin: User = Depends(get_current_admin)
+):
+    """Rebuild every enrollment's progress from its lesson progress rows"""
+    updated = crud.recompute_enrollment_progress(db)
+    return {"message": "Enrollment progress recomputed", "enrollments_updated": updated}
+
+@router.post("/courses/durations/recompute")
+async def recompute_admin_course_durations(
+    db: Session = Depends(get_db),
+    current_admin: User = Depends(get_current_admin)
+):
+    """Re-aggregate every course's total video duration from its lessons"""
+    updated = crud.recompute_course_video_durations(db)
+    return {"message": "Course durations recomputed", "courses_updated": updated}
+
+@router.post("/lessons/probe-videos")
+async def probe_admin_lesson_videos(
+    db: Session = Depends(get_db),
+    current_admin: User = Depends(get_current_admin)
+):
+    """Queue metadata extraction for every lesson video that hasn't been probed"""
+    queued = sum(
+        submit_video_probe(lesson.id, lesson.video_url)
+        for lesson in crud.get_lessons_missing_video_metadata(db)
+    )
+    return {"message": "Video probes queued", "lessons_queued": queued}
+
 @router.get("/courses/{course_id}", response_model=schemas.CourseDetailResponse)
 async def get_admin_course(
     course_id: int,
@@ -293,6 +391,28 @@ async def update_admin_course(
         raise HTTPException(status_code=404, detail="Course not found")
     return course
 
+@router.post("/courses/{course_id}/image", response_model=schemas.CourseResponse)
+async def upload_admin_course_image(
+    course_id: int,
+    background_tasks: BackgroundTasks,
+    image_file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_admin: User = Depends(get_current_admin)
+):
+    """Upload course image; resized variants are generated in the background"""
+    if not image_file.content_type or not image_file.content_type.startswith("image/"):
+        raise HTTPException(status_code=400, detail="File must be an image")
+    course = db.query(Course).filter(Course.id == course_id).first()
+    if not course:
+        raise HTTPException(status_code=404, detail="Course not found")
+    previous_image = (course.image_url, course.image_variants)
+    
+    image_url = save_uploaded_file(db, image_file)
+    course = crud.update_course(db, course_id, schemas.CourseUpdate(image_url=image_url))
+    release_image(db, *previous_image)
+    background_tasks.add_task(process_uploaded_image, "course", course_id, image_url)
+    return course
+
 @router.delete("/courses/{course_id}")
 async def delete_admin_course(
     course_id: int,
@@ -359,7 +479,7 @@ async def create_course_lesson(
                 detail="Video file too large. Maximum size: 500MB"
             )
         
-        video_url = save_uploaded_file(video_file, VIDEO_DIR)
+        video_url = save_uploaded_file(db, video_file)
     
     # Create lesson
     lesson_data = schemas.CourseLessonCreate(
@@ -372,7 +492,10 @@ async def create_course_lesson(
         course_id=course_id
     )
     
-    return crud.create_course_lesson(db, lesson_data, video_url)
+    lesson = crud.create_course_lesson(db, lesson_data, video_url)
+    if video_url and submit_hls_job(lesson.id, video_url):
+        db.refresh(lesson)
+    return lesson
 
 @router.put("/lessons/{lesson_id}", response_model=schemas.CourseLessonResponse)
 async def update_course_lesson(
@@ -405,11 +528,14 @@ async def update_course_lesson(
                 detail=f"Invalid video format. Allowed: {', '.join(allowed_extensions)}"
             )
         
-        # Delete old video file
-        if lesson.video_url:
-            delete_uploaded_file(lesson.video_url)
+        video_url = save_uploaded_file(db, video_file)
         
-        video_url = save_uploaded_file(video_file, VIDEO_DIR)
+        # Release old video file
+        if lesson.video_url and lesson.video_url != video_url:
+            delete_uploaded_file(db, lesson.video_url)
+    
+    old_video_url = lesson.video_url
+    old_hls_url = lesson.hls_playlist_url
     
     # Create update object with only non-None values
     update_data = {}
@@ -427,7 +553,12 @@ async def update_course_lesson(
         update_data["transcript"] = transcript
     
     lesson_update = schemas.CourseLessonUpdate(**update_data)
-    return crud.update_course_lesson(db, lesson_id, lesson_update, video_url)
+    lesson = crud.update_course_lesson(db, lesson_id, lesson_update, video_url)
+    if video_url and video_url != old_video_url:
+        release_hls_output(db, old_hls_url)
+        if submit_hls_job(lesson.id, video_url):
+            db.refresh(lesson)
+    return lesson
 
 @router.delete("/lessons/{lesson_id}")
 async def delete_course_lesson(
@@ -440,16 +571,53 @@ async def delete_course_lesson(
     if not lesson:
         raise HTTPException(status_code=404, detail="Lesson not found")
     
-    # Delete video file
+    # Release video file
     if lesson.video_url:
-        delete_uploaded_file(lesson.video_url)
+        delete_uploaded_file(db, lesson.video_url)
+    hls_url = lesson.hls_playlist_url
     
     success = crud.delete_course_lesson(db, lesson_id)
     if not success:
         raise HTTPException(status_code=404, detail="Lesson not found")
+    release_hls_output(db, hls_url)
     
     return {"message": "Lesson deleted successfully"}
 
+@router.post("/lessons/{lesson_id}/hls")
+async def package_lesson_hls(
+    lesson_id: int,
+    db: Session = Depends(get_db),
+    current_admin: User = Depends(get_current_admin)
+):
+    """Queue (re)packaging of a lesson's uploaded video as an HLS ladder"""
+    lesson = crud.get_lesson_by_id(db, lesson_id)
+    if not lesson:
+        raise HTTPException(status_code=404, detail="Lesson not found")
+    
+    job = submit_hls_job(lesson.id, lesson.video_url)
+    if not job:
+        raise HTTPException(status_code=400, detail="Lesson has no uploaded video to package")
+    return job
+
+@router.get("/video-jobs")
+async def get_video_jobs(
+    lesson_id: Optional[int] = None,
+    current_admin: User = Depends(get_current_admin)
+):
+    """List recent HLS packaging jobs with their progress"""
+    return list_hls_jobs(lesson_id)
+
+@router.get("/video-jobs/{job_id}")
+async def get_video_job(
+    job_id: str,
+    current_admin: User = Depends(get_current_admin)
+):
+    """Get progress of an HLS packaging job"""
+    job = get_hls_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
 # ==================== USER MANAGEMENT ====================
 
 @router.get("/users", response_model=List[schemas.UserResponse])
@@ -565,6 +733,28 @@ async def admin_update_event(
         raise HTTPException(status_code=404, detail="Event not found")
     return updated_event
 
+@router.post("/events/{event_id}/image", response_model=schemas.EventResponse)
+async def admin_upload_event_image(
+    event_id: int,
+    background_tasks: BackgroundTasks,
+    image_file: UploadFile = File(...),
+    current_user: User = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """Upload event image; resized variants are generated in the background"""
+    if not image_file.content_type or not image_file.content_type.startswith("image/"):
+        raise HTTPException(status_code=400, detail="File must be an image")
+    event = crud.get_event(db, event_id)
+    if not event:
+        raise HTTPException(status_code=404, detail="Event not found")
+    previous_image = (event.image_url, event.image_variants)
+    
+    image_url = save_uploaded_file(db, image_file)
+    updated_event = crud.update_event(db, event_id, schemas.EventUpdate(image_url=image_url))
+    release_image(db, *previous_image)
+    background_tasks.add_task(process_uploaded_image, "event", event_id, image_url)
+    return updated_event
+
 @router.delete("/events/{event_id}")
 async def admin_delete_event(
     event_id: int,
@@ -590,26 +780,28 @@ async def admin_get_event_registrations(
         raise HTTPException(status_code=404, detail="Event not found")
     
     # Get all registrations with user details
-    registrations = db.query(EventRegistration).filter(
-        EventRegistration.event_id == event_id
-    ).all()
+    registrations = (
+        db.query(EventRegistration, User)
+        .join(User, User.id == EventRegistration.participant_id)
+        .filter(EventRegistration.event_id == event_id)
+        .order_by(EventRegistration.id)
+        .all()
+    )
     
     result = []
-    for reg in registrations:
-        user = db.query(User).filter(User.id == reg.participant_id).first()
-        if user:
-            result.append({
-                "registration_id": reg.id,
-                "registered_at": reg.registered_at,
-                "attended": reg.attended,
-                "user": {
-                    "id": user.id,
-                    "email": user.email,
-                    "first_name": user.first_name,
-                    "last_name": user.last_name,
-                    "full_name": f"{user.first_name} {user.last_name}"
-                }
-            })
+    for reg, user in registrations:
+        result.append({
+            "registration_id": reg.id,
+            "registered_at": reg.registered_at,
+            "attended": reg.attended,
+            "user": {
+                "id": user.id,
+                "email": user.email,
+                "first_name": user.first_name,
+                "last_name": user.last_name,
+                "full_name": f"{user.first_name} {user.last_name}"
+            }
+        })
     
     return {
         "event_id": event_id,
@@ -693,26 +885,28 @@ async def admin_get_workshop_registrations(
         raise HTTPException(status_code=404, detail="Workshop not found")
     
     # Get all registrations with user details
-    registrations = db.query(WorkshopRegistration).filter(
-        WorkshopRegistration.workshop_id == workshop_id
-    ).all()
+    registrations = (
+        db.query(WorkshopRegistration, User)
+        .join(User, User.id == WorkshopRegistration.participant_id)
+        .filter(WorkshopRegistration.workshop_id == workshop_id)
+        .order_by(WorkshopRegistration.id)
+        .all()
+    )
     
     result = []
-    for reg in registrations:
-        user = db.query(User).filter(User.id == reg.participant_id).first()
-        if user:
-            result.append({
-                "registration_id": reg.id,
-                "registered_at": reg.registered_at,
-                "attended": reg.attended,
-                "user": {
-                    "id": user.id,
-                    "email": user.email,
-                    "first_name": user.first_name,
-                    "last_name": user.last_name,
-                    "full_name": f"{user.first_name} {user.last_name}"
-                }
-            })
+    for reg, user in registrations:
+        result.append({
+            "registration_id": reg.id,
+            "registered_at": reg.registered_at,
+            "attended": reg.attended,
+            "user": {
+                "id": user.id,
+                "email": user.email,
+                "first_name": user.first_name,
+                "last_name": user.last_name,
+                "full_name": f"{user.first_name} {user.last_name}"
+            }
+        })
     
     return {
         "workshop_id": workshop_id,
@@ -816,7 +1010,7 @@ async def get_admin_settings(
             "storage_used": "Calculating...",
             "total_users": total_users,
             "active_sessions": active_users,
-            "last_backup": "2025-09-19T02:00:00Z",
+            "last_backup": settings_dict.get("last_backup"),
             "total_jobs": total_jobs,
             "total_courses": total_courses,
             "total_workshops": total_workshops
@@ -843,33 +1037,29 @@ async def update_admin_settings(
 
 @router.post("/backup")
 async def create_admin_backup(
-    db: Session = Depends(get_db),
     current_admin: User = Depends(get_current_admin)
 ):
-    """Create database backup"""
-    # This is a placeholder - implement actual backup logic
-    import shutil
-    import os
-    
-    try:
-        backup_name = f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
-        backup_path = f"./backups/{backup_name}"
-        
-        # Create backups directory if it doesn't exist
-        os.makedirs("./backups", exist_ok=True)
-        
-        # Copy the database file
-        shutil.copy2("./architecture_academics.db", backup_path)
-        
-        # Update last backup time in settings
-        crud.create_or_update_system_setting(
-            db, "last_backup", datetime.now().isoformat(), 
-            "Last database backup timestamp", current_admin.id
-        )
-        
-        return {"message": "Backup created successfully", "backup_file": backup_name}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Backup failed: {str(e)}")
+    """Start an online database backup; poll the returned job for progress"""
+    job = submit_backup(requested_by=current_admin.id)
+    return {"message": "Database backup started", "job_id": job["id"], "job": job}
+
+@router.get("/backup/jobs/{job_id}")
+async def get_admin_backup_job(
+    job_id: str,
+    current_admin: User = Depends(get_current_admin)
+):
+    """Get progress and result of a backup job"""
+    job = get_backup_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Backup job not found")
+    return job
+
+@router.get("/backups")
+async def get_admin_backups(
+    current_admin: User = Depends(get_current_admin)
+):
+    """List backup files on disk and recent backup jobs"""
+    return {"backups": list_backups(), "jobs": list_backup_jobs()}
 
 # Admin polling endpoint for new job application events  
 @router.get("/jobs/applications/events")
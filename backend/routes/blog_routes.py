@@ -1,15 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, BackgroundTasks
 from sqlalchemy.orm import Session
 from typing import Optional, List
 
 import crud
 import schemas
 from database import get_db, User
+from services.db_routing import get_read_db
+from services.related_content import get_related, RELATED_TOP_N
 from routes.auth_routes import get_current_user
+from services.image_service import process_uploaded_image, release_image
+from utils.file_utils import save_uploaded_file
 
 router = APIRouter(prefix="/blogs", tags=["Blogs"])
 
-@router.get("", response_model=List[schemas.BlogResponse])
+@router.get("", response_model=List[schemas.BlogSummary])
 async def get_blogs(
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
@@ -18,7 +22,8 @@ async def get_blogs(
     author_id: Optional[int] = None,
     is_featured: Optional[bool] = None,
     status: Optional[schemas.BlogStatus] = None,
-    db: Session = Depends(get_db)
+    tag: Optional[str] = Query(None, description="Only blogs with exactly this tag"),
+    db: Session = Depends(get_read_db)
 ):
     """Get all blogs with optional filters"""
     blogs = crud.get_blogs(
@@ -29,7 +34,9 @@ async def get_blogs(
         category=category,
         author_id=author_id,
         is_featured=is_featured,
-        status=status
+        status=status,
+        tag=tag,
+        summary=True
     )
     return blogs
 
@@ -44,6 +51,15 @@ async def get_blog(
         raise HTTPException(status_code=404, detail="Blog not found")
     return blog
 
+@router.get("/{blog_id}/related", response_model=List[schemas.RelatedItem])
+async def get_related_content(
+    blog_id: int,
+    limit: int = Query(RELATED_TOP_N, ge=1, le=RELATED_TOP_N),
+    db: Session = Depends(get_read_db)
+):
+    """Blogs, discussions and courses related to a blog, most similar first"""
+    return get_related(db, "blog", blog_id, limit)
+
 @router.get("/slug/{slug}", response_model=schemas.BlogResponse)
 async def get_blog_by_slug(
     slug: str,
@@ -87,6 +103,33 @@ async def update_blog(
     updated_blog = crud.update_blog(db, blog_id, blog_update)
     return updated_blog
 
+@router.post("/{blog_id}/featured-image", response_model=schemas.BlogResponse)
+async def upload_blog_featured_image(
+    blog_id: int,
+    background_tasks: BackgroundTasks,
+    image_file: UploadFile = File(...),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Upload a blog's featured image (author or admin only)"""
+    blog = crud.get_blog_by_id(db, blog_id)
+    if not blog:
+        raise HTTPException(status_code=404, detail="Blog not found")
+    
+    # Check if user is author or admin
+    if blog.author_id != current_user.id and current_user.role != schemas.UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Not authorized to update this blog")
+    
+    if not image_file.content_type or not image_file.content_type.startswith("image/"):
+        raise HTTPException(status_code=400, detail="File must be an image")
+    
+    previous_image = (blog.featured_image, blog.featured_image_variants)
+    image_url = save_uploaded_file(db, image_file)
+    updated_blog = crud.update_blog(db, blog_id, schemas.BlogUpdate(featured_image=image_url))
+    release_image(db, *previous_image)
+    background_tasks.add_task(process_uploaded_image, "blog", blog_id, image_url)
+    return updated_blog
+
 @router.delete("/{blog_id}")
 async def delete_blog(
     blog_id: int,
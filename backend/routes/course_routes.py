@@ -1,15 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Form, Request, BackgroundTasks
 from fastapi.responses import FileResponse, StreamingResponse, Response
-from sqlalchemy.orm import Session
+from sqlalchemy import and_
+from sqlalchemy.orm import Session, joinedload
 from typing import Optional, List
 from pathlib import Path
-import shutil
+from datetime import datetime
 
 import crud
 import schemas
 from database import get_db, User, Course, CourseLesson, CourseEnrollment
 from routes.auth_routes import get_current_user, get_current_admin, get_current_user_optional
 from aws_s3 import s3_manager
+from services.course_documents import get_course_document
+from services.db_routing import get_read_db
+from services.progress_buffer import record_heartbeat, get_pending_position, discard_pending, flush_progress
 
 router = APIRouter(prefix="/courses", tags=["Courses"])
 
@@ -20,47 +24,23 @@ MATERIAL_DIR = UPLOAD_DIR / "materials"
 VIDEO_DIR.mkdir(exist_ok=True)
 MATERIAL_DIR.mkdir(exist_ok=True)
 
-def save_uploaded_file(file: UploadFile, directory: Path) -> str:
-    """Save uploaded file and return the file path"""
-    import uuid
-    # Generate unique filename
-    file_extension = file.filename.split(".")[-1] if "." in file.filename else ""
-    unique_filename = f"{uuid.uuid4()}.{file_extension}"
-    file_path = directory / unique_filename
-    
-    # Save file
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    
-    # Return relative path for URL
-    return f"/uploads/{directory.name}/{unique_filename}"
-
-def delete_uploaded_file(file_path: str) -> bool:
-    """Delete uploaded file"""
-    try:
-        if file_path.startswith("/uploads/"):
-            full_path = Path("." + file_path)
-            if full_path.exists():
-                full_path.unlink()
-                return True
-    except Exception:
-        pass
-    return False
+MAX_HEARTBEATS_PER_BATCH = 100
 
 # ===============================
 # PUBLIC COURSE VIEWING ENDPOINTS (No Authentication Required)
 # ===============================
 
-@router.get("", response_model=List[schemas.CourseResponse])
+@router.get("", response_model=List[schemas.CourseSummary])
 async def get_public_courses(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, le=100),
     level: Optional[str] = Query(None),
     search: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
+    sort: Optional[str] = Query(None, description="Sort order: 'rating' for highest rated first"),
+    db: Session = Depends(get_read_db)
 ):
     """Get all published courses for public viewing (no authentication required)"""
-    return crud.get_published_courses(db, skip=skip, limit=limit, level=level, search=search)
+    return crud.get_published_courses(db, skip=skip, limit=limit, level=level, search=search, sort=sort)
 
 @router.get("/my-courses")
 async def get_my_courses(
@@ -68,43 +48,55 @@ async def get_my_courses(
     current_user: User = Depends(get_current_user)
 ):
     """Get all enrolled courses with details for current user"""
-    enrollments = db.query(CourseEnrollment).filter(
-        CourseEnrollment.student_id == current_user.id
-    ).all()
-    
+    enrollments = (
+        db.query(CourseEnrollment, Course)
+        .join(Course, Course.id == CourseEnrollment.course_id)
+        .options(joinedload(Course.instructor))
+        .filter(CourseEnrollment.student_id == current_user.id)
+        .order_by(CourseEnrollment.id)
+        .all()
+    )
+
+    # Lesson outlines for every enrolled course in one query
+    lessons_by_course = {}
+    course_ids = [course.id for _, course in enrollments]
+    if course_ids:
+        lesson_rows = (
+            db.query(CourseLesson.course_id, CourseLesson.id, CourseLesson.title, CourseLesson.is_free)
+            .filter(CourseLesson.course_id.in_(course_ids))
+            .order_by(CourseLesson.course_id, CourseLesson.order_index)
+            .all()
+        )
+        for lesson in lesson_rows:
+            lessons_by_course.setdefault(lesson.course_id, []).append(
+                {"id": lesson.id, "title": lesson.title, "is_free": lesson.is_free}
+            )
+
     result = []
-    for enrollment in enrollments:
-        course = crud.get_course_by_id(db, enrollment.course_id)
-        if course:
-            # Safely derive instructor name (Course has instructor_id and relationship 'instructor')
-            instructor_name = None
-            try:
-                if getattr(course, "instructor", None):
-                    first = getattr(course.instructor, "first_name", "") or ""
-                    last = getattr(course.instructor, "last_name", "") or ""
-                    full = f"{first} {last}".strip()
-                    instructor_name = full if full else None
-            except Exception:
-                instructor_name = None
-
-            result.append({
-                "id": enrollment.id,
-                "course_id": enrollment.course_id,
-                "enrolled_at": enrollment.enrolled_at.isoformat() if enrollment.enrolled_at else None,
-                "progress": enrollment.progress_percentage or 0,
-                "last_accessed": enrollment.last_accessed_at.isoformat() if enrollment.last_accessed_at else None,
-                "completed": enrollment.completed or False,
-                "course": {
-                    "id": course.id,
-                    "title": course.title,
-                    "description": course.description,
-                    "image_url": course.image_url,
-                    "level": course.level,
-                    "duration": course.duration,
-                    "instructor_name": instructor_name,
-                    "lessons": [{"id": l.id, "title": l.title, "is_free": l.is_free} for l in course.lessons] if course.lessons else []
-                }
-            })
+    for enrollment, course in enrollments:
+        instructor_name = None
+        if course.instructor:
+            full = f"{course.instructor.first_name or ''} {course.instructor.last_name or ''}".strip()
+            instructor_name = full if full else None
+
+        result.append({
+            "id": enrollment.id,
+            "course_id": enrollment.course_id,
+            "enrolled_at": enrollment.enrolled_at.isoformat() if enrollment.enrolled_at else None,
+            "progress": enrollment.progress_percentage or 0,
+            "last_accessed": enrollment.last_accessed_at.isoformat() if enrollment.last_accessed_at else None,
+            "completed": enrollment.completed or False,
+            "course": {
+                "id": course.id,
+                "title": course.title,
+                "description": course.description,
+                "image_url": course.image_url,
+                "level": course.level,
+                "duration": course.duration,
+                "instructor_name": instructor_name,
+                "lessons": lessons_by_course.get(course.id, [])
+            }
+        })
     
     return result
 
@@ -133,37 +125,98 @@ async def check_enrollment(
 # LESSON PROGRESS ENDPOINTS
 # ===============================
 
+def _record_lesson_completion(db: Session, enrollment: CourseEnrollment, lesson_id: int, current_time: int):
+    """Write a completed lesson immediately (the enrollment percentage follows in the same transaction)"""
+    discard_pending(enrollment.id, lesson_id)
+    return crud.create_or_update_lesson_progress(
+        db, lesson_id, enrollment.id, current_time, True
+    )
+
 @router.post("/progress", response_model=schemas.LessonProgressResponse)
 async def update_lesson_progress(
+    background_tasks: BackgroundTasks,
     lesson_id: int = Form(...),
     enrollment_id: int = Form(...),
-    current_time: int = Form(0),
+    current_time: int = Form(0, ge=0, le=schemas.MAX_PLAYBACK_POSITION),
     completed: bool = Form(False),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Update or create lesson progress"""
-    enrollment = db.query(CourseEnrollment).filter(
-        CourseEnrollment.id == enrollment_id,
-        CourseEnrollment.student_id == current_user.id
-    ).first()
+    """Update or create lesson progress (positions are buffered, completions written at once)"""
+    # One statement: the enrollment plus whether the lesson belongs to its course
+    row = (
+        db.query(CourseEnrollment, CourseLesson.id)
+        .outerjoin(CourseLesson, and_(
+            CourseLesson.course_id == CourseEnrollment.course_id,
+            CourseLesson.id == lesson_id,
+        ))
+        .filter(
+            CourseEnrollment.id == enrollment_id,
+            CourseEnrollment.student_id == current_user.id
+        )
+        .first()
+    )
     
-    if not enrollment:
+    if not row:
         raise HTTPException(status_code=403, detail="Not authorized")
+    enrollment, course_lesson_id = row
+    if course_lesson_id is None:
+        raise HTTPException(status_code=404, detail="Lesson not found in this course")
     
-    progress = crud.create_or_update_lesson_progress(
-        db, lesson_id, enrollment_id, current_time, completed
+    if completed:
+        return _record_lesson_completion(db, enrollment, lesson_id, current_time)
+
+    if record_heartbeat(enrollment_id, lesson_id, current_time):
+        background_tasks.add_task(flush_progress)
+    return schemas.LessonProgressResponse(
+        lesson_id=lesson_id,
+        enrollment_id=enrollment_id,
+        current_time=current_time,
+        completed=False,
+        last_watched_at=datetime.utcnow()
     )
+
+@router.post("/progress/batch", response_model=schemas.LessonHeartbeatBatchResult)
+async def update_lesson_progress_batch(
+    batch: schemas.LessonHeartbeatBatch,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Record several playback heartbeats at once (e.g. queued by an offline player)"""
+    if len(batch.heartbeats) > MAX_HEARTBEATS_PER_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_HEARTBEATS_PER_BATCH} heartbeats per batch")
+    
+    enrollment_ids = {beat.enrollment_id for beat in batch.heartbeats}
+    enrollments = {
+        enrollment.id: enrollment
+        for enrollment in db.query(CourseEnrollment).filter(
+            CourseEnrollment.id.in_(enrollment_ids),
+            CourseEnrollment.student_id == current_user.id
+        ).all()
+    } if enrollment_ids else {}
+    lesson_ids = {beat.lesson_id for beat in batch.heartbeats}
+    lesson_courses = dict(
+        db.query(CourseLesson.id, CourseLesson.course_id).filter(CourseLesson.id.in_(lesson_ids)).all()
+    ) if lesson_ids else {}
     
-    all_progress = crud.get_enrollment_progress(db, enrollment_id)
-    if all_progress:
-        completed_lessons = sum(1 for p in all_progress if p.completed)
-        total_lessons = len(enrollment.course.lessons)
-        if total_lessons > 0:
-            progress_percentage = (completed_lessons / total_lessons) * 100
-            crud.update_enrollment_progress(db, enrollment_id, progress_percentage)
+    accepted = completed = rejected = 0
+    flush_due = False
+    for beat in batch.heartbeats:
+        enrollment = enrollments.get(beat.enrollment_id)
+        # Only lessons of the enrolled course; anything else would fail the buffered upsert
+        if not enrollment or lesson_courses.get(beat.lesson_id) != enrollment.course_id:
+            rejected += 1
+        elif beat.completed:
+            _record_lesson_completion(db, enrollment, beat.lesson_id, beat.current_time)
+            completed += 1
+        else:
+            flush_due = record_heartbeat(beat.enrollment_id, beat.lesson_id, beat.current_time) or flush_due
+            accepted += 1
     
-    return progress
+    if flush_due:
+        background_tasks.add_task(flush_progress)
+    return schemas.LessonHeartbeatBatchResult(accepted=accepted, completed=completed, rejected=rejected)
 
 @router.get("/lessons/{lesson_id}/progress")
 async def get_lesson_progress_api(
@@ -182,6 +235,18 @@ async def get_lesson_progress_api(
         raise HTTPException(status_code=403, detail="Not authorized")
     
     progress = crud.get_lesson_progress(db, lesson_id, enrollment_id)
+    pending = get_pending_position(enrollment_id, lesson_id)
+    if pending:
+        # A newer position is waiting for the next flush
+        current_time, watched_at = pending
+        return schemas.LessonProgressResponse(
+            id=progress.id if progress else None,
+            lesson_id=lesson_id,
+            enrollment_id=enrollment_id,
+            current_time=current_time,
+            completed=progress.completed if progress else False,
+            last_watched_at=watched_at
+        )
     return progress if progress else {"current_time": 0, "completed": False}
 
 # ===============================
@@ -241,28 +306,26 @@ async def create_reply_api(
     reply = schemas.QuestionReplyCreate(question_id=question_id, content=content)
     return crud.create_question_reply(db, reply, current_user.id, is_instructor)
 
+def _course_document_response(request: Request, db: Session, course_id: int, part: str) -> Response:
+    """Serve one part of the precomputed course document with an ETag"""
+    document = get_course_document(db, course_id)
+    if document is None:
+        raise HTTPException(status_code=404, detail="Course not found or not published")
+
+    etag = document.etags[part]
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=0, must-revalidate"}
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=getattr(document, part), media_type="application/json", headers=headers)
+
 @router.get("/{course_id}", response_model=schemas.CourseDetailResponse)
 async def get_public_course_detail(
     course_id: int,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """Get detailed course information for public viewing"""
-    course = crud.get_course_by_id(db, course_id)
-    if not course or course.status != schemas.CourseStatus.PUBLISHED:
-        raise HTTPException(status_code=404, detail="Course not found or not published")
-    
-    # Get lessons (only show basic info, video URLs handled separately)
-    lessons = crud.get_course_lessons(db, course_id)
-    materials = crud.get_course_materials(db, course_id)
-    
-    # Create response dict excluding relationships to avoid duplication
-    course_dict = {k: v for k, v in course.__dict__.items() if k not in ['lessons', 'materials', '_sa_instance_state']}
-    
-    return schemas.CourseDetailResponse(
-        **course_dict,
-        lessons=[schemas.CourseLessonResponse(**lesson.__dict__) for lesson in lessons],
-        materials=[schemas.CourseMaterialResponse(**material.__dict__) for material in materials]
-    )
+    return _course_document_response(request, db, course_id, "detail")
 
 
 @router.get("/{course_id}/reviews", response_model=List[schemas.CourseReviewResponse])
@@ -301,28 +364,56 @@ async def submit_course_review_api(
 @router.get("/{course_id}/lessons")
 async def get_course_lessons_public(
     course_id: int,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """Get course lessons for public viewing (shows which are free vs premium)"""
-    course = crud.get_course_by_id(db, course_id)
-    if not course or course.status != schemas.CourseStatus.PUBLISHED:
-        raise HTTPException(status_code=404, detail="Course not found or not published")
-    
+    return _course_document_response(request, db, course_id, "lessons")
+
+PRESIGNED_URL_EXPIRATION = 3600
+
+def _has_premium_access(db: Session, current_user: Optional[User], course_id: int) -> bool:
+    """Premium lessons are open to subscribers (admins/recruiters) and enrolled students"""
+    if not current_user:
+        return False
+    if current_user.role in [schemas.UserRole.ADMIN, schemas.UserRole.RECRUITER]:
+        return True
+    return crud.get_enrollment(db, course_id, current_user.id) is not None
+
+def _premium_video_url(video_url: Optional[str]) -> Optional[str]:
+    """Presigned (cached) URL for S3 videos; local uploads are served as stored"""
+    if not video_url or not s3_manager.is_s3_url(video_url):
+        return video_url
+    return s3_manager.get_cached_presigned_url(video_url, expiration=PRESIGNED_URL_EXPIRATION)
+
+@router.get("/{course_id}/lessons/video-urls", response_model=schemas.LessonVideoUrlBatch)
+async def get_lesson_video_urls(
+    course_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_optional)
+):
+    """Get video URLs for every lesson of a course the user can watch, with one access check"""
     lessons = crud.get_course_lessons(db, course_id)
+    if not lessons and not db.query(Course.id).filter(Course.id == course_id).first():
+        raise HTTPException(status_code=404, detail="Course not found")
     
-    # Return lesson info without video URLs (URLs are fetched separately based on access)
-    return [
-        {
-            "id": lesson.id,
-            "title": lesson.title,
-            "description": lesson.description,
-            "video_duration": lesson.video_duration,
-            "order_index": lesson.order_index,
-            "is_free": lesson.is_free,
-            "has_video": bool(lesson.video_url)
-        }
-        for lesson in lessons
-    ]
+    has_access = _has_premium_access(db, current_user, course_id)
+    results = []
+    for lesson in lessons:
+        if lesson.is_free:
+            results.append(schemas.LessonVideoUrl(
+                lesson_id=lesson.id, is_free=True, has_access=True,
+                video_url=lesson.video_url, hls_url=lesson.hls_playlist_url
+            ))
+        elif has_access:
+            results.append(schemas.LessonVideoUrl(
+                lesson_id=lesson.id, is_free=False, has_access=True,
+                video_url=_premium_video_url(lesson.video_url), hls_url=lesson.hls_playlist_url
+            ))
+        else:
+            results.append(schemas.LessonVideoUrl(lesson_id=lesson.id, is_free=False, has_access=False))
+    
+    return schemas.LessonVideoUrlBatch(course_id=course_id, has_access=has_access, lessons=results)
 
 @router.get("/{course_id}/lessons/{lesson_id}/video-url")
 async def get_lesson_video_url(
@@ -338,19 +429,19 @@ async def get_lesson_video_url(
     
     # If lesson is free, return public URL
     if lesson.is_free:
-        return {"video_url": lesson.video_url, "is_free": True}
+        return {"video_url": lesson.video_url, "hls_url": lesson.hls_playlist_url, "is_free": True}
     
     # If lesson is premium, check user subscription
     if not current_user:
         return {"video_url": None, "is_free": False, "message": "Login required for premium content"}
     
-    # Check if user has subscription (you can implement subscription logic here)
-    has_subscription = current_user.role in [schemas.UserRole.ADMIN, schemas.UserRole.RECRUITER]
-    
-    if has_subscription:
-        # Generate presigned URL for premium content
-        presigned_url = s3_manager.generate_presigned_url(lesson.video_url, expiration=3600)
-        return {"video_url": presigned_url, "is_free": False, "has_access": True}
+    if _has_premium_access(db, current_user, course_id):
+        return {
+            "video_url": _premium_video_url(lesson.video_url),
+            "hls_url": lesson.hls_playlist_url,
+            "is_free": False,
+            "has_access": True,
+        }
     else:
         return {"video_url": None, "is_free": False, "has_access": False, "message": "Subscription required"}
 
@@ -6,6 +6,8 @@ import crud
 import schemas
 from database import get_db, User
 from routes.auth_routes import get_current_user
+from services.db_routing import get_read_db
+from services.related_content import get_related, RELATED_TOP_N
 
 router = APIRouter(prefix="/discussions", tags=["Discussions"])
 
@@ -17,6 +19,7 @@ async def get_discussions(
     author_id: Optional[int] = Query(None),
     is_solved: Optional[bool] = Query(None),
     is_pinned: Optional[bool] = Query(None),
+    tag: Optional[str] = Query(None, description="Only discussions with exactly this tag"),
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
     db: Session = Depends(get_db)
@@ -29,6 +32,7 @@ async def get_discussions(
         author_id=author_id,
         is_solved=is_solved,
         is_pinned=is_pinned,
+        tag=tag,
         skip=skip,
         limit=limit
     )
@@ -50,6 +54,16 @@ async def get_discussion(
     
     return discussion
 
+# Related blogs, discussions and courses
+@router.get("/{discussion_id}/related", response_model=List[schemas.RelatedItem])
+async def get_related_content(
+    discussion_id: int,
+    limit: int = Query(RELATED_TOP_N, ge=1, le=RELATED_TOP_N),
+    db: Session = Depends(get_read_db)
+):
+    """Blogs, discussions and courses related to a discussion, most similar first"""
+    return get_related(db, "discussion", discussion_id, limit)
+
 # Create a new discussion
 @router.post("", response_model=schemas.DiscussionResponse, status_code=status.HTTP_201_CREATED)
 async def create_discussion(
@@ -10,7 +10,7 @@ from routes.auth_routes import get_current_user
 router = APIRouter(prefix="/events", tags=["Events"])
 
 # Public Events Endpoint
-@router.get("", response_model=List[schemas.EventResponse])
+@router.get("", response_model=List[schemas.EventSummary])
 async def get_public_events(
     skip: int = 0,
     limit: int = 100,
@@ -18,7 +18,15 @@ async def get_public_events(
 ):
     """Get all events for public view"""
     # Return all events without status filtering for now
-    return crud.get_events(db, skip=skip, limit=limit)
+    return crud.get_events(db, skip=skip, limit=limit, summary=True)
+
+@router.get("/{event_id}", response_model=schemas.EventResponse)
+async def get_public_event(event_id: int, db: Session = Depends(get_db)):
+    """Get one event with its full description and requirements"""
+    event = crud.get_event(db, event_id)
+    if not event:
+        raise HTTPException(status_code=404, detail="Event not found")
+    return event
 
 # Event Registration (Public)
 @router.post("/{event_id}/register")
@@ -4,16 +4,18 @@ from typing import Optional, List
 from pathlib import Path
 from uuid import uuid4
 from datetime import datetime
-import shutil
 
 import crud
 import schemas
 from database import get_db, User, Job
+from services.db_routing import get_read_db
+from services.job_recommendations import recommend_jobs
 from routes.auth_routes import get_current_user, get_current_recruiter, get_current_admin
+from utils.file_utils import save_uploaded_file, delete_uploaded_file
 
 router = APIRouter(prefix="/jobs", tags=["Jobs"])
 
-# File upload utilities
+# Upload directories
 UPLOAD_DIR = Path("uploads")
 RESUME_DIR = UPLOAD_DIR / "resumes"
 UPLOAD_DIR.mkdir(exist_ok=True)
@@ -22,22 +24,7 @@ RESUME_DIR.mkdir(exist_ok=True)
 # Lightweight in-memory events buffer for admin polling of new job applications
 APPLICATION_EVENTS: list[dict] = []
 
-def save_uploaded_file(file: UploadFile, directory: Path) -> str:
-    """Save uploaded file and return the file path"""
-    import uuid
-    # Generate unique filename
-    file_extension = file.filename.split(".")[-1] if "." in file.filename else ""
-    unique_filename = f"{uuid.uuid4()}.{file_extension}"
-    file_path = directory / unique_filename
-    
-    # Save file
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    
-    # Return relative path for URL
-    return f"/uploads/{directory.name}/{unique_filename}"
-
-@router.get("", response_model=List[schemas.JobResponse])
+@router.get("", response_model=List[schemas.JobSummary])
 async def get_jobs(
     search: Optional[str] = Query(None, description="Search in title, company, description, tags"),
     job_type: Optional[schemas.JobType] = Query(None, description="Filter by job type"),
@@ -46,9 +33,10 @@ async def get_jobs(
     location: Optional[str] = Query(None, description="Filter by location"),
     min_salary: Optional[float] = Query(None, description="Minimum salary filter"),
     max_salary: Optional[float] = Query(None, description="Maximum salary filter"),
+    tag: Optional[str] = Query(None, description="Only jobs with exactly this tag"),
     skip: int = Query(0, description="Number of records to skip"),
     limit: int = Query(50, description="Maximum number of records to return"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get all published jobs with optional filters"""
     jobs = crud.get_jobs(
@@ -60,8 +48,10 @@ async def get_jobs(
         location=location,
         min_salary=min_salary,
         max_salary=max_salary,
+        tag=tag,
         skip=skip,
-        limit=limit
+        limit=limit,
+        summary=True
     )
     return jobs
 
@@ -95,6 +85,22 @@ async def get_saved_jobs(
     """Get current user's saved jobs"""
     return crud.get_user_saved_jobs(db, current_user.id, skip, limit)
 
+# Plain def: a first or stale request builds the index, which must not block the event loop
+@router.get("/recommended", response_model=List[schemas.RecommendedJob])
+def get_recommended_jobs(
+    limit: int = Query(10, ge=1, le=50, description="Maximum number of jobs to return"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Open jobs closest to the current user's profile, best match first"""
+    applied = crud.get_applied_job_ids(db, current_user.id)
+    matches = recommend_jobs(db, current_user, limit=limit, exclude_job_ids=applied)
+    scores = dict(matches)
+    jobs = crud.get_jobs_by_ids(db, list(scores))
+    for job in jobs:
+        job.score = scores[job.id]
+    return jobs
+
 @router.get("/{job_id}", response_model=schemas.JobResponse)
 async def get_job(job_id: int, db: Session = Depends(get_db)):
     """Get a specific job by ID"""
@@ -228,7 +234,7 @@ async def apply_for_job_with_upload(
         raise HTTPException(status_code=400, detail="Resume too large. Max size: 10MB")
 
     # Save file
-    resume_url = save_uploaded_file(resume_file, RESUME_DIR)
+    resume_url = save_uploaded_file(db, resume_file)
 
     application_data = schemas.JobApplicationCreate(
         job_id=job_id,
@@ -237,6 +243,7 @@ async def apply_for_job_with_upload(
     )
     db_application = crud.create_job_application(db, application_data, current_user.id)
     if not db_application:
+        delete_uploaded_file(db, resume_url)
         raise HTTPException(status_code=400, detail="You have already applied for this job")
 
     # Record event for admin polling
@@ -39,8 +39,8 @@ async def get_nata_courses(
 ):
     """Get all NATA preparation lessons"""
     try:
-        # Try to fetch from DB first
-        db_courses = db.query(NATACourse).all()
+        # Try to fetch from DB first (list cards don't need the syllabus)
+        db_courses = crud.get_all_nata_courses(db, limit=None, status=None, summary=True)
         
         if not db_courses:
             # Fallback to seed data if DB is empty
@@ -65,7 +65,7 @@ async def get_nata_courses(
             
         return {
             "success": True,
-            "data": db_courses,
+            "data": [schemas.NATACourseSummary(**c.__dict__) for c in db_courses],
             "total": len(db_courses)
         }
     except Exception as e:
@@ -6,7 +6,6 @@ import schemas
 import crud
 from services.auth_service import get_current_user
 from routes.auth_routes import get_current_admin
-from email_service import send_email
 
 router = APIRouter(
     prefix="/notifications",
@@ -63,6 +62,8 @@ async def send_email_notification(
     db: Session = Depends(get_db)
 ):
     """Send email to a user or all users (Admin only)"""
+    from email_service import send_email  # smtplib stays off the startup path
+    
     if email_data.recipient_id:
         # Send to specific user
         user = crud.get_user_by_id(db, email_data.recipient_id)
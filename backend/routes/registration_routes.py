@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from typing import List
 
@@ -15,36 +16,43 @@ async def get_my_events(
     current_user: User = Depends(get_current_user)
 ):
     """Get all registered events for current user"""
-    registrations = db.query(EventRegistration).filter(
-        EventRegistration.participant_id == current_user.id
-    ).all()
-    
+    registrations = (
+        db.query(EventRegistration, Event)
+        .join(Event, Event.id == EventRegistration.event_id)
+        .filter(EventRegistration.participant_id == current_user.id)
+        .order_by(EventRegistration.id)
+        .all()
+    )
+
+    # Registration totals for all of the user's events in one grouped query
+    event_ids = [event.id for _, event in registrations]
+    registered_counts = dict(
+        db.query(EventRegistration.event_id, func.count(EventRegistration.id))
+        .filter(EventRegistration.event_id.in_(event_ids))
+        .group_by(EventRegistration.event_id)
+        .all()
+    ) if event_ids else {}
+
     result = []
-    for registration in registrations:
-        event = db.query(Event).filter(Event.id == registration.event_id).first()
-        if event:
-            registered_count = db.query(EventRegistration).filter(
-                EventRegistration.event_id == event.id
-            ).count()
-            
-            result.append({
-                "id": registration.id,
-                "event_id": registration.event_id,
-                "registered_at": registration.registered_at.isoformat() if registration.registered_at else None,
-                "status": "confirmed",  # You can add status field to EventRegistration model if needed
-                "event": {
-                    "id": event.id,
-                    "title": event.title,
-                    "description": event.description,
-                    "image_url": event.image_url,
-                    "event_date": event.event_date.isoformat() if event.event_date else None,
-                    "event_time": event.event_time,
-                    "location": event.location,
-                    "capacity": event.capacity,
-                    "registered_count": registered_count,
-                    "event_type": event.event_type or "Conference"
-                }
-            })
+    for registration, event in registrations:
+        result.append({
+            "id": registration.id,
+            "event_id": registration.event_id,
+            "registered_at": registration.registered_at.isoformat() if registration.registered_at else None,
+            "status": "confirmed",  # You can add status field to EventRegistration model if needed
+            "event": {
+                "id": event.id,
+                "title": event.title,
+                "description": event.description,
+                "image_url": event.image_url,
+                "event_date": event.date.isoformat() if event.date else None,
+                "event_time": event.date.strftime("%H:%M") if event.date else None,
+                "location": event.location,
+                "capacity": event.max_participants,
+                "registered_count": registered_counts.get(event.id, 0),
+                "event_type": "Conference"
+            }
+        })
     
     return result
 
@@ -2,8 +2,9 @@ from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import or_
 from typing import List, Optional
-from database import get_db, Course, Job, Blog, Event, Workshop, NATACourse
+from database import Course, Job, Blog, Event, Workshop, NATACourse
 from pydantic import BaseModel
+from services.db_routing import get_read_db
 
 router = APIRouter(prefix="/search", tags=["Search"])
 
@@ -16,7 +17,7 @@ class SearchResult(BaseModel):
     image: Optional[str] = None
 
 @router.get("", response_model=List[SearchResult])
-def search(q: str = Query(..., min_length=1), db: Session = Depends(get_db)):
+def search(q: str = Query(..., min_length=1), db: Session = Depends(get_read_db)):
     """
     Search endpoint explicitly allows unauthenticated access.
     """
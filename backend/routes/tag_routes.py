@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import Optional, List
+
+import schemas
+from services.db_routing import get_read_db
+from services.tags import get_tag_cloud
+
+router = APIRouter(prefix="/tags", tags=["Tags"])
+
+@router.get("", response_model=List[schemas.TagCloudItem])
+async def get_tags(
+    entity_type: Optional[schemas.TaggedEntityType] = Query(None, description="Count only jobs, blogs or discussions"),
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_read_db)
+):
+    """Most used tags with how many published items carry each, for tag clouds"""
+    return get_tag_cloud(db, entity_type.value if entity_type else None, limit)
@@ -1,11 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, BackgroundTasks
 from sqlalchemy.orm import Session
 from database import get_db, User
 import crud
+import schemas
 from routes.auth_routes import get_current_user
-from datetime import datetime
-import shutil
-import os
+from services.image_service import process_uploaded_image, release_image
+from utils.file_utils import save_uploaded_file
 from pathlib import Path
 
 router = APIRouter(prefix="/users", tags=["users"])
@@ -13,8 +13,12 @@ router = APIRouter(prefix="/users", tags=["users"])
 UPLOAD_DIR = "uploads/profile_images"
 Path(UPLOAD_DIR).mkdir(parents=True, exist_ok=True)
 
+# Upper bound on ids per entity type in a single membership lookup
+MAX_MEMBERSHIP_IDS = 200
+
 @router.post("/profile-image")
 async def upload_profile_image(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -24,22 +28,19 @@ async def upload_profile_image(
         if not file.content_type.startswith("image/"):
             raise HTTPException(status_code=400, detail="File must be an image")
         
-        # Generate unique filename
-        file_extension = os.path.splitext(file.filename)[1]
-        filename = f"user_{current_user.id}_{int(datetime.utcnow().timestamp())}{file_extension}"
-        file_path = os.path.join(UPLOAD_DIR, filename)
+        # Save file (deduplicated by content)
+        image_url = save_uploaded_file(db, file)
+        previous_image = (current_user.profile_image_url, current_user.profile_image_variants)
         
-        # Save file
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-            
         # Update user profile
-        # Construct URL (assuming static files are served from /uploads)
-        image_url = f"/uploads/profile_images/{filename}"
-        
         current_user.profile_image_url = image_url
+        current_user.profile_image_variants = None
         db.commit()
         db.refresh(current_user)
+        release_image(db, *previous_image)
+        
+        # Strip metadata and build resized variants off the request path
+        background_tasks.add_task(process_uploaded_image, "user", current_user.id, image_url)
         
         return {"profile_image_url": image_url}
         
@@ -181,3 +182,24 @@ async def get_user_dashboard(
     except Exception as e:
         print(f"Dashboard error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/me/memberships", response_model=schemas.MembershipLookupResponse)
+async def get_my_memberships(
+    lookup: schemas.MembershipLookupRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Batch like/save/registration/enrollment status for the current user.
+
+    List pages send the ids of every card they render and get back the subset the
+    user has liked, saved, applied to, registered for or enrolled in.
+    """
+    for field, ids in lookup.dict().items():
+        if len(ids) > MAX_MEMBERSHIP_IDS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Too many ids in {field}. Maximum: {MAX_MEMBERSHIP_IDS}"
+            )
+
+    return crud.get_user_memberships(db, current_user.id, lookup)
@@ -1,9 +1,10 @@
 from __future__ import annotations
 
-from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from pydantic import BaseModel, EmailStr, BeforeValidator, Field
+from typing import Optional, List, Dict, Annotated
 from datetime import datetime
 from enum import Enum
+import json
 
 # Enums
 class UserRole(str, Enum):
@@ -94,6 +95,47 @@ class CourseLevel(str, Enum):
     INTERMEDIATE = "intermediate"
     ADVANCED = "advanced"
 
+class TaggedEntityType(str, Enum):
+    JOB = "job"
+    BLOG = "blog"
+    DISCUSSION = "discussion"
+
+# Image Variant Schemas
+class ImageVariant(BaseModel):
+    url: str
+    width: int
+    height: int
+    format: str
+
+class ImageVariantSet(BaseModel):
+    """Resized renditions of an uploaded image, ready for <img srcset>"""
+    variants: List[ImageVariant] = []
+    srcset: Dict[str, str] = {}  # format -> "url 64w, url 160w, ..."
+    fallback: Optional[str] = None
+
+def _parse_image_variants(value):
+    """Build an ImageVariantSet payload from the JSON stored on the model"""
+    if not value:
+        return None
+    if isinstance(value, (dict, ImageVariantSet)):
+        return value
+    try:
+        variants = json.loads(value) if isinstance(value, str) else list(value)
+    except (TypeError, ValueError):
+        return None
+    variants = sorted(variants, key=lambda v: v["width"])
+    srcset: Dict[str, List[str]] = {}
+    for variant in variants:
+        srcset.setdefault(variant["format"], []).append(f"{variant['url']} {variant['width']}w")
+    jpegs = [v for v in variants if v["format"] == "jpeg"]
+    return {
+        "variants": variants,
+        "srcset": {fmt: ", ".join(entries) for fmt, entries in srcset.items()},
+        "fallback": jpegs[-1]["url"] if jpegs else None,
+    }
+
+ImageVariants = Annotated[Optional[ImageVariantSet], BeforeValidator(_parse_image_variants)]
+
 # User Schemas
 class UserBase(BaseModel):
     email: EmailStr
@@ -175,6 +217,7 @@ class UserResponse(UserBase):
     linkedin: Optional[str] = None
     portfolio: Optional[str] = None
     profile_image_url: Optional[str] = None
+    profile_image_variants: ImageVariants = None
     company_name: Optional[str] = None
     company_website: Optional[str] = None
     company_description: Optional[str] = None
@@ -228,6 +271,38 @@ class CourseResponse(CourseBase):
     total_lessons: Optional[int] = 0
     total_duration: Optional[int] = 0
     has_free_preview: Optional[bool] = False
+    image_variants: ImageVariants = None
+    rating_avg: Optional[float] = None
+    rating_count: Optional[int] = 0
+
+    class Config:
+        from_attributes = True
+        use_enum_values = True
+
+class CourseSummary(BaseModel):
+    """Course card for list pages; description is truncated, syllabus omitted"""
+    id: int
+    title: str
+    short_description: Optional[str] = None
+    description: Optional[str] = Field(None, validation_alias="description_excerpt")
+    level: CourseLevel
+    duration: str
+    max_students: int = 50
+    price: float = 0.0
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+    image_url: Optional[str] = None
+    image_variants: ImageVariants = None
+    status: CourseStatus
+    created_at: datetime
+    updated_at: datetime
+    instructor_id: Optional[int] = None
+    enrolled_count: Optional[int] = 0
+    total_lessons: Optional[int] = 0
+    total_duration: Optional[int] = 0
+    has_free_preview: Optional[bool] = False
+    rating_avg: Optional[float] = None
+    rating_count: Optional[int] = 0
 
     class Config:
         from_attributes = True
@@ -304,9 +379,37 @@ class CourseLessonUpdate(BaseModel):
     is_free: Optional[bool] = None
     transcript: Optional[str] = None
 
+class HlsRendition(BaseModel):
+    name: str  # e.g. "720p"
+    width: int
+    height: int
+    video_bitrate: int  # kbps
+    audio_bitrate: int  # kbps
+    playlist_url: str
+
+def _parse_hls_renditions(value):
+    """Decode the rendition list stored on the lesson as JSON"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return []
+    return value
+
+HlsRenditions = Annotated[List[HlsRendition], BeforeValidator(_parse_hls_renditions)]
+
 class CourseLessonResponse(CourseLessonBase):
     id: int
     video_url: Optional[str] = None
+    video_width: Optional[int] = None
+    video_height: Optional[int] = None
+    video_bitrate: Optional[int] = None  # kbps
+    video_codec: Optional[str] = None
+    hls_status: Optional[str] = None
+    hls_playlist_url: Optional[str] = None
+    hls_renditions: HlsRenditions = []
     course_id: int
     created_at: datetime
     updated_at: datetime
@@ -347,6 +450,7 @@ class CourseDetailResponse(CourseResponse):
     materials: List[CourseMaterialResponse] = []
     total_lessons: Optional[int] = 0
     total_duration: Optional[int] = 0  # Total course duration in seconds
+    rating_histogram: Dict[int, int] = {}  # stars (1-5) -> number of reviews
 
     class Config:
         from_attributes = True
@@ -468,7 +572,36 @@ class JobResponse(JobBase):
     class Config:
         from_attributes = True
 
+class JobSummary(BaseModel):
+    """Job card for list pages; description is truncated, long text fields omitted"""
+    id: int
+    title: str
+    company: str
+    location: str
+    work_mode: WorkMode
+    job_type: JobType
+    experience_level: ExperienceLevel
+    salary_min: Optional[float] = None
+    salary_max: Optional[float] = None
+    currency: str = "INR"
+    description: Optional[str] = Field(None, validation_alias="description_excerpt")
+    tags: Optional[str] = None
+    application_deadline: Optional[datetime] = None
+    status: JobStatus
+    created_at: datetime
+    updated_at: datetime
+    recruiter_id: int
+
+    class Config:
+        from_attributes = True
+        use_enum_values = True
+
+class RecommendedJob(JobSummary):
+    """Job card with its similarity to the user's profile (0-1)"""
+    score: float
+
 # Job Application Schemas
+
 class JobApplicationBase(BaseModel):
     cover_letter: Optional[str] = None
     resume_url: Optional[str] = None
@@ -580,6 +713,41 @@ class BlogResponse(BlogBase):
     likes_count: int = 0
     comments_count: int = 0
     slug: Optional[str] = None
+    featured_image_variants: ImageVariants = None
+
+    class Config:
+        from_attributes = True
+        use_enum_values = True
+
+class BlogAuthorSummary(BaseModel):
+    id: int
+    first_name: str
+    last_name: str
+    username: Optional[str] = None
+    profile_image_url: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+class BlogSummary(BaseModel):
+    """Blog card for list pages; content omitted (excerpt only)"""
+    id: int
+    title: str
+    slug: Optional[str] = None
+    excerpt: Optional[str] = None
+    category: BlogCategory
+    tags: Optional[str] = None
+    featured_image: Optional[str] = None
+    featured_image_variants: ImageVariants = None
+    is_featured: bool = False
+    status: BlogStatus
+    author_id: int
+    author: Optional[BlogAuthorSummary] = None
+    created_at: datetime
+    updated_at: datetime
+    views_count: int = 0
+    likes_count: int = 0
+    comments_count: int = 0
 
     class Config:
         from_attributes = True
@@ -679,6 +847,20 @@ class DiscussionResponse(DiscussionBase):
     class Config:
         from_attributes = True
 
+# Related content (blogs, discussions and courses)
+class RelatedItem(BaseModel):
+    type: str  # "blog", "discussion" or "course"
+    id: int
+    title: str
+    slug: Optional[str] = None
+    excerpt: Optional[str] = None
+    score: float
+
+# Tag cloud
+class TagCloudItem(BaseModel):
+    name: str
+    count: int
+
 # Discussion Reply Schemas
 class DiscussionReplyBase(BaseModel):
     content: str
@@ -759,6 +941,27 @@ class EventResponse(EventBase):
     id: int
     status: EventStatus
     participants_count: int
+    image_variants: ImageVariants = None
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class EventSummary(BaseModel):
+    """Event card for list pages; description, requirements and meeting link omitted"""
+    id: int
+    title: str
+    short_description: Optional[str] = None
+    date: datetime
+    duration: int
+    location: Optional[str] = None
+    image_url: Optional[str] = None
+    image_variants: ImageVariants = None
+    max_participants: Optional[int] = 50
+    is_online: bool = False
+    status: EventStatus
+    participants_count: int = 0
     created_at: datetime
     updated_at: datetime
 
@@ -790,6 +993,7 @@ class CourseEnrollmentResponse(BaseModel):
     enrolled_at: datetime
     completed: bool
     progress_percentage: Optional[float] = 0.0
+    completed_lessons: Optional[int] = 0
     last_accessed_at: Optional[datetime] = None
     course: Optional[CourseResponse] = None
     student: Optional[UserResponse] = None
@@ -807,7 +1011,7 @@ class LessonProgressUpdate(BaseModel):
     completed: Optional[bool] = None
 
 class LessonProgressResponse(BaseModel):
-    id: int
+    id: Optional[int] = None  # None while the position is only buffered in memory
     lesson_id: int
     enrollment_id: int
     current_time: int  # Current playback position in seconds
@@ -817,6 +1021,35 @@ class LessonProgressResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class LessonVideoUrl(BaseModel):
+    lesson_id: int
+    is_free: bool
+    has_access: bool
+    video_url: Optional[str] = None
+    hls_url: Optional[str] = None  # adaptive stream master playlist, when packaged
+
+class LessonVideoUrlBatch(BaseModel):
+    course_id: int
+    has_access: bool  # premium lessons unlocked for this user
+    lessons: List[LessonVideoUrl]
+
+# Longest playback position a heartbeat may report, in seconds
+MAX_PLAYBACK_POSITION = 24 * 60 * 60
+
+class LessonHeartbeat(BaseModel):
+    lesson_id: int
+    enrollment_id: int
+    current_time: int = Field(0, ge=0, le=MAX_PLAYBACK_POSITION)
+    completed: bool = False
+
+class LessonHeartbeatBatch(BaseModel):
+    heartbeats: List[LessonHeartbeat]
+
+class LessonHeartbeatBatchResult(BaseModel):
+    accepted: int  # positions buffered for the next flush
+    completed: int  # completions written immediately
+    rejected: int  # heartbeats for enrollments the user doesn't own or lessons outside the course
+
 # Course Question/Doubt Schemas
 class CourseQuestionCreate(BaseModel):
     lesson_id: int
@@ -921,3 +1154,51 @@ class NotificationResponse(NotificationBase):
     class Config:
         from_attributes = True
 
+# Batch Membership Lookup Schemas
+class MembershipLookupRequest(BaseModel):
+    blog_ids: List[int] = []
+    comment_ids: List[int] = []
+    discussion_ids: List[int] = []
+    discussion_reply_ids: List[int] = []
+    event_ids: List[int] = []
+    workshop_ids: List[int] = []
+    course_ids: List[int] = []
+    job_ids: List[int] = []
+
+class MembershipLookupResponse(BaseModel):
+    liked_blog_ids: List[int] = []
+    liked_comment_ids: List[int] = []
+    liked_discussion_ids: List[int] = []
+    liked_discussion_reply_ids: List[int] = []
+    registered_event_ids: List[int] = []
+    registered_workshop_ids: List[int] = []
+    enrolled_course_ids: List[int] = []
+    saved_job_ids: List[int] = []
+    applied_job_ids: List[int] = []
+
+# NATA Course Schemas
+class NATACourseSummary(BaseModel):
+    """NATA course card for list pages; syllabus omitted"""
+    id: int
+    title: str
+    description: str
+    instructor: str
+    duration: str
+    difficulty: str
+    price: float
+    original_price: float
+    rating: Optional[float] = None
+    students_enrolled: Optional[int] = 0
+    lessons_count: Optional[int] = 0
+    certificate_included: Optional[bool] = True
+    moodle_url: Optional[str] = None
+    thumbnail: Optional[str] = None
+    category: str
+    skills: Optional[str] = None  # JSON list
+    features: Optional[str] = None  # JSON list
+    status: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,593 @@
+"""
+Synthetic data generator for load and scale testing.
+
+Creates production-sized volumes of users, jobs, job applications, blogs,
+blog likes, courses with lessons, enrollments and lesson progress. Popularity
+follows a power law (a few jobs, blogs and courses get most of the activity,
+a few users do most of it), sign-ups and content grow towards the present,
+and every value is derived from --seed, so two runs with the same arguments
+against the same starting database produce identical rows.
+
+Rows are written with chunked bulk Core inserts using explicit ids, so no
+ORM objects are built and foreign keys are known without reading rows back.
+Every synthetic user shares one precomputed bcrypt hash (password
+"Synthetic@123"), so no hashing happens while generating. Denormalized
+counters are filled in as the rows are generated or backfilled with
+set-based SQL at the end.
+
+Usage:
+    python seed_synthetic.py --scale 0.01             # ~10k users, quick local run
+    python seed_synthetic.py --seed 7                 # ~1M users, ~15M rows
+    python seed_synthetic.py --scale 2 --database-url sqlite:///./load.db
+"""
+import argparse
+import random
+import re
+import time
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+from sqlalchemy import create_engine, func, select, text
+
+import schemas
+from database import (
+    Base, engine as default_engine, User, Job, JobApplication, Blog, BlogLike,
+    Course, CourseLesson, CourseEnrollment, LessonProgress,
+)
+
+SYNTHETIC_PASSWORD = "Synthetic@123"
+# bcrypt hash of SYNTHETIC_PASSWORD, computed once so runs stay fast and repeatable
+SYNTHETIC_PASSWORD_HASH = "$2b$12$fBloa9Z3jH5.luP3OPqrjuBoiP8jnR7SUQ2H.qs6iXPLmJv6gGCnm"
+
+# Row counts at --scale 1
+BASE_COUNTS = {
+    "users": 1_000_000,
+    "jobs": 100_000,
+    "applications": 2_000_000,
+    "blogs": 200_000,
+    "blog_likes": 5_000_000,
+    "courses": 2_000,
+    "enrollments": 1_000_000,
+}
+
+RECRUITER_SHARE = 0.02
+INSERT_CHUNK_SIZE = 10_000
+
+# Power-law exponents: higher means popularity is more concentrated
+JOB_POPULARITY = 1.1
+BLOG_POPULARITY = 1.2
+COURSE_POPULARITY = 1.3
+AUTHOR_POPULARITY = 1.2
+TAG_POPULARITY = 1.0
+
+FIRST_NAMES = [
+    "Aarav", "Vivaan", "Aditya", "Vihaan", "Arjun", "Sai", "Reyansh", "Krishna", "Ishaan", "Rohan",
+    "Ananya", "Diya", "Aadhya", "Saanvi", "Pari", "Anika", "Navya", "Myra", "Sara", "Ira",
+    "Kabir", "Meera", "Nikhil", "Priya", "Rahul", "Sneha", "Tara", "Varun", "Zoya", "Farhan",
+]
+LAST_NAMES = [
+    "Sharma", "Verma", "Iyer", "Reddy", "Nair", "Patel", "Gupta", "Mehta", "Joshi", "Kulkarni",
+    "Rao", "Das", "Bose", "Menon", "Pillai", "Chopra", "Kapoor", "Malhotra", "Singh", "Khan",
+]
+CITIES = [
+    "Mumbai", "Delhi", "Bangalore", "Chennai", "Hyderabad", "Pune", "Kolkata", "Ahmedabad",
+    "Jaipur", "Kochi", "Chandigarh", "Goa", "Lucknow", "Indore", "Bhopal",
+]
+UNIVERSITIES = [
+    "CEPT University", "SPA Delhi", "IIT Kharagpur", "IIT Roorkee", "JJ College of Architecture",
+    "NIT Trichy", "Manipal School of Architecture", "Sir JJ School of Art", "MIT Pune", "BMS College",
+]
+SPECIALIZATIONS = [
+    "Urban Design", "Landscape Architecture", "Interior Design", "Sustainable Design",
+    "Conservation", "Computational Design", "Housing", "Structural Systems",
+]
+JOB_TITLES = [
+    "Architect", "Senior Architect", "Junior Architect", "Architectural Designer", "Interior Designer",
+    "Urban Designer", "Landscape Architect", "BIM Coordinator", "Project Architect", "Design Intern",
+    "Visualization Artist", "Sustainability Consultant", "Site Architect", "Design Manager",
+]
+COMPANY_PREFIXES = ["Studio", "Atelier", "Design", "Urban", "Green", "Form", "Axis", "Habitat", "Line", "Grid"]
+COMPANY_SUFFIXES = ["Architects", "Design Lab", "Associates", "Collective", "Partners", "Workshop", "Consultants"]
+TAGS = [
+    "Architecture", "Design", "BIM", "Revit", "AutoCAD", "SketchUp", "Rhino", "Grasshopper",
+    "Sustainability", "Urban Planning", "Interior", "Landscape", "Heritage", "Parametric",
+    "Housing", "Residential", "Commercial", "Visualization", "3D Modeling", "Project Management",
+    "Green Building", "LEED", "Construction", "Detailing", "Facade", "Lighting", "Acoustics",
+    "Materials", "Research", "Teaching", "NATA", "Portfolio", "Career", "Internship", "Competition",
+]
+WORDS = (
+    "space light form structure material context site facade courtyard timber concrete brick "
+    "steel glass ventilation daylight climate section plan elevation detail scale texture "
+    "community housing public urban landscape heritage adaptive reuse studio design process "
+    "sketch model render drawing proportion rhythm threshold envelope module grid thermal "
+    "comfort passive energy water planting street block neighbourhood city region research"
+).split()
+
+COURSE_TOPICS = [
+    "Architectural Design", "Building Construction", "Structural Systems", "Environmental Design",
+    "History of Architecture", "Urban Planning", "Revit for Architects", "Parametric Design",
+    "Working Drawings", "Landscape Design", "Interior Detailing", "Portfolio Development",
+]
+
+
+class PowerLaw:
+    """Zipf-like popularity over a set of ids; rank order is shuffled so popular ids are spread out"""
+
+    def __init__(self, rng: random.Random, ids, exponent: float):
+        self.ids = list(ids)
+        rng.shuffle(self.ids)
+        self.cum_weights = list(accumulate(1.0 / (rank + 1) ** exponent for rank in range(len(self.ids))))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def choice(self, rng: random.Random):
+        return self.ids[bisect_left(self.cum_weights, rng.random() * self.cum_weights[-1])]
+
+    def sample_distinct(self, rng: random.Random, k: int):
+        """Up to k distinct ids, drawn by popularity"""
+        k = min(k, len(self.ids))
+        chosen = set()
+        attempts = 0
+        while len(chosen) < k and attempts < k * 20:
+            chosen.add(self.choice(rng))
+            attempts += 1
+        return sorted(chosen)
+
+
+def _rng(seed: int, name: str) -> random.Random:
+    # One stream per table so changing one count doesn't reshuffle the others
+    return random.Random(f"{seed}:{name}")
+
+
+def _activity(rng: random.Random, mean: float, cap: int) -> int:
+    """Heavy-tailed per-user activity count with the given mean"""
+    # paretovariate(1.5) - 1 has mean 2
+    return min(cap, int((rng.paretovariate(1.5) - 1) * mean / 2 + rng.random()))
+
+
+def _timestamp(rng: random.Random, start: datetime, end: datetime, growth: float = 2.0) -> datetime:
+    """A moment in [start, end], denser towards end (growth > 1 means a growing platform)"""
+    return start + (end - start) * (rng.random() ** (1.0 / growth))
+
+
+def _after(rng: random.Random, earliest: datetime, end: datetime) -> datetime:
+    """A moment after earliest, usually soon after it"""
+    if earliest >= end:
+        return end
+    return earliest + (end - earliest) * (rng.random() ** 3)
+
+
+def _words(rng: random.Random, count: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+
+def _paragraphs(rng: random.Random, sentences: int) -> str:
+    return " ".join(_words(rng, rng.randint(8, 18)).capitalize() + "." for _ in range(sentences))
+
+
+def _tags(rng: random.Random, popularity: PowerLaw, low: int, high: int) -> str:
+    return ", ".join(popularity.sample_distinct(rng, rng.randint(low, high)))
+
+
+def _next_id(conn, model) -> int:
+    return (conn.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+class Generator:
+    """Generates every table in dependency order inside one transaction"""
+
+    def __init__(self, engine, seed: int, scale: float, end: datetime, days: int):
+        self.engine = engine
+        self.seed = seed
+        self.counts = {name: max(1, int(round(base * scale))) for name, base in BASE_COUNTS.items()}
+        self.end = end
+        self.start = end - timedelta(days=days)
+        self.totals = {}
+
+    # Timestamps are kept as float seconds since self.start in compact arrays
+    def offset(self, moment: datetime) -> float:
+        return (moment - self.start).total_seconds()
+
+    def moment(self, offset: float) -> datetime:
+        return self.start + timedelta(seconds=offset)
+
+    def insert(self, conn, model, rows, label: str) -> int:
+        """Bulk insert an iterable of row dicts in chunks"""
+        table = model.__table__
+        chunk = []
+        written = 0
+        started = time.perf_counter()
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= INSERT_CHUNK_SIZE:
+                conn.execute(table.insert(), chunk)
+                written += len(chunk)
+                chunk = []
+                if written % (INSERT_CHUNK_SIZE * 20) == 0:
+                    print(f"   ... {label}: {written:,}")
+        if chunk:
+            conn.execute(table.insert(), chunk)
+            written += len(chunk)
+        self.totals[label] = written
+        print(f"✅ {label}: {written:,} rows in {time.perf_counter() - started:.1f}s")
+        return written
+
+    def run(self):
+        Base.metadata.create_all(bind=self.engine)
+        with self.engine.begin() as conn:
+            if conn.dialect.name == "sqlite":
+                # Bulk load: durability of a half-written synthetic database doesn't matter
+                conn.exec_driver_sql("PRAGMA synchronous=OFF")
+                conn.exec_driver_sql("PRAGMA cache_size=-200000")
+            self.generate_users(conn)
+            self.generate_jobs(conn)
+            self.generate_applications(conn)
+            self.generate_blogs(conn)
+            self.generate_blog_likes(conn)
+            self.generate_courses(conn)
+            self.generate_enrollments(conn)
+            self.backfill_counters(conn)
+
+    # ---------------------------------------------------------------- users
+
+    def generate_users(self, conn):
+        rng = _rng(self.seed, "users")
+        count = self.counts["users"]
+        self.user_first_id = _next_id(conn, User)
+        # Sign-up times, sorted so ids grow with time as they would in production
+        self.user_created = array("d", sorted(
+            self.offset(_timestamp(rng, self.start, self.end, growth=2.5)) for _ in range(count)
+        ))
+        self.recruiter_ids = []
+        user_types = list(schemas.UserType)
+
+        def rows():
+            for offset in range(count):
+                user_id = self.user_first_id + offset
+                created = self.moment(self.user_created[offset])
+                is_recruiter = rng.random() < RECRUITER_SHARE
+                if is_recruiter:
+                    self.recruiter_ids.append(user_id)
+                first_name = rng.choice(FIRST_NAMES)
+                last_name = rng.choice(LAST_NAMES)
+                yield {
+                    "id": user_id,
+                    "email": f"synthetic{self.seed}.{user_id}@synthetic.example.com",
+                    "username": f"syn{self.seed}_{user_id}",
+                    "first_name": first_name,
+                    "last_name": last_name,
+                    "hashed_password": SYNTHETIC_PASSWORD_HASH,
+                    "role": schemas.UserRole.RECRUITER if is_recruiter else schemas.UserRole.USER,
+                    "user_type": schemas.UserType.ARCHITECT if is_recruiter else rng.choice(user_types),
+                    "is_active": rng.random() > 0.02,
+                    "is_verified": rng.random() > 0.1,
+                    "university": rng.choice(UNIVERSITIES) if rng.random() < 0.6 else None,
+                    "specialization": rng.choice(SPECIALIZATIONS) if rng.random() < 0.4 else None,
+                    "location": rng.choice(CITIES),
+                    "company_name": f"{rng.choice(COMPANY_PREFIXES)} {rng.choice(COMPANY_SUFFIXES)}" if is_recruiter else None,
+                    "created_at": created,
+                    "updated_at": created,
+                }
+
+        self.insert(conn, User, rows(), "users")
+        if not self.recruiter_ids:
+            self.recruiter_ids.append(self.user_first_id)
+
+    def user_created_at(self, user_id: int) -> datetime:
+        return self.moment(self.user_created[user_id - self.user_first_id])
+
+    # ----------------------------------------------------------------- jobs
+
+    def generate_jobs(self, conn):
+        rng = _rng(self.seed, "jobs")
+        count = self.counts["jobs"]
+        self.job_first_id = _next_id(conn, Job)
+        self.job_created = array("d")
+        open_job_ids = []
+        recruiters = PowerLaw(rng, self.recruiter_ids, AUTHOR_POPULARITY)
+        tags = PowerLaw(rng, TAGS, TAG_POPULARITY)
+        work_modes = list(schemas.WorkMode)
+        job_types = list(schemas.JobType)
+        levels = list(schemas.ExperienceLevel)
+
+        postings = sorted(
+            (self.offset(_after(rng, self.user_created_at(recruiter_id), self.end)), recruiter_id)
+            for recruiter_id in (recruiters.choice(rng) for _ in range(count))
+        )
+
+        def rows():
+            for offset, (created_offset, recruiter_id) in enumerate(postings):
+                job_id = self.job_first_id + offset
+                created = self.moment(created_offset)
+                self.job_created.append(created_offset)
+                roll = rng.random()
+                job_status = (
+                    schemas.JobStatus.DRAFT if roll < 0.05
+                    else schemas.JobStatus.CLOSED if roll < 0.2
+                    else schemas.JobStatus.PUBLISHED
+                )
+                if job_status != schemas.JobStatus.DRAFT:
+                    open_job_ids.append(job_id)
+                salary_min = rng.randrange(300_000, 2_500_000, 50_000)
+                company = f"{rng.choice(COMPANY_PREFIXES)} {rng.choice(COMPANY_SUFFIXES)}"
+                yield {
+                    "id": job_id,
+                    "title": rng.choice(JOB_TITLES),
+                    "company": company,
+                    "location": f"{rng.choice(CITIES)}, India",
+                    "work_mode": rng.choice(work_modes),
+                    "job_type": rng.choice(job_types),
+                    "experience_level": rng.choice(levels),
+                    "salary_min": salary_min,
+                    "salary_max": salary_min + rng.randrange(100_000, 1_000_000, 50_000),
+                    "currency": "INR",
+                    "description": _paragraphs(rng, rng.randint(4, 12)),
+                    "requirements": _paragraphs(rng, rng.randint(2, 6)),
+                    "benefits": "Health Insurance, Paid Leave, Professional Development",
+                    "tags": _tags(rng, tags, 2, 6),
+                    "application_deadline": created + timedelta(days=rng.randint(14, 90)),
+                    "contact_email": f"hr.{job_id}@synthetic.example.com",
+                    "company_description": _paragraphs(rng, 2),
+                    "status": job_status,
+                    "recruiter_id": recruiter_id,
+                    "created_at": created,
+                    "updated_at": created,
+                }
+
+        self.insert(conn, Job, rows(), "jobs")
+        self.open_jobs = PowerLaw(rng, open_job_ids or [self.job_first_id], JOB_POPULARITY)
+
+    def generate_applications(self, conn):
+        rng = _rng(self.seed, "applications")
+        mean = self.counts["applications"] / self.counts["users"]
+        statuses = list(schemas.ApplicationStatus)
+
+        def rows():
+            for offset in range(self.counts["users"]):
+                applicant_id = self.user_first_id + offset
+                applicant_created = self.user_created_at(applicant_id)
+                for job_id in self.open_jobs.sample_distinct(rng, _activity(rng, mean, 200)):
+                    job_created = self.moment(self.job_created[job_id - self.job_first_id])
+                    applied = _after(rng, max(applicant_created, job_created), self.end)
+                    yield {
+                        "job_id": job_id,
+                        "applicant_id": applicant_id,
+                        "status": rng.choice(statuses),
+                        "cover_letter": _paragraphs(rng, rng.randint(1, 4)),
+                        "applied_at": applied,
+                        "updated_at": applied,
+                    }
+
+        self.insert(conn, JobApplication, rows(), "job_applications")
+
+    # ---------------------------------------------------------------- blogs
+
+    def generate_blogs(self, conn):
+        rng = _rng(self.seed, "blogs")
+        count = self.counts["blogs"]
+        self.blog_first_id = _next_id(conn, Blog)
+        self.blog_created = array("d")
+        published_ids = []
+        authors = PowerLaw(rng, range(self.user_first_id, self.user_first_id + self.counts["users"]), AUTHOR_POPULARITY)
+        tags = PowerLaw(rng, TAGS, TAG_POPULARITY)
+        categories = list(schemas.BlogCategory)
+
+        posts = sorted(
+            (self.offset(_after(rng, self.user_created_at(author_id), self.end)), author_id)
+            for author_id in (authors.choice(rng) for _ in range(count))
+        )
+
+        def rows():
+            for offset, (created_offset, author_id) in enumerate(posts):
+                blog_id = self.blog_first_id + offset
+                created = self.moment(created_offset)
+                self.blog_created.append(created_offset)
+                blog_status = schemas.BlogStatus.DRAFT if rng.random() < 0.08 else schemas.BlogStatus.PUBLISHED
+                if blog_status == schemas.BlogStatus.PUBLISHED:
+                    published_ids.append(blog_id)
+                title = _words(rng, rng.randint(4, 9)).title()
+                content = "\n\n".join(_paragraphs(rng, rng.randint(3, 7)) for _ in range(rng.randint(2, 6)))
+                yield {
+                    "id": blog_id,
+                    "title": title,
+                    "slug": f"{re.sub(r'[^a-z0-9]+', '-', title.lower()).strip('-')}-{blog_id}",
+                    "content": content,
+                    "excerpt": content[:200],
+                    "category": rng.choice(categories),
+                    "tags": _tags(rng, tags, 1, 5),
+                    "is_featured": rng.random() < 0.01,
+                    "status": blog_status,
+                    "author_id": author_id,
+                    "created_at": created,
+                    "updated_at": created,
+                }
+
+        self.insert(conn, Blog, rows(), "blogs")
+        self.published_blogs = PowerLaw(rng, published_ids or [self.blog_first_id], BLOG_POPULARITY)
+
+    def generate_blog_likes(self, conn):
+        rng = _rng(self.seed, "blog_likes")
+        mean = self.counts["blog_likes"] / self.counts["users"]
+
+        def rows():
+            for offset in range(self.counts["users"]):
+                user_id = self.user_first_id + offset
+                user_created = self.user_created_at(user_id)
+                for blog_id in self.published_blogs.sample_distinct(rng, _activity(rng, mean, 500)):
+                    blog_created = self.moment(self.blog_created[blog_id - self.blog_first_id])
+                    yield {
+                        "blog_id": blog_id,
+                        "user_id": user_id,
+                        "created_at": _after(rng, max(user_created, blog_created), self.end),
+                    }
+
+        self.insert(conn, BlogLike, rows(), "blog_likes")
+
+    # -------------------------------------------------------------- courses
+
+    def generate_courses(self, conn):
+        rng = _rng(self.seed, "courses")
+        count = self.counts["courses"]
+        self.course_first_id = _next_id(conn, Course)
+        lesson_id = _next_id(conn, CourseLesson)
+        # course_id -> [(lesson_id, duration), ...] in lesson order
+        self.course_lessons = {}
+        self.course_created = {}
+        published_ids = []
+        levels = list(schemas.CourseLevel)
+        lesson_rows = []
+
+        created_times = sorted(_timestamp(rng, self.start, self.end, growth=1.5) for _ in range(count))
+
+        def rows():
+            nonlocal lesson_id
+            for offset, created in enumerate(created_times):
+                course_id = self.course_first_id + offset
+                self.course_created[course_id] = created
+                course_status = schemas.CourseStatus.DRAFT if rng.random() < 0.1 else schemas.CourseStatus.PUBLISHED
+                if course_status == schemas.CourseStatus.PUBLISHED:
+                    published_ids.append(course_id)
+                lessons = []
+                for order_index in range(rng.randint(8, 40)):
+                    duration = rng.randint(180, 1800)
+                    lessons.append((lesson_id, duration))
+                    lesson_rows.append({
+                        "id": lesson_id,
+                        "course_id": course_id,
+                        "title": f"Lesson {order_index + 1}: {_words(rng, 3).title()}",
+                        "description": _paragraphs(rng, 2),
+                        "video_duration": duration,
+                        "order_index": order_index,
+                        "is_free": order_index == 0,
+                        "created_at": created,
+                        "updated_at": created,
+                    })
+                    lesson_id += 1
+                self.course_lessons[course_id] = lessons
+                yield {
+                    "id": course_id,
+                    "title": f"{rng.choice(COURSE_TOPICS)} {rng.choice(['Foundations', 'Studio', 'Masterclass', 'Essentials', 'Advanced'])}",
+                    "description": _paragraphs(rng, rng.randint(6, 15)),
+                    "short_description": _words(rng, 12).capitalize(),
+                    "level": rng.choice(levels),
+                    "duration": f"{rng.randint(2, 16)} weeks",
+                    "max_students": rng.choice([50, 100, 500, 1000]),
+                    "price": rng.choice([0, 499, 999, 1999, 4999]),
+                    "status": course_status,
+                    "total_video_duration": sum(duration for _, duration in lessons),
+                    "created_at": created,
+                    "updated_at": created,
+                }
+
+        self.insert(conn, Course, rows(), "courses")
+        self.insert(conn, CourseLesson, iter(lesson_rows), "course_lessons")
+        self.published_courses = PowerLaw(rng, published_ids or [self.course_first_id], COURSE_POPULARITY)
+
+    def generate_enrollments(self, conn):
+        rng = _rng(self.seed, "enrollments")
+        mean = self.counts["enrollments"] / self.counts["users"]
+        enrollment_id = _next_id(conn, CourseEnrollment)
+        progress_rows = []
+
+        def rows():
+            nonlocal enrollment_id, progress_rows
+            for offset in range(self.counts["users"]):
+                student_id = self.user_first_id + offset
+                user_created = self.user_created_at(student_id)
+                for course_id in self.published_courses.sample_distinct(rng, _activity(rng, mean, 50)):
+                    enrolled = _after(rng, max(user_created, self.course_created[course_id]), self.end)
+                    lessons = self.course_lessons[course_id]
+                    # Most learners drop off early; completions are rare
+                    completed_lessons = min(len(lessons), int(len(lessons) * rng.random() ** 2.5 + 0.5))
+                    watched = enrolled
+                    for index, (lesson_id, duration) in enumerate(lessons[:completed_lessons + 1]):
+                        watched = _after(rng, watched, self.end)
+                        done = index < completed_lessons
+                        progress_rows.append({
+                            "enrollment_id": enrollment_id,
+                            "lesson_id": lesson_id,
+                            "current_time": duration if done else rng.randint(0, duration),
+                            "completed": done,
+                            "last_watched_at": watched,
+                            "created_at": watched,
+                            "updated_at": watched,
+                        })
+                    yield {
+                        "id": enrollment_id,
+                        "course_id": course_id,
+                        "student_id": student_id,
+                        "enrolled_at": enrolled,
+                        "completed_lessons": completed_lessons,
+                        "progress_percentage": round(completed_lessons * 100.0 / len(lessons), 2),
+                        "completed": completed_lessons >= len(lessons),
+                        "last_accessed_at": watched,
+                    }
+                    enrollment_id += 1
+                # Progress rows reference enrollments, so write them once those are in
+                if len(progress_rows) >= INSERT_CHUNK_SIZE * 10:
+                    yield None
+
+        started = time.perf_counter()
+        chunk = []
+        enrollments = progress = 0
+        for row in rows():
+            if row is not None:
+                chunk.append(row)
+            if row is None or len(chunk) >= INSERT_CHUNK_SIZE:
+                if chunk:
+                    conn.execute(CourseEnrollment.__table__.insert(), chunk)
+                    enrollments += len(chunk)
+                    chunk = []
+                if row is None:
+                    conn.execute(LessonProgress.__table__.insert(), progress_rows)
+                    progress += len(progress_rows)
+                    progress_rows = []
+        if chunk:
+            conn.execute(CourseEnrollment.__table__.insert(), chunk)
+            enrollments += len(chunk)
+        for start in range(0, len(progress_rows), INSERT_CHUNK_SIZE):
+            conn.execute(LessonProgress.__table__.insert(), progress_rows[start:start + INSERT_CHUNK_SIZE])
+        progress += len(progress_rows)
+        self.totals["course_enrollments"] = enrollments
+        self.totals["lesson_progress"] = progress
+        print(f"✅ course_enrollments: {enrollments:,} rows, lesson_progress: {progress:,} rows "
+              f"in {time.perf_counter() - started:.1f}s")
+
+    # ------------------------------------------------------------- counters
+
+    def backfill_counters(self, conn):
+        started = time.perf_counter()
+        conn.execute(text("""
+            UPDATE blogs SET
+                likes_count = (SELECT COUNT(*) FROM blog_likes WHERE blog_likes.blog_id = blogs.id),
+                views_count = (SELECT COUNT(*) FROM blog_likes WHERE blog_likes.blog_id = blogs.id) * 12 + id % 50
+            WHERE id >= :first_id
+        """), {"first_id": self.blog_first_id})
+        print(f"✅ Backfilled blog counters in {time.perf_counter() - started:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a large, deterministic synthetic dataset")
+    parser.add_argument("--seed", type=int, default=42, help="random seed (same seed, same data)")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplier for the base row counts (1.0 = ~1M users)")
+    parser.add_argument("--days", type=int, default=730, help="length of the simulated history")
+    parser.add_argument("--end", default="2025-06-01", help="end of the simulated history (YYYY-MM-DD)")
+    parser.add_argument("--database-url", help="target database (defaults to the application database)")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url) if args.database_url else default_engine
+    generator = Generator(engine, args.seed, args.scale, datetime.strptime(args.end, "%Y-%m-%d"), args.days)
+
+    print(f"🌱 Generating synthetic data (seed={args.seed}, scale={args.scale})")
+    for name, count in generator.counts.items():
+        print(f"   {name}: ~{count:,}")
+    started = time.perf_counter()
+    generator.run()
+    print(f"🎉 Done in {time.perf_counter() - started:.1f}s; log in with any synthetic email and password {SYNTHETIC_PASSWORD!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""
+Online backups of the SQLite database.
+
+A backup copies the live database with SQLite's online backup API
+(sqlite3.Connection.backup) a batch of pages at a time, so writers only
+wait for one batch rather than the whole copy and the result is always a
+consistent snapshot - a plain file copy can capture a half-written page.
+The snapshot is checked with PRAGMA integrity_check, gzip-compressed into
+BACKUP_DIR as backup_<timestamp>.db.gz and older backups are rotated out by
+count and age.
+
+Backups run on a single background thread; job state (phase, progress,
+result) is kept in memory for the admin API. Only one backup runs at a
+time, and asking for another while one is in flight returns that job.
+"""
+
+import gzip
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+BACKUP_DIR = Path(os.getenv("BACKUP_DIR", "backups"))
+# Rotation: keep at most this many backups, none older than the age limit
+BACKUP_KEEP = int(os.getenv("BACKUP_KEEP", "14"))
+BACKUP_MAX_AGE_DAYS = int(os.getenv("BACKUP_MAX_AGE_DAYS", "30"))
+# Pages copied per backup step; the source is unlocked between steps
+BACKUP_PAGES_PER_STEP = int(os.getenv("BACKUP_PAGES_PER_STEP", "1024"))
+BACKUP_COMPRESS_LEVEL = int(os.getenv("BACKUP_COMPRESS_LEVEL", "6"))
+MAX_TRACKED_JOBS = 50
+
+BACKUP_PREFIX = "backup_"
+BACKUP_SUFFIX = ".db.gz"
+
+# Share of job progress taken by each phase
+_COPY_SHARE = 80.0
+_VERIFY_SHARE = 5.0
+
+_executor: Optional[ThreadPoolExecutor] = None
+_jobs: "OrderedDict[str, dict]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def get_backup_executor() -> ThreadPoolExecutor:
+    """Return the backup thread, creating it on first use"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-backup")
+    return _executor
+
+
+def shutdown_backup_executor():
+    """Cancel queued backups (called on application shutdown); a running copy finishes"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def database_path() -> Path:
+    """File behind the application's SQLite engine"""
+    from database import engine
+
+    if engine.url.get_backend_name() != "sqlite" or not engine.url.database:
+        raise RuntimeError(f"Online backups need a SQLite database file, not {engine.url.get_backend_name()}")
+    return Path(engine.url.database).resolve()
+
+
+def _update_job(job_id: str, **values):
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is not None:
+            job.update(values)
+
+
+def _copy_database(job_id: str, source_path: Path, snapshot_path: Path):
+    def progress(status, remaining, total):
+        done = total - remaining
+        _update_job(
+            job_id,
+            pages_total=total,
+            pages_copied=done,
+            progress=round(_COPY_SHARE * done / total, 1) if total else 0.0,
+        )
+
+    # Read-only URI so the backup can never modify the live database
+    source = sqlite3.connect(f"{source_path.as_uri()}?mode=ro", uri=True)
+    target = sqlite3.connect(snapshot_path)
+    try:
+        source.backup(target, pages=BACKUP_PAGES_PER_STEP, progress=progress)
+    finally:
+        target.close()
+        source.close()
+
+
+def _verify_snapshot(snapshot_path: Path):
+    connection = sqlite3.connect(snapshot_path)
+    try:
+        rows = connection.execute("PRAGMA integrity_check").fetchall()
+    finally:
+        connection.close()
+    if [row[0] for row in rows] != ["ok"]:
+        raise RuntimeError(f"Integrity check failed: {'; '.join(row[0] for row in rows[:5])}")
+
+
+def _compress(job_id: str, snapshot_path: Path, output_path: Path):
+    total = snapshot_path.stat().st_size or 1
+    partial_path = output_path.with_name(output_path.name + ".partial")
+    share = 100.0 - _COPY_SHARE - _VERIFY_SHARE
+    done = 0
+    try:
+        with open(snapshot_path, "rb") as source, gzip.open(partial_path, "wb", compresslevel=BACKUP_COMPRESS_LEVEL) as target:
+            for chunk in iter(lambda: source.read(1024 * 1024), b""):
+                target.write(chunk)
+                done += len(chunk)
+                _update_job(job_id, progress=round(_COPY_SHARE + _VERIFY_SHARE + share * done / total, 1))
+        os.replace(partial_path, output_path)
+    except BaseException:
+        partial_path.unlink(missing_ok=True)
+        raise
+
+
+def _record_last_backup(finished_at: datetime, requested_by: Optional[int]):
+    import crud
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        crud.create_or_update_system_setting(
+            db, "last_backup", finished_at.isoformat(), "Last database backup timestamp", requested_by
+        )
+    finally:
+        db.close()
+
+
+def _run_backup(job_id: str, requested_by: Optional[int]):
+    """Worker body: snapshot, verify, compress and rotate"""
+    started = time.perf_counter()
+    _update_job(job_id, status="running", phase="copying", started_at=datetime.utcnow())
+    snapshot_path = None
+    try:
+        source_path = database_path()
+        BACKUP_DIR.mkdir(parents=True, exist_ok=True)
+        name = f"{BACKUP_PREFIX}{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}_{job_id[:8]}{BACKUP_SUFFIX}"
+        snapshot_path = BACKUP_DIR / f".{job_id}.db"
+
+        _copy_database(job_id, source_path, snapshot_path)
+        _update_job(job_id, phase="verifying", progress=_COPY_SHARE)
+        _verify_snapshot(snapshot_path)
+        _update_job(job_id, phase="compressing", progress=_COPY_SHARE + _VERIFY_SHARE)
+        database_size = snapshot_path.stat().st_size
+        _compress(job_id, snapshot_path, BACKUP_DIR / name)
+
+        removed = rotate_backups()
+        finished_at = datetime.utcnow()
+        _record_last_backup(finished_at, requested_by)
+        _update_job(
+            job_id,
+            status="completed",
+            phase=None,
+            progress=100.0,
+            file=name,
+            database_bytes=database_size,
+            backup_bytes=(BACKUP_DIR / name).stat().st_size,
+            rotated_out=removed,
+            duration_seconds=round(time.perf_counter() - started, 3),
+            finished_at=finished_at,
+        )
+        logger.info(f"Database backup {name} completed")
+    except Exception as e:
+        logger.error(f"Database backup {job_id} failed: {e}")
+        _update_job(job_id, status="failed", error=str(e), finished_at=datetime.utcnow())
+    finally:
+        if snapshot_path is not None:
+            snapshot_path.unlink(missing_ok=True)
+
+
+def submit_backup(requested_by: Optional[int] = None) -> dict:
+    """Queue a backup, or return the one already queued or running"""
+    with _lock:
+        for job in _jobs.values():
+            if job["status"] in ("queued", "running"):
+                return dict(job)
+
+        job = {
+            "id": uuid.uuid4().hex,
+            "status": "queued",
+            "phase": None,
+            "progress": 0.0,
+            "pages_total": None,
+            "pages_copied": None,
+            "file": None,
+            "error": None,
+            "requested_by": requested_by,
+            "created_at": datetime.utcnow(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        _jobs[job["id"]] = job
+        # Forget the oldest finished jobs once the registry is full
+        for job_id in [j for j, v in _jobs.items() if v["status"] in ("completed", "failed")]:
+            if len(_jobs) <= MAX_TRACKED_JOBS:
+                break
+            del _jobs[job_id]
+
+    get_backup_executor().submit(_run_backup, job["id"], requested_by)
+    return dict(job)
+
+
+def get_backup_job(job_id: str) -> Optional[dict]:
+    with _lock:
+        job = _jobs.get(job_id)
+        return dict(job) if job else None
+
+
+def list_backup_jobs() -> List[dict]:
+    """Tracked jobs, newest first"""
+    with _lock:
+        return [dict(job) for job in reversed(_jobs.values())]
+
+
+def list_backups() -> List[dict]:
+    """Backup files on disk, newest first"""
+    if not BACKUP_DIR.is_dir():
+        return []
+    backups = []
+    for path in BACKUP_DIR.glob(f"{BACKUP_PREFIX}*{BACKUP_SUFFIX}"):
+        stat = path.stat()
+        backups.append({
+            "file": path.name,
+            "size_bytes": stat.st_size,
+            "created_at": datetime.utcfromtimestamp(stat.st_mtime),
+        })
+    backups.sort(key=lambda backup: backup["file"], reverse=True)
+    return backups
+
+
+def rotate_backups() -> List[str]:
+    """Delete backups beyond BACKUP_KEEP or older than BACKUP_MAX_AGE_DAYS, always keeping the newest"""
+    cutoff = datetime.utcnow() - timedelta(days=BACKUP_MAX_AGE_DAYS)
+    removed = []
+    for index, backup in enumerate(list_backups()):
+        if index == 0 or (index < BACKUP_KEEP and backup["created_at"] >= cutoff):
+            continue
+        (BACKUP_DIR / backup["file"]).unlink(missing_ok=True)
+        removed.append(backup["file"])
+    return removed
@@ -0,0 +1,252 @@
+"""
+Precomputed public course detail documents.
+
+A course landing page needs the course row, its lessons and materials, the
+enrollment count and the rating aggregate. Instead of running those queries
+on every anonymous hit, the public detail and lesson list responses are
+assembled once, serialized to JSON and kept in memory until a write touches
+the course.
+
+Invalidation is driven by SQLAlchemy session events: any committed insert,
+update or delete of a Course, CourseLesson, CourseMaterial or CourseReview
+(and enrollment inserts/deletes, which change the enrolled count) drops the
+affected course's document. Bulk query().update()/delete() statements on
+those tables clear every document unless they name their courses with
+execution_options(course_document_ids=[...]).
+
+Per-course lesson totals, used to derive enrollment progress percentages,
+are cached alongside the documents and invalidated the same way.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, Set
+
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session
+
+import schemas
+from database import Course, CourseLesson, CourseMaterial, CourseReview, CourseEnrollment
+
+MAX_DOCUMENTS = int(os.getenv("COURSE_DOCUMENT_CACHE_SIZE", "500"))
+
+# Marker stored in session.info when a bulk statement touched course tables
+_ALL = object()
+_PENDING_KEY = "course_documents_stale"
+
+# Models whose rows carry a course_id that owns the cached document
+_CHILD_MODELS = (CourseLesson, CourseMaterial, CourseReview)
+_TRACKED_MODELS = (Course, CourseEnrollment) + _CHILD_MODELS
+
+
+class CourseDocument:
+    """Serialized detail and lesson-list responses for one published course"""
+
+    __slots__ = ("course_id", "detail", "lessons", "etags")
+
+    def __init__(self, course_id: int, detail: bytes, lessons: bytes):
+        self.course_id = course_id
+        self.detail = detail
+        self.lessons = lessons
+        self.etags = {
+            "detail": '"' + hashlib.sha1(detail).hexdigest() + '"',
+            "lessons": '"' + hashlib.sha1(lessons).hexdigest() + '"',
+        }
+
+
+_documents: "OrderedDict[int, CourseDocument]" = OrderedDict()
+_lock = threading.Lock()
+# Bumped on every invalidation so a document built from pre-write data is never stored
+_generation = 0
+
+_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+# course_id -> number of lessons
+_lesson_totals: dict = {}
+
+
+def build_course_document(db: Session, course_id: int) -> Optional[CourseDocument]:
+    """Assemble the public documents for a course, or None if it isn't published"""
+    course = db.query(Course).filter(Course.id == course_id).first()
+    if not course or course.status != schemas.CourseStatus.PUBLISHED:
+        return None
+
+    lessons = (
+        db.query(CourseLesson)
+        .filter(CourseLesson.course_id == course_id)
+        .order_by(CourseLesson.order_index)
+        .all()
+    )
+    materials = (
+        db.query(CourseMaterial)
+        .filter(CourseMaterial.course_id == course_id)
+        .order_by(CourseMaterial.order_index)
+        .all()
+    )
+    enrolled_count = db.query(func.count(CourseEnrollment.id)).filter(
+        CourseEnrollment.course_id == course_id
+    ).scalar() or 0
+    course_dict = {
+        k: v for k, v in course.__dict__.items()
+        if k not in ("lessons", "materials", "reviews", "_sa_instance_state")
+    }
+    detail = schemas.CourseDetailResponse(
+        **course_dict,
+        lessons=[schemas.CourseLessonResponse(**lesson.__dict__) for lesson in lessons],
+        materials=[schemas.CourseMaterialResponse(**material.__dict__) for material in materials],
+        enrolled_count=enrolled_count,
+        total_lessons=len(lessons),
+        total_duration=course.total_video_duration or 0,
+        has_free_preview=any(lesson.is_free for lesson in lessons),
+        rating_histogram={stars: getattr(course, f"rating_{stars}_count") or 0 for stars in range(1, 6)},
+    )
+
+    # Lesson info without video URLs (URLs are fetched separately based on access)
+    lesson_list = [
+        {
+            "id": lesson.id,
+            "title": lesson.title,
+            "description": lesson.description,
+            "video_duration": lesson.video_duration,
+            "order_index": lesson.order_index,
+            "is_free": lesson.is_free,
+            "has_video": bool(lesson.video_url),
+        }
+        for lesson in lessons
+    ]
+
+    return CourseDocument(
+        course_id,
+        detail.model_dump_json().encode("utf-8"),
+        json.dumps(lesson_list, separators=(",", ":")).encode("utf-8"),
+    )
+
+
+def get_course_document(db: Session, course_id: int) -> Optional[CourseDocument]:
+    """Return the cached document for a published course, building it on a miss"""
+    with _lock:
+        document = _documents.get(course_id)
+        if document is not None:
+            _documents.move_to_end(course_id)
+            _stats["hits"] += 1
+            return document
+        _stats["misses"] += 1
+        generation = _generation
+
+    document = build_course_document(db, course_id)
+    if document is None:
+        return None
+
+    with _lock:
+        if generation == _generation:
+            _documents[course_id] = document
+            _documents.move_to_end(course_id)
+            while len(_documents) > MAX_DOCUMENTS:
+                _documents.popitem(last=False)
+    return document
+
+
+def get_course_lesson_total(db: Session, course_id: int) -> int:
+    """Number of lessons in a course, cached until a lesson write touches it"""
+    with _lock:
+        total = _lesson_totals.get(course_id)
+        if total is not None:
+            return total
+        generation = _generation
+
+    total = db.query(func.count(CourseLesson.id)).filter(CourseLesson.course_id == course_id).scalar() or 0
+
+    with _lock:
+        if generation == _generation:
+            _lesson_totals[course_id] = total
+    return total
+
+
+def invalidate_course_documents(course_ids=None):
+    """Drop cached documents and lesson totals for the given courses (everything if None)"""
+    global _generation
+    with _lock:
+        _generation += 1
+        _stats["invalidations"] += 1
+        if course_ids is None:
+            _documents.clear()
+            _lesson_totals.clear()
+        else:
+            for course_id in course_ids:
+                _documents.pop(course_id, None)
+                _lesson_totals.pop(course_id, None)
+
+
+def get_course_document_stats() -> dict:
+    with _lock:
+        return {**_stats, "documents": len(_documents), "max_documents": MAX_DOCUMENTS}
+
+
+def _affected_course_ids(obj) -> Set[int]:
+    if isinstance(obj, Course):
+        return {obj.id} if obj.id is not None else set()
+    ids = set()
+    if obj.course_id is not None:
+        ids.add(obj.course_id)
+    # A row moved between courses also stales the course it left
+    history = inspect(obj).attrs.course_id.history
+    ids.update(course_id for course_id in history.deleted if course_id is not None)
+    return ids
+
+
+def _mark_stale(session: Session, course_ids):
+    pending = session.info.get(_PENDING_KEY)
+    if pending is _ALL:
+        return
+    if course_ids is _ALL:
+        session.info[_PENDING_KEY] = _ALL
+    else:
+        session.info.setdefault(_PENDING_KEY, set()).update(course_ids)
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_course_writes(session, flush_context, instances):
+    stale = set()
+    for obj in session.new:
+        if isinstance(obj, (CourseEnrollment,) + _CHILD_MODELS):
+            stale |= _affected_course_ids(obj)
+    for obj in session.deleted:
+        if isinstance(obj, _TRACKED_MODELS):
+            stale |= _affected_course_ids(obj)
+    for obj in session.dirty:
+        # Enrollment updates are progress bookkeeping and don't change the document
+        if isinstance(obj, (Course,) + _CHILD_MODELS) and session.is_modified(obj, include_collections=False):
+            stale |= _affected_course_ids(obj)
+    if stale:
+        _mark_stale(session, stale)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_course_writes(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None or not issubclass(mapper.class_, _TRACKED_MODELS):
+        return
+    if mapper.class_ is CourseEnrollment and orm_execute_state.is_update:
+        return  # progress bookkeeping, as in _collect_course_writes
+    # Statements may name the courses they touch via execution_options()
+    course_ids = orm_execute_state.execution_options.get("course_document_ids")
+    _mark_stale(orm_execute_state.session, set(course_ids) if course_ids else _ALL)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_course_invalidations(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending is _ALL:
+        invalidate_course_documents()
+    elif pending:
+        invalidate_course_documents(pending)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_course_invalidations(session, previous_transaction):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,154 @@
+"""
+Read/write session routing across the primary database and read replicas.
+
+Endpoints that only read (catalog listings, search, analytics) depend on
+get_read_db instead of get_db and are served from the replicas named in
+REPLICA_DATABASE_URLS, round-robin. Everything else keeps using the primary.
+
+Replicas lag behind the primary, so a caller who just wrote would not see
+their own change on the next page load. Commits that wrote anything are
+remembered per caller (keyed by a hash of the Authorization header), and
+for READ_YOUR_WRITES_SECONDS afterwards that caller's reads go to the
+primary too. The window should cover the replicas' worst expected lag. It
+is tracked per process, so with several workers a caller can land on a
+worker that hasn't seen their write - size the window with that in mind.
+
+Replica sessions refuse to flush or run bulk writes. With no replicas
+configured get_read_db is just get_db.
+
+For local testing, sync_sqlite_replica.py keeps a file copy of the SQLite
+database up to date.
+"""
+
+import hashlib
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.datastructures import Headers
+from starlette.types import Scope
+
+from database import SessionLocal
+
+REPLICA_DATABASE_URLS = [url.strip() for url in os.getenv("REPLICA_DATABASE_URLS", "").split(",") if url.strip()]
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+MAX_TRACKED_WRITERS = 10000
+
+_READ_ONLY_KEY = "read_only"
+_WROTE_KEY = "db_routing_wrote"
+
+replica_engines = [
+    create_engine(url, connect_args={"check_same_thread": False} if url.startswith("sqlite") else {})
+    for url in REPLICA_DATABASE_URLS
+]
+_replica_sessions = [
+    sessionmaker(autocommit=False, autoflush=False, bind=engine, info={_READ_ONLY_KEY: True})
+    for engine in replica_engines
+]
+_next_replica = itertools.cycle(_replica_sessions) if _replica_sessions else None
+
+# Hashed caller identity of the request being served, set by ReadYourWritesMiddleware
+request_caller: ContextVar[Optional[str]] = ContextVar("request_caller", default=None)
+
+# caller -> monotonic time until which their reads stay on the primary
+_recent_writers: "OrderedDict[str, float]" = OrderedDict()
+_lock = threading.Lock()
+_stats = {"replica_reads": 0, "primary_reads": 0, "pinned_reads": 0}
+
+
+def caller_key(scope: Scope) -> Optional[str]:
+    authorization = Headers(scope=scope).get("authorization")
+    if not authorization:
+        return None
+    return hashlib.sha256(authorization.encode("latin-1")).hexdigest()
+
+
+def recently_wrote(caller: Optional[str]) -> bool:
+    if caller is None:
+        return False
+    with _lock:
+        until = _recent_writers.get(caller)
+    return until is not None and until > time.monotonic()
+
+
+def _remember_write(caller: str):
+    with _lock:
+        _recent_writers[caller] = time.monotonic() + READ_YOUR_WRITES_SECONDS
+        _recent_writers.move_to_end(caller)
+        while len(_recent_writers) > MAX_TRACKED_WRITERS:
+            _recent_writers.popitem(last=False)
+
+
+def read_session() -> Session:
+    """Session for read-only work: a replica unless the current caller wrote recently"""
+    if _next_replica is None:
+        with _lock:
+            _stats["primary_reads"] += 1
+        return SessionLocal()
+    if recently_wrote(request_caller.get()):
+        with _lock:
+            _stats["pinned_reads"] += 1
+        return SessionLocal()
+    with _lock:
+        _stats["replica_reads"] += 1
+        factory = next(_next_replica)
+    return factory()
+
+
+def get_read_db():
+    """Dependency for endpoints that never write"""
+    db = read_session()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_db_routing_stats() -> dict:
+    with _lock:
+        return {
+            **_stats,
+            "replicas": len(replica_engines),
+            "tracked_writers": len(_recent_writers),
+            "read_your_writes_seconds": READ_YOUR_WRITES_SECONDS,
+        }
+
+
+@event.listens_for(Session, "before_flush")
+def _track_flush(session, flush_context, instances):
+    if not (session.new or session.dirty or session.deleted):
+        return
+    if session.info.get(_READ_ONLY_KEY):
+        raise RuntimeError("Attempted to write through a read replica session")
+    session.info[_WROTE_KEY] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_bulk_write(orm_execute_state):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    session = orm_execute_state.session
+    if session.info.get(_READ_ONLY_KEY):
+        raise RuntimeError("Attempted to write through a read replica session")
+    session.info[_WROTE_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _pin_writer_to_primary(session):
+    if not session.info.pop(_WROTE_KEY, False):
+        return
+    caller = request_caller.get()
+    if caller is not None:
+        _remember_write(caller)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_write_marker(session, previous_transaction):
+    session.info.pop(_WROTE_KEY, None)
+
@@ -0,0 +1,217 @@
+"""
+Image processing pipeline for uploaded images.
+
+Uploaded originals are decoded in a process pool, stripped of metadata
+(EXIF, GPS, ICC) and re-encoded as a set of WebP/JPEG width variants. The
+variants are recorded on the owning model as JSON and exposed through the
+API as srcset-ready URLs, so listing pages never ship multi-megabyte photos.
+
+Local variants are stored in the blob store like uploads, and the owning
+entity holds one reference to each; release_image drops them all when the
+image is replaced.
+"""
+
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional, List, Dict
+
+logger = logging.getLogger(__name__)
+
+# Widths (px) generated for every image; originals are never upscaled
+VARIANT_WIDTHS = (64, 160, 320, 640, 1280)
+WEBP_QUALITY = int(os.getenv("IMAGE_WEBP_QUALITY", "80"))
+JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "82"))
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+
+# Entity type -> (model name in database.py, url column, variants column).
+# Models are resolved lazily so pool workers never import the ORM layer.
+IMAGE_TARGETS = {
+    "user": ("User", "profile_image_url", "profile_image_variants"),
+    "course": ("Course", "image_url", "image_variants"),
+    "event": ("Event", "image_url", "image_variants"),
+    "blog": ("Blog", "featured_image", "featured_image_variants"),
+}
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """Return the shared image worker pool, creating it on first use"""
+    global _executor
+    if _executor is None:
+        # spawn keeps workers independent of the server's threads and DB handles
+        _executor = ProcessPoolExecutor(
+            max_workers=IMAGE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+def shutdown_executor():
+    """Stop the image worker pool (called on application shutdown)"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def generate_variants(source_path: str, output_dir: str, stem: str) -> List[Dict]:
+    """Write metadata-free WebP/JPEG width variants of an image.
+
+    Runs inside a pool worker; returns one dict per written file.
+    """
+    from PIL import Image, ImageOps
+
+    output = Path(output_dir)
+    output.mkdir(parents=True, exist_ok=True)
+
+    with Image.open(source_path) as opened:
+        # Apply the EXIF orientation before the metadata is dropped
+        image = ImageOps.exif_transpose(opened)
+        image.load()
+
+    has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+    image = image.convert("RGBA" if has_alpha else "RGB")
+
+    if has_alpha:
+        # JPEG has no alpha channel; flatten onto white
+        flat = Image.new("RGB", image.size, (255, 255, 255))
+        flat.paste(image, mask=image.getchannel("A"))
+    else:
+        flat = image
+
+    original_width, original_height = image.size
+    widths = [w for w in VARIANT_WIDTHS if w < original_width]
+    if original_width <= VARIANT_WIDTHS[-1]:
+        widths.append(original_width)
+
+    variants = []
+    for width in widths:
+        height = max(1, round(original_height * width / original_width))
+        for fmt, source, save_kwargs in (
+            ("webp", image, {"format": "WEBP", "quality": WEBP_QUALITY, "method": 4}),
+            ("jpeg", flat, {"format": "JPEG", "quality": JPEG_QUALITY, "optimize": True, "progressive": True}),
+        ):
+            resized = source if width == original_width else source.resize((width, height), Image.LANCZOS)
+            filename = f"{stem}_w{width}.{'jpg' if fmt == 'jpeg' else fmt}"
+            # No exif/icc_profile kwargs are passed, so no metadata is written
+            resized.save(output / filename, **save_kwargs)
+            variants.append({
+                "filename": filename,
+                "width": width,
+                "height": height,
+                "format": fmt,
+            })
+
+    return variants
+
+
+def _upload_variants_to_s3(variants: List[Dict], output_dir: Path, course_id: int) -> bool:
+    """Push course image variants to S3, rewriting their URLs in place"""
+    from aws_s3 import s3_manager
+
+    if not s3_manager.aws_access_key_id:
+        return False
+
+    uploaded = []
+    for variant in variants:
+        content_type = "image/webp" if variant["format"] == "webp" else "image/jpeg"
+        with open(output_dir / variant["filename"], "rb") as f:
+            url = s3_manager.upload_course_image(f.read(), variant["filename"], course_id, content_type=content_type)
+        if not url:
+            return False
+        uploaded.append(url)
+
+    for variant, url in zip(variants, uploaded):
+        variant["url"] = url
+    return True
+
+
+def release_image(db, image_url: Optional[str], variants_json: Optional[str]):
+    """Release an entity's references to its image and every stored variant"""
+    from utils.file_utils import delete_uploaded_file
+
+    urls = [image_url] if image_url else []
+    if variants_json:
+        try:
+            urls += [variant["url"] for variant in json.loads(variants_json)]
+        except (ValueError, TypeError, KeyError):
+            logger.warning(f"Ignoring malformed image variants: {variants_json!r}")
+    # The primary URL is usually one of the variants; each is referenced once
+    for url in dict.fromkeys(urls):
+        delete_uploaded_file(db, url)
+
+
+async def process_uploaded_image(entity_type: str, entity_id: int, image_url: str):
+    """Generate variants for a freshly uploaded local image and record them.
+
+    Intended to run as a FastAPI background task after the upload response has
+    been sent. The stored URL is switched to the largest stripped JPEG and the
+    reference to the original (with its metadata) is released.
+    """
+    import database
+    from utils.file_utils import UPLOAD_TMP_DIR, delete_uploaded_file, store_generated_file
+
+    model_name, url_attr, variants_attr = IMAGE_TARGETS[entity_type]
+    model = getattr(database, model_name)
+
+    if not image_url.startswith("/uploads/"):
+        return
+    source_path = Path("." + image_url)
+    # Variants are written aside and then moved into the blob store by content
+    output_dir = UPLOAD_TMP_DIR / f"variants-{uuid.uuid4().hex}"
+
+    loop = asyncio.get_running_loop()
+    try:
+        try:
+            variants = await loop.run_in_executor(
+                get_executor(), generate_variants, str(source_path), str(output_dir), source_path.stem
+            )
+        except Exception as e:
+            logger.error(f"Image processing failed for {entity_type} {entity_id}: {e}")
+            return
+
+        uploaded = entity_type == "course" and await loop.run_in_executor(
+            None, _upload_variants_to_s3, variants, output_dir, entity_id
+        )
+
+        db = database.SessionLocal()
+        try:
+            if not uploaded:
+                for variant in variants:
+                    variant["url"] = store_generated_file(db, output_dir / variant["filename"])
+            variants_json = json.dumps([
+                {k: v[k] for k in ("url", "width", "height", "format")} for v in variants
+            ])
+            jpegs = [v for v in variants if v["format"] == "jpeg"]
+            primary_url = jpegs[-1]["url"] if jpegs else image_url
+
+            entity = db.query(model).filter(model.id == entity_id).first()
+            # Skip if the entity is gone or the image was replaced meanwhile
+            if not entity or getattr(entity, url_attr) != image_url:
+                release_image(db, None, variants_json)
+                return
+            setattr(entity, url_attr, primary_url)
+            setattr(entity, variants_attr, variants_json)
+            db.commit()
+
+            if primary_url != image_url:
+                # Drop this entity's reference to the metadata-bearing original
+                delete_uploaded_file(db, image_url)
+        except Exception as e:
+            logger.error(f"Failed to record image variants for {entity_type} {entity_id}: {e}")
+            db.rollback()
+            return
+        finally:
+            db.close()
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+    logger.info(f"Generated {len(variants)} image variants for {entity_type} {entity_id}")
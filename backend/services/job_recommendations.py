@@ -0,0 +1,384 @@
+"""
+Job recommendations from an in-memory vector index.
+
+Every job is embedded as a hashed TF-IDF vector (feature hashing into
+JOB_VECTOR_DIM signed buckets, so there is no vocabulary to rebuild) built
+from its title, tags, level, location, work mode, type and text. Rows live
+in one float32 NumPy matrix next to arrays of job ids, publication flags
+and deadlines. A user's profile (specialization, experience level,
+location, university, bio) is embedded the same way, and a recommendation
+is one matrix-vector product, a mask for published jobs whose deadline
+hasn't passed, and an argpartition for the top k.
+
+The index is built on first use. Afterwards committed job inserts, updates
+and deletes are applied row by row through SQLAlchemy session events, like
+the course document cache. IDF weights are fixed at the last full build;
+once enough rows have changed since then (or a bulk statement touched
+jobs) the next query rebuilds the whole index.
+
+Memory is JOB_VECTOR_DIM * 4 bytes per job (2 KB at the default 512).
+NumPy is imported on first use so it stays off the API's startup path.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import os
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+import schemas
+from database import Job
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+JOB_VECTOR_DIM = int(os.getenv("JOB_VECTOR_DIM", "512"))
+# Share of rows changed since the last full build that triggers a rebuild
+REBUILD_CHANGE_RATIO = float(os.getenv("JOB_INDEX_REBUILD_RATIO", "0.2"))
+DESCRIPTION_CHARS = 2000
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it of on or our the to we will with you your "
+    "this that who all can per into their they not".split()
+)
+
+# Profile experience labels (e.g. "Senior (6-10 years)") -> job levels
+_EXPERIENCE_KEYWORDS = (
+    ("junior", schemas.ExperienceLevel.ENTRY_LEVEL),
+    ("entry", schemas.ExperienceLevel.ENTRY_LEVEL),
+    ("mid", schemas.ExperienceLevel.MID_LEVEL),
+    ("senior", schemas.ExperienceLevel.SENIOR_LEVEL),
+    ("principal", schemas.ExperienceLevel.EXECUTIVE),
+    ("executive", schemas.ExperienceLevel.EXECUTIVE),
+)
+
+_PENDING_KEY = "job_index_changes"
+_ALL = object()
+
+_JOB_COLUMNS = (
+    Job.id, Job.title, Job.company, Job.location, Job.work_mode, Job.job_type, Job.experience_level,
+    Job.tags, Job.description, Job.requirements, Job.status, Job.application_deadline,
+)
+
+
+def _tokens(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    return [token for token in _TOKEN_RE.findall(text.lower()) if len(token) > 1 and token not in _STOPWORDS]
+
+
+def _value(enum_or_str) -> Optional[str]:
+    return getattr(enum_or_str, "value", enum_or_str)
+
+
+def _experience_feature(label: Optional[str]) -> Optional[str]:
+    if not label:
+        return None
+    label = label.lower()
+    for level in schemas.ExperienceLevel:
+        if label == level.value.lower():
+            return f"exp:{level.value}"
+    for keyword, level in _EXPERIENCE_KEYWORDS:
+        if keyword in label:
+            return f"exp:{level.value}"
+    return None
+
+
+def job_features(job) -> Counter:
+    """Weighted terms for a job row (ORM object or row with the same attributes)"""
+    features = Counter()
+    for token in _tokens(job.title):
+        features[token] += 3
+    for tag in (job.tags or "").split(","):
+        for token in _tokens(tag):
+            features[token] += 2
+    for token in _tokens(f"{job.description or ''} {job.requirements or ''}"[:DESCRIPTION_CHARS]):
+        features[token] += 1
+    for token in _tokens(job.location):
+        features[f"loc:{token}"] += 2
+    experience = _experience_feature(_value(job.experience_level))
+    if experience:
+        features[experience] += 3
+    if job.work_mode:
+        features[f"mode:{_value(job.work_mode)}"] += 1
+    if job.job_type:
+        features[f"type:{_value(job.job_type)}"] += 1
+    return features
+
+
+def profile_features(user) -> Counter:
+    """Weighted terms for a user's profile, in the same space as job_features"""
+    features = Counter()
+    for token in _tokens(user.specialization):
+        features[token] += 3
+    for token in _tokens(user.bio):
+        features[token] += 1
+    for token in _tokens(user.university):
+        features[token] += 1
+    for token in _tokens(user.location):
+        features[f"loc:{token}"] += 2
+    experience = _experience_feature(user.experience_level)
+    if experience:
+        features[experience] += 3
+    return features
+
+
+def _hash(feature: str) -> Tuple[int, float]:
+    digest = zlib.crc32(feature.encode("utf-8"))
+    return digest % JOB_VECTOR_DIM, 1.0 if digest & 0x80000000 else -1.0
+
+
+def _hashed_tf(features: Counter) -> np.ndarray:
+    """Sublinear term frequencies folded into signed hash buckets"""
+    import numpy as np
+
+    vector = np.zeros(JOB_VECTOR_DIM, dtype=np.float32)
+    for feature, count in features.items():
+        bucket, sign = _hash(feature)
+        vector[bucket] += sign * (1.0 + math.log(count))
+    return vector
+
+
+def _normalize(vector: np.ndarray) -> np.ndarray:
+    import numpy as np
+
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else vector
+
+
+class JobIndex:
+    """Row-per-job matrix of normalized TF-IDF vectors with filter columns"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.ready = False
+        self.stale = False
+        self.changes = 0
+        self.built_at = None
+        self.build_seconds = None
+        # Arrays are allocated by the first build
+        self.idf = None
+        self.vectors = self.job_ids = self.published = self.deadlines = None
+        self.rows: Dict[int, int] = {}
+        self.size = 0
+
+    def _reset(self, capacity: int):
+        import numpy as np
+
+        self.vectors = np.zeros((capacity, JOB_VECTOR_DIM), dtype=np.float32)
+        self.job_ids = np.zeros(capacity, dtype=np.int64)
+        self.published = np.zeros(capacity, dtype=bool)
+        self.deadlines = np.full(capacity, np.inf)
+        self.rows: Dict[int, int] = {}
+        self.size = 0
+
+    def _grow(self):
+        import numpy as np
+
+        capacity = max(64, len(self.job_ids) * 2)
+        extra = capacity - len(self.job_ids)
+        self.vectors = np.vstack([self.vectors, np.zeros((extra, JOB_VECTOR_DIM), dtype=np.float32)])
+        self.job_ids = np.concatenate([self.job_ids, np.zeros(extra, dtype=np.int64)])
+        self.published = np.concatenate([self.published, np.zeros(extra, dtype=bool)])
+        self.deadlines = np.concatenate([self.deadlines, np.full(extra, np.inf)])
+
+    def build(self, db: Session):
+        """Embed every job and recompute IDF weights"""
+        import numpy as np
+
+        started = time.perf_counter()
+        jobs = db.query(*_JOB_COLUMNS).all()
+        tfs = np.zeros((len(jobs), JOB_VECTOR_DIM), dtype=np.float32)
+        for row, job in enumerate(jobs):
+            tfs[row] = _hashed_tf(job_features(job))
+        document_frequency = np.count_nonzero(tfs, axis=0)
+        idf = (np.log((1 + len(jobs)) / (1 + document_frequency)) + 1.0).astype(np.float32)
+        weighted = tfs * idf
+        norms = np.linalg.norm(weighted, axis=1, keepdims=True)
+        np.divide(weighted, norms, out=weighted, where=norms > 0)
+
+        with self.lock:
+            self._reset(0)
+            self.vectors = weighted
+            self.job_ids = np.array([job.id for job in jobs], dtype=np.int64)
+            self.published = np.array([_is_published(job.status) for job in jobs], dtype=bool)
+            self.deadlines = np.array([_deadline(job.application_deadline) for job in jobs], dtype=np.float64)
+            self.rows = {job.id: row for row, job in enumerate(jobs)}
+            self.size = len(jobs)
+            self.idf = idf
+            self.ready = True
+            self.stale = False
+            self.changes = 0
+            self.built_at = datetime.utcnow()
+            self.build_seconds = round(time.perf_counter() - started, 3)
+        logger.info(f"Job recommendation index built: {len(jobs)} jobs in {self.build_seconds}s")
+
+    def upsert(self, job: dict):
+        """Write one job's row with the current IDF weights"""
+        if not self.ready:
+            return  # Nothing to update before the first build
+        vector = _normalize(_hashed_tf(job_features(_Row(job))) * self.idf)
+        with self.lock:
+            if not self.ready:
+                return
+            row = self.rows.get(job["id"])
+            if row is None:
+                if self.size == len(self.job_ids):
+                    self._grow()
+                row = self.size
+                self.size += 1
+                self.rows[job["id"]] = row
+                self.job_ids[row] = job["id"]
+            self.vectors[row] = vector
+            self.published[row] = _is_published(job["status"])
+            self.deadlines[row] = _deadline(job["application_deadline"])
+            self._changed()
+
+    def remove(self, job_id: int):
+        with self.lock:
+            row = self.rows.get(job_id)
+            if row is None:
+                return
+            # The row stays allocated until the next full build
+            self.published[row] = False
+            self.vectors[row] = 0
+            self._changed()
+
+    def _changed(self):
+        self.changes += 1
+        if self.changes > max(50, REBUILD_CHANGE_RATIO * self.size):
+            self.stale = True
+
+    def top_k(self, query: np.ndarray, k: int, now: float, exclude_ids=()) -> List[Tuple[int, float]]:
+        """(job_id, score) of the k most similar published, open jobs"""
+        import numpy as np
+
+        query = _normalize(query * self.idf)
+        with self.lock:
+            size = self.size
+            if not size or not query.any():
+                return []
+            scores = self.vectors[:size] @ query
+            eligible = self.published[:size] & (self.deadlines[:size] >= now)
+            job_ids = self.job_ids[:size]
+            if exclude_ids:
+                eligible &= ~np.isin(job_ids, np.fromiter(exclude_ids, dtype=np.int64))
+        scores = np.where(eligible & (scores > 0), scores, -np.inf)
+        k = min(k, int(np.count_nonzero(np.isfinite(scores))))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(job_ids[row]), round(float(scores[row]), 4)) for row in top]
+
+
+class _Row:
+    """Attribute access over a captured job dict"""
+
+    def __init__(self, values: dict):
+        self.__dict__.update(values)
+
+
+def _is_published(status) -> bool:
+    return _value(status) == schemas.JobStatus.PUBLISHED.value
+
+
+def _deadline(deadline: Optional[datetime]) -> float:
+    return deadline.timestamp() if deadline else math.inf
+
+
+_index = JobIndex()
+_build_lock = threading.Lock()
+
+
+def _ensure_index(db: Session):
+    if _index.ready and not _index.stale:
+        return
+    with _build_lock:
+        if not _index.ready or _index.stale:
+            _index.build(db)
+
+
+def recommend_jobs(db: Session, user, limit: int = 10, exclude_job_ids=()) -> List[Tuple[int, float]]:
+    """Best matching open jobs for a user's profile as (job_id, score), best first"""
+    _ensure_index(db)
+    query = _hashed_tf(profile_features(user))
+    return _index.top_k(query, limit, datetime.utcnow().timestamp(), exclude_job_ids)
+
+
+def get_job_index_stats() -> dict:
+    with _index.lock:
+        return {
+            "jobs": _index.size,
+            "open_jobs": int(_index.published[:_index.size].sum()) if _index.ready else 0,
+            "dimensions": JOB_VECTOR_DIM,
+            "changes_since_build": _index.changes,
+            "stale": _index.stale,
+            "built_at": _index.built_at,
+            "build_seconds": _index.build_seconds,
+        }
+
+
+def _capture(job: Job) -> dict:
+    return {column.key: getattr(job, column.key) for column in _JOB_COLUMNS}
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_job_writes(session, flush_context, instances):
+    pending = session.info.get(_PENDING_KEY)
+    if pending is _ALL:
+        return
+    for obj in session.deleted:
+        if isinstance(obj, Job) and obj.id is not None:
+            session.info.setdefault(_PENDING_KEY, {})[obj.id] = None
+
+
+@event.listens_for(Session, "after_flush")
+def _capture_job_rows(session, flush_context):
+    # New rows have their ids only after the flush
+    pending = session.info.get(_PENDING_KEY)
+    if pending is _ALL:
+        return
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Job) and obj.id is not None:
+            session.info.setdefault(_PENDING_KEY, {})[obj.id] = _capture(obj)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_job_writes(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and issubclass(mapper.class_, Job):
+        orm_execute_state.session.info[_PENDING_KEY] = _ALL
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_job_writes(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending is _ALL:
+        _index.stale = True
+    elif pending:
+        for job_id, values in pending.items():
+            if values is None:
+                _index.remove(job_id)
+            else:
+                _index.upsert(values)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_job_writes(session, previous_transaction):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,195 @@
+"""
+Prometheus metrics for the API process.
+
+Request counts, latencies and status codes are recorded by
+middleware.metrics.MetricsMiddleware and labelled with the matched route
+template (never the raw URL) so label cardinality stays bounded by the
+number of routes. The database pool, S3 client and SMTP sender record
+their own counters and latency histograms through the helpers below.
+
+Cache hit ratios, the connection pool state and background queue depths
+already live in module-level stats dicts; they are read when /metrics is
+scraped rather than mirrored into Prometheus objects on every hit.
+
+Running several workers: point PROMETHEUS_MULTIPROC_DIR at an empty
+directory (wiped before the workers start). Counters and histograms are
+then written to per-process files there and summed on scrape; the
+scrape-time values (pools, caches, queues) belong to the worker that
+served the scrape and carry its pid as a label.
+"""
+
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from sqlalchemy.pool import Pool, QueuePool
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST,
+        REGISTRY,
+        CollectorRegistry,
+        Counter,
+        Histogram,
+        generate_latest,
+        multiprocess,
+    )
+    from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+logger = logging.getLogger(__name__)
+
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+if PROMETHEUS_AVAILABLE:
+    HTTP_REQUESTS = Counter(
+        "http_requests_total", "HTTP requests by route template and status code",
+        ["method", "route", "status"],
+    )
+    HTTP_LATENCY = Histogram(
+        "http_request_duration_seconds", "Time to produce the full response",
+        ["method", "route"], buckets=LATENCY_BUCKETS,
+    )
+    DB_POOL_CHECKOUTS = Counter("db_pool_checkouts_total", "Connections checked out of the pool")
+    DB_POOL_WAIT = Histogram(
+        "db_pool_checkout_wait_seconds", "Time to get a connection from the pool, including any new connect",
+        buckets=POOL_WAIT_BUCKETS,
+    )
+    S3_LATENCY = Histogram(
+        "s3_request_duration_seconds", "S3 API call latency",
+        ["operation", "outcome"], buckets=LATENCY_BUCKETS,
+    )
+    SMTP_LATENCY = Histogram(
+        "smtp_send_duration_seconds", "Time to deliver one email over SMTP",
+        ["outcome"], buckets=LATENCY_BUCKETS,
+    )
+
+
+def observe_request(method: str, route: str, status: int, seconds: float):
+    if PROMETHEUS_AVAILABLE:
+        HTTP_REQUESTS.labels(method, route, str(status)).inc()
+        HTTP_LATENCY.labels(method, route).observe(seconds)
+
+
+def observe_s3_call(operation: str, outcome: str, seconds: float):
+    if PROMETHEUS_AVAILABLE:
+        S3_LATENCY.labels(operation, outcome).observe(seconds)
+
+
+@contextmanager
+def time_smtp_send():
+    """Time an SMTP delivery, labelling it by whether it raised"""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "sent"
+    finally:
+        if PROMETHEUS_AVAILABLE:
+            SMTP_LATENCY.labels(outcome).observe(time.perf_counter() - started)
+
+
+@event.listens_for(Pool, "checkout")
+def _count_checkout(dbapi_connection, connection_record, connection_proxy):
+    if PROMETHEUS_AVAILABLE:
+        DB_POOL_CHECKOUTS.inc()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long every checkout took to get a connection.
+
+    The pool has no "about to check out" event, so the wait is timed around
+    _do_get, which blocks until a connection is free (or a new one is opened).
+    database.py passes it as the engine's poolclass.
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            if PROMETHEUS_AVAILABLE:
+                DB_POOL_WAIT.observe(time.perf_counter() - started)
+
+
+class RuntimeCollector:
+    """Scrape-time values from the pool, caches and background queues"""
+
+    def collect(self):
+        from aws_s3 import s3_manager
+        from database import engine
+        from services.course_documents import get_course_document_stats
+        from services.progress_buffer import get_progress_buffer_stats
+        from services.video_service import get_video_queue_stats
+
+        labels, values = (["pid"], [str(os.getpid())]) if MULTIPROC_DIR else ([], [])
+
+        pool = engine.pool
+        connections = GaugeMetricFamily(
+            "db_pool_connections", "Pooled connections by state", labels=labels + ["state"]
+        )
+        if hasattr(pool, "checkedout"):
+            connections.add_metric(values + ["checked_out"], pool.checkedout())
+            connections.add_metric(values + ["idle"], pool.checkedin())
+            connections.add_metric(values + ["overflow"], max(pool.overflow(), 0))
+            connections.add_metric(values + ["size"], pool.size())
+        yield connections
+
+        cache = CounterMetricFamily(
+            "cache_requests", "Cache lookups by cache and result", labels=labels + ["cache", "result"]
+        )
+        documents = get_course_document_stats()
+        cache.add_metric(values + ["course_documents", "hit"], documents["hits"])
+        cache.add_metric(values + ["course_documents", "miss"], documents["misses"])
+        cache.add_metric(values + ["presigned_urls", "hit"], s3_manager.presigned_stats["hits"])
+        cache.add_metric(values + ["presigned_urls", "miss"], s3_manager.presigned_stats["misses"])
+        yield cache
+
+        progress = get_progress_buffer_stats()
+        heartbeats = CounterMetricFamily(
+            "progress_heartbeats", "Progress heartbeats buffered", labels=labels
+        )
+        heartbeats.add_metric(values, progress["heartbeats"])
+        yield heartbeats
+        rows = CounterMetricFamily(
+            "progress_rows_written", "Progress rows written by buffer flushes", labels=labels
+        )
+        rows.add_metric(values, progress["rows_written"])
+        yield rows
+
+        queues = GaugeMetricFamily(
+            "background_queue_depth", "Background work waiting or running", labels=labels + ["queue"]
+        )
+        video = get_video_queue_stats()
+        queues.add_metric(values + ["progress_buffer"], progress["pending"])
+        queues.add_metric(values + ["hls"], video["hls_queued"] + video["hls_running"])
+        queues.add_metric(values + ["video_probe"], video["probes_pending"])
+        yield queues
+
+
+_registry = None
+
+
+def _get_registry():
+    global _registry
+    if _registry is None:
+        if MULTIPROC_DIR:
+            _registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(_registry)
+        else:
+            _registry = REGISTRY
+        _registry.register(RuntimeCollector())
+    return _registry
+
+
+def render_metrics() -> bytes:
+    """Exposition-format metrics for this worker (or all workers in multiprocess mode)"""
+    return generate_latest(_get_registry())
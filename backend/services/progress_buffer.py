@@ -0,0 +1,200 @@
+"""
+Coalesced lesson progress heartbeats.
+
+Video players report their playback position every few seconds. Writing each
+report would mean one transaction per viewer per heartbeat, so positions are
+kept in memory, latest wins per (enrollment, lesson), and flushed
+periodically as one bulk upsert. Completions bypass the buffer and are written
+by the caller straight away; a crash can therefore lose at most one flush
+interval of playback positions, never a completed lesson.
+
+If a bulk flush fails, the batch is retried row by row: rows the database
+rejects are dropped, and only a database outage requeues them.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_FLUSH_INTERVAL = float(os.getenv("PROGRESS_FLUSH_INTERVAL", "5"))
+# Flush early once this many (enrollment, lesson) positions are waiting
+PROGRESS_BUFFER_MAX = int(os.getenv("PROGRESS_BUFFER_MAX", "20000"))
+UPSERT_CHUNK_SIZE = 500
+
+# (enrollment_id, lesson_id) -> (current_time, watched_at)
+_pending: Dict[Tuple[int, int], Tuple[int, datetime]] = {}
+_lock = threading.Lock()
+# Only one flush writes at a time so an older batch can't land after a newer one
+_flush_lock = threading.Lock()
+_flusher_task: Optional[asyncio.Task] = None
+
+_stats = {"heartbeats": 0, "flushes": 0, "rows_written": 0, "failed_flushes": 0, "dropped_heartbeats": 0}
+
+
+def record_heartbeat(enrollment_id: int, lesson_id: int, current_time: int) -> bool:
+    """Buffer the latest position for a lesson; returns True when a flush is due early"""
+    with _lock:
+        _pending[(enrollment_id, lesson_id)] = (max(0, int(current_time)), datetime.utcnow())
+        _stats["heartbeats"] += 1
+        return len(_pending) >= PROGRESS_BUFFER_MAX
+
+
+def get_pending_position(enrollment_id: int, lesson_id: int) -> Optional[Tuple[int, datetime]]:
+    """Return a buffered (current_time, watched_at) that hasn't been flushed yet"""
+    with _lock:
+        return _pending.get((enrollment_id, lesson_id))
+
+
+def discard_pending(enrollment_id: int, lesson_id: int):
+    """Forget a buffered position, e.g. after the caller wrote a completion directly"""
+    with _lock:
+        _pending.pop((enrollment_id, lesson_id), None)
+
+
+def _upsert_statement(db, rows):
+    from database import LessonProgress
+
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    stmt = insert(LessonProgress).values(rows)
+    # Heartbeats only move the position; completion is never set or cleared here
+    return stmt.on_conflict_do_update(
+        index_elements=[LessonProgress.enrollment_id, LessonProgress.lesson_id],
+        set_={
+            "current_time": stmt.excluded.current_time,
+            "last_watched_at": stmt.excluded.last_watched_at,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+
+
+def _write_rows(db, rows, now):
+    from sqlalchemy import update
+    from database import CourseEnrollment
+
+    enrollment_ids = sorted({row["enrollment_id"] for row in rows})
+    for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        db.execute(_upsert_statement(db, rows[start:start + UPSERT_CHUNK_SIZE]))
+    for start in range(0, len(enrollment_ids), UPSERT_CHUNK_SIZE):
+        db.execute(
+            update(CourseEnrollment)
+            .where(CourseEnrollment.id.in_(enrollment_ids[start:start + UPSERT_CHUNK_SIZE]))
+            .values(last_accessed_at=now)
+        )
+    db.commit()
+
+
+def _write_rows_one_by_one(db, rows, now) -> Tuple[int, list, int]:
+    """Fallback after a failed bulk write: (rows written, rows to requeue, rows dropped)"""
+    from sqlalchemy.exc import OperationalError
+
+    written = dropped = 0
+    for index, row in enumerate(rows):
+        try:
+            _write_rows(db, [row], now)
+            written += 1
+        except OperationalError as e:
+            # Database unavailable or locked: keep this and the remaining rows for the next flush
+            db.rollback()
+            logger.error(f"Lesson progress flush interrupted: {e}")
+            return written, rows[index:], dropped
+        except Exception as e:
+            # A row the database will never accept (e.g. a missing lesson); retrying can't help
+            db.rollback()
+            dropped += 1
+            logger.error(f"Dropping lesson progress heartbeat {row['enrollment_id']}/{row['lesson_id']}: {e}")
+    return written, [], dropped
+
+
+def flush_progress() -> int:
+    """Write all buffered positions in bulk; returns the number of rows upserted"""
+    global _pending
+    from database import SessionLocal
+
+    with _flush_lock:
+        with _lock:
+            if not _pending:
+                return 0
+            batch, _pending = _pending, {}
+
+        now = datetime.utcnow()
+        rows = [
+            {
+                "enrollment_id": enrollment_id,
+                "lesson_id": lesson_id,
+                "current_time": current_time,
+                "completed": False,
+                "last_watched_at": watched_at,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for (enrollment_id, lesson_id), (current_time, watched_at) in batch.items()
+        ]
+
+        db = SessionLocal()
+        try:
+            try:
+                _write_rows(db, rows, now)
+                written, requeue, dropped = len(rows), [], 0
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Failed to flush {len(rows)} lesson progress heartbeats, retrying one by one: {e}")
+                with _lock:
+                    _stats["failed_flushes"] += 1
+                # One bad row must not hold back everyone else's positions
+                written, requeue, dropped = _write_rows_one_by_one(db, rows, now)
+        finally:
+            db.close()
+
+        with _lock:
+            _stats["flushes"] += 1
+            _stats["rows_written"] += written
+            _stats["dropped_heartbeats"] += dropped
+            # Requeue, keeping any newer position that arrived meanwhile
+            for row in requeue:
+                key = (row["enrollment_id"], row["lesson_id"])
+                _pending.setdefault(key, batch[key])
+        return written
+
+
+async def _flush_loop():
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(PROGRESS_FLUSH_INTERVAL)
+        try:
+            await loop.run_in_executor(None, flush_progress)
+        except Exception as e:
+            logger.error(f"Lesson progress flush loop error: {e}")
+
+
+def start_progress_flusher():
+    """Start the periodic flush task (called on application startup)"""
+    global _flusher_task
+    if _flusher_task is None:
+        _flusher_task = asyncio.get_running_loop().create_task(_flush_loop())
+
+
+async def stop_progress_flusher():
+    """Stop the flush task and write whatever is still buffered (called on shutdown)"""
+    global _flusher_task
+    if _flusher_task is not None:
+        _flusher_task.cancel()
+        try:
+            await _flusher_task
+        except asyncio.CancelledError:
+            pass
+        _flusher_task = None
+    await asyncio.get_running_loop().run_in_executor(None, flush_progress)
+
+
+def get_progress_buffer_stats() -> dict:
+    with _lock:
+        return {**_stats, "pending": len(_pending), "flush_interval_seconds": PROGRESS_FLUSH_INTERVAL}
@@ -0,0 +1,540 @@
+"""
+Related-content index across blogs, discussions and courses.
+
+Every published blog, every discussion and every published course is
+embedded as a sparse TF-IDF vector over its tags, category, title and body
+text (HTML stripped, body truncated). Each item's RELATED_TOP_N most similar
+items of any type are stored in the related_content table, keyed by the
+source item, so a detail page's "related" section is one primary-key range
+read plus a primary-key fetch of the targets.
+
+The full build (build_related_content.py, or the admin rebuild endpoint)
+fits the vocabulary and IDF weights, then computes item-item similarities
+in batches as sparse products: each batch row's terms are expanded over the
+inverted index (column-major copy of the matrix) and summed with bincount,
+so the work is proportional to the postings touched rather than to
+items x vocabulary. Terms that occur in a single item can't relate two items
+and are left out, as are terms in more than half of the items.
+
+Afterwards creates, edits and deletes are applied incrementally from
+SQLAlchemy session events on a background thread: the changed item's
+vector and list are recomputed, along with the lists of items it now
+enters or used to appear in. Incremental updates reuse the vocabulary from
+the last fit (words new since then are ignored), so rebuild periodically.
+A process that hasn't fitted yet, or whose corpus has doubled since, does
+a full rebuild instead.
+Only edits to the indexed fields count; view and like counters don't.
+NumPy is imported on first use so it stays off the API's startup path.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, event, insert, inspect, tuple_
+from sqlalchemy.orm import Session, load_only
+
+import schemas
+from database import Blog, Course, Discussion, RelatedContent, SessionLocal
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+RELATED_TOP_N = int(os.getenv("RELATED_TOP_N", "10"))
+RELATED_MIN_SCORE = float(os.getenv("RELATED_MIN_SCORE", "0.05"))
+# Upper bound on (batch row, candidate) pairs expanded per similarity batch
+RELATED_BATCH_PAIRS = int(os.getenv("RELATED_BATCH_PAIRS", "4000000"))
+MAX_DOCUMENT_FREQUENCY = 0.5
+# Refit from scratch once the corpus has grown this much since the last fit
+REFIT_GROWTH = 2
+CONTENT_CHARS = 5000
+INSERT_CHUNK = 5000
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_TAG_RE = re.compile(r"<[^>]+>")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or our the to we will with you your "
+    "this that these those who what how can not but all also more into their they them was were been "
+    "which when where there than then so if do does about".split()
+)
+
+_PENDING_KEY = "related_content_changes"
+
+Key = Tuple[str, int]
+
+
+class _ItemType:
+    def __init__(self, name, model, columns, text_fields, published=None, excerpt=None, slug=None):
+        self.name = name
+        self.model = model
+        self.columns = columns
+        # Edits to any of these re-index the item
+        self.text_fields = text_fields
+        self.published = published
+        self.excerpt = excerpt
+        self.slug = slug
+
+
+ITEM_TYPES: Dict[str, _ItemType] = {
+    item.name: item for item in (
+        _ItemType(
+            "blog", Blog,
+            (Blog.id, Blog.title, Blog.excerpt, Blog.content, Blog.category, Blog.tags),
+            ("title", "excerpt", "content", "category", "tags", "status"),
+            published=Blog.status == schemas.BlogStatus.PUBLISHED,
+            excerpt=Blog.excerpt,
+            slug=Blog.slug,
+        ),
+        _ItemType(
+            "discussion", Discussion,
+            (Discussion.id, Discussion.title, Discussion.content, Discussion.category, Discussion.tags),
+            ("title", "content", "category", "tags"),
+        ),
+        _ItemType(
+            "course", Course,
+            (Course.id, Course.title, Course.short_description, Course.description),
+            ("title", "short_description", "description", "status"),
+            published=Course.status == schemas.CourseStatus.PUBLISHED,
+            excerpt=Course.short_description,
+        ),
+    )
+}
+_TYPE_BY_MODEL = {item.model: item for item in ITEM_TYPES.values()}
+
+
+def _tokens(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    return [token for token in _TOKEN_RE.findall(text.lower()) if len(token) > 1 and token not in _STOPWORDS]
+
+
+def item_features(row) -> Counter:
+    """Weighted terms for a blog, discussion or course row"""
+    features = Counter()
+    for tag in (getattr(row, "tags", None) or "").split(","):
+        tag = " ".join(_tokens(tag))
+        if tag:
+            features[f"tag:{tag}"] += 3
+            for token in tag.split():
+                features[token] += 1
+    category = getattr(row, "category", None)
+    category = getattr(category, "value", category)
+    if category:
+        features[f"cat:{category.lower()}"] += 2
+    for token in _tokens(row.title):
+        features[token] += 2
+    text = " ".join(
+        getattr(row, field, None) or "" for field in ("excerpt", "short_description", "content", "description")
+    )
+    for token in _tokens(_TAG_RE.sub(" ", text[:CONTENT_CHARS])):
+        features[token] += 1
+    return features
+
+
+def _load_items(db: Session, keys: Optional[Iterable[Key]] = None) -> List[Tuple[Key, Counter]]:
+    """(key, features) of indexable items, all of them or just the given keys"""
+    wanted: Dict[str, List[int]] = {}
+    if keys is not None:
+        for item_type, item_id in keys:
+            wanted.setdefault(item_type, []).append(item_id)
+
+    items = []
+    for item in ITEM_TYPES.values():
+        if keys is not None and item.name not in wanted:
+            continue
+        query = db.query(*item.columns)
+        if item.published is not None:
+            query = query.filter(item.published)
+        if keys is not None:
+            query = query.filter(item.model.id.in_(wanted[item.name]))
+        items.extend(((item.name, row.id), item_features(row)) for row in query.order_by(item.model.id))
+    return items
+
+
+class _Index:
+    """Sparse item vectors (one (terms, weights) pair per row) with an inverted-index view"""
+
+    def __init__(self, items: List[Tuple[Key, Counter]]):
+        import numpy as np
+
+        document_frequency = Counter()
+        for _, features in items:
+            document_frequency.update(features.keys())
+        max_df = max(2, int(MAX_DOCUMENT_FREQUENCY * len(items)))
+        terms = sorted(term for term, df in document_frequency.items() if 2 <= df <= max_df)
+        self.vocabulary = {term: column for column, term in enumerate(terms)}
+        self.fitted_items = len(items)
+        self.idf = np.array(
+            [math.log((1 + len(items)) / (1 + document_frequency[term])) + 1.0 for term in terms], dtype=np.float32
+        )
+        self.keys: List[Optional[Key]] = []
+        self.rows: Dict[Key, int] = {}
+        self.vectors: List[Tuple[np.ndarray, np.ndarray]] = []
+        # Score an item must beat to enter each row's list
+        self.floors = np.full(len(items), RELATED_MIN_SCORE, dtype=np.float32)
+        self._inverted = None
+        for key, features in items:
+            self.upsert(key, features)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def vectorize(self, features: Counter) -> Tuple[np.ndarray, np.ndarray]:
+        import numpy as np
+
+        pairs = sorted(
+            (self.vocabulary[term], 1.0 + math.log(count)) for term, count in features.items() if term in self.vocabulary
+        )
+        columns = np.array([column for column, _ in pairs], dtype=np.int64)
+        weights = np.array([weight for _, weight in pairs], dtype=np.float32) * self.idf[columns]
+        norm = float(np.linalg.norm(weights))
+        return columns, (weights / norm if norm else weights)
+
+    def upsert(self, key: Key, features: Counter) -> int:
+        import numpy as np
+
+        row = self.rows.get(key)
+        if row is None:
+            row = len(self.keys)
+            self.keys.append(key)
+            self.vectors.append(None)
+            self.rows[key] = row
+            if row >= len(self.floors):
+                self.floors = np.append(self.floors, np.float32(RELATED_MIN_SCORE))
+        self.vectors[row] = self.vectorize(features)
+        self._inverted = None
+        return row
+
+    def remove(self, key: Key):
+        import numpy as np
+
+        row = self.rows.pop(key, None)
+        if row is None:
+            return
+        # The row slot stays empty until the next full build
+        self.keys[row] = None
+        self.vectors[row] = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32))
+        self._inverted = None
+
+    def inverted(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(column offsets, row ids, weights) grouped by term"""
+        import numpy as np
+
+        if self._inverted is None:
+            lengths = [len(columns) for columns, _ in self.vectors]
+            columns = np.concatenate([columns for columns, _ in self.vectors] or [np.zeros(0, dtype=np.int64)])
+            weights = np.concatenate([weights for _, weights in self.vectors] or [np.zeros(0, dtype=np.float32)])
+            rows = np.repeat(np.arange(len(self.vectors), dtype=np.int64), lengths)
+            order = np.argsort(columns, kind="stable")
+            offsets = np.zeros(len(self.vocabulary) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(columns, minlength=len(self.vocabulary)), out=offsets[1:])
+            self._inverted = (offsets, rows[order], weights[order])
+        return self._inverted
+
+    def similarities(self, rows: List[int]) -> Iterable[Tuple[List[int], np.ndarray]]:
+        """Yield (batch rows, batch x all-items cosine matrix), batched by postings touched"""
+        import numpy as np
+
+        inverted = self.inverted()
+        postings = np.diff(inverted[0])
+        # The dense result is batch x items, so it counts against the budget too
+        max_rows = max(1, RELATED_BATCH_PAIRS // max(1, len(self)))
+        batch, batch_pairs = [], 0
+        for row in rows:
+            pairs = int(postings[self.vectors[row][0]].sum())
+            if batch and (batch_pairs + pairs > RELATED_BATCH_PAIRS or len(batch) >= max_rows):
+                yield batch, self._product(batch, postings, *inverted)
+                batch, batch_pairs = [], 0
+            batch.append(row)
+            batch_pairs += pairs
+        if batch:
+            yield batch, self._product(batch, postings, *inverted)
+
+    def _product(self, batch, postings, offsets, posting_rows, posting_weights) -> np.ndarray:
+        import numpy as np
+
+        size = len(self)
+        batch_index = np.repeat(np.arange(len(batch)), [len(self.vectors[row][0]) for row in batch])
+        columns = np.concatenate([self.vectors[row][0] for row in batch])
+        weights = np.concatenate([self.vectors[row][1] for row in batch])
+        counts = postings[columns]
+        total = int(counts.sum())
+        if not total:
+            return np.zeros((len(batch), size), dtype=np.float32)
+        # Positions of every posting of every batch term, flattened
+        starts = np.repeat(offsets[columns] - (np.cumsum(counts) - counts), counts)
+        positions = starts + np.arange(total)
+        flat = np.repeat(batch_index, counts) * size + posting_rows[positions]
+        products = np.repeat(weights, counts) * posting_weights[positions]
+        return np.bincount(flat, weights=products, minlength=len(batch) * size).reshape(len(batch), size)
+
+    def neighbors(self, row: int, scores: np.ndarray) -> List[Tuple[int, float]]:
+        """Best RELATED_TOP_N (row, score) for one row's similarity vector"""
+        import numpy as np
+
+        scores = scores.copy()
+        scores[row] = -np.inf
+        candidates = np.flatnonzero(scores >= RELATED_MIN_SCORE)
+        if len(candidates) > RELATED_TOP_N:
+            candidates = candidates[np.argpartition(-scores[candidates], RELATED_TOP_N - 1)[:RELATED_TOP_N]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        result = [(int(candidate), round(float(scores[candidate]), 4)) for candidate in candidates]
+        self.floors[row] = result[-1][1] if len(result) == RELATED_TOP_N else RELATED_MIN_SCORE
+        return result
+
+
+_index: Optional[_Index] = None
+_executor: Optional[ThreadPoolExecutor] = None
+_lock = threading.Lock()
+_stats = {
+    "full_builds": 0,
+    "last_build_at": None,
+    "last_build_seconds": None,
+    "refreshes": 0,
+    "lists_refreshed": 0,
+    "refresh_errors": 0,
+    "pending": 0,
+}
+
+
+def get_related_executor() -> ThreadPoolExecutor:
+    """Return the index maintenance thread, creating it on first use"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="related-content")
+    return _executor
+
+
+def shutdown_related_executor():
+    """Drop queued refreshes (called on application shutdown); a running one finishes"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _list_rows(index: _Index, row: int, neighbors: List[Tuple[int, float]], now: datetime) -> List[dict]:
+    source_type, source_id = index.keys[row]
+    return [
+        {
+            "source_type": source_type,
+            "source_id": source_id,
+            "rank": rank,
+            "target_type": index.keys[target][0],
+            "target_id": index.keys[target][1],
+            "score": score,
+            "computed_at": now,
+        }
+        for rank, (target, score) in enumerate(neighbors, start=1)
+    ]
+
+
+def _insert(db: Session, rows: List[dict]):
+    for start in range(0, len(rows), INSERT_CHUNK):
+        db.execute(insert(RelatedContent), rows[start:start + INSERT_CHUNK])
+
+
+def rebuild_related_content(db: Optional[Session] = None) -> dict:
+    """Fit the index on every item and rewrite all related lists"""
+    global _index
+    started = time.perf_counter()
+    own_session = db is None
+    db = db or SessionLocal()
+    try:
+        index = _Index(_load_items(db))
+        now = datetime.utcnow()
+        rows = []
+        for batch, scores in index.similarities(list(range(len(index)))):
+            for offset, row in enumerate(batch):
+                rows.extend(_list_rows(index, row, index.neighbors(row, scores[offset]), now))
+        db.execute(delete(RelatedContent))
+        _insert(db, rows)
+        db.commit()
+    finally:
+        if own_session:
+            db.close()
+
+    elapsed = round(time.perf_counter() - started, 3)
+    with _lock:
+        _index = index
+        _stats.update(full_builds=_stats["full_builds"] + 1, last_build_at=now, last_build_seconds=elapsed)
+    logger.info(f"Related content rebuilt: {len(index)} items, {len(rows)} links in {elapsed}s")
+    return {"items": len(index), "terms": len(index.vocabulary), "links": len(rows), "seconds": elapsed}
+
+
+def _rebuild():
+    """Worker body for a full rebuild"""
+    try:
+        rebuild_related_content()
+    except Exception as e:
+        logger.error(f"Related content rebuild failed: {e}")
+        with _lock:
+            _stats["refresh_errors"] += 1
+    finally:
+        with _lock:
+            _stats["pending"] -= 1
+
+
+def _refresh(changed: Set[Key], deleted: Set[Key]):
+    """Worker body: re-index changed items and rewrite the lists they affect"""
+    import numpy as np
+
+    if _index is None or len(_index.rows) > REFIT_GROWTH * max(_index.fitted_items, 1):
+        # No fit in this process yet, or the vocabulary was fitted on a much smaller corpus
+        _rebuild()
+        return
+
+    index = _index
+    db = SessionLocal()
+    try:
+        current = dict(_load_items(db, changed)) if changed else {}
+        # Unpublished items drop out like deleted ones
+        removed = deleted | (changed - current.keys())
+        for key in removed:
+            index.remove(key)
+        changed_rows = [index.upsert(key, features) for key, features in current.items()]
+
+        # Lists that contain a changed or removed item must be recomputed
+        touched = current.keys() | removed
+        affected = {
+            (source_type, source_id)
+            for source_type, source_id in db.query(RelatedContent.source_type, RelatedContent.source_id)
+            .filter(tuple_(RelatedContent.target_type, RelatedContent.target_id).in_(list(touched)))
+            .distinct()
+        } if touched else set()
+        # ... as must lists a changed item now scores high enough to enter
+        for batch, scores in index.similarities(changed_rows):
+            for offset in range(len(batch)):
+                affected.update(index.keys[row] for row in np.flatnonzero(scores[offset] > index.floors))
+
+        recompute = sorted({index.rows[key] for key in affected | current.keys() if key in index.rows})
+        now = datetime.utcnow()
+        rows = []
+        for batch, scores in index.similarities(recompute):
+            for offset, row in enumerate(batch):
+                rows.extend(_list_rows(index, row, index.neighbors(row, scores[offset]), now))
+
+        sources = [index.keys[row] for row in recompute] + list(removed)
+        if sources:
+            db.execute(delete(RelatedContent).where(
+                tuple_(RelatedContent.source_type, RelatedContent.source_id).in_(sources)
+            ))
+        _insert(db, rows)
+        db.commit()
+        with _lock:
+            _stats["refreshes"] += 1
+            _stats["lists_refreshed"] += len(recompute)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Related content refresh failed: {e}")
+        with _lock:
+            _stats["refresh_errors"] += 1
+    finally:
+        db.close()
+        with _lock:
+            _stats["pending"] -= 1
+
+
+def submit_refresh(changed: Set[Key], deleted: Set[Key]):
+    with _lock:
+        _stats["pending"] += 1
+    get_related_executor().submit(_refresh, changed, deleted)
+
+
+def submit_rebuild():
+    """Queue a full rebuild behind any pending refreshes"""
+    with _lock:
+        _stats["pending"] += 1
+    get_related_executor().submit(_rebuild)
+
+
+def get_related(db: Session, item_type: str, item_id: int, limit: int = RELATED_TOP_N) -> List[dict]:
+    """Stored related items of one item, best first, as RelatedItem dicts"""
+    links = (
+        db.query(RelatedContent)
+        .filter(RelatedContent.source_type == item_type, RelatedContent.source_id == item_id)
+        .order_by(RelatedContent.rank)
+        .limit(limit)
+        .all()
+    )
+    ids_by_type: Dict[str, List[int]] = {}
+    for link in links:
+        ids_by_type.setdefault(link.target_type, []).append(link.target_id)
+
+    found = {}
+    for target_type, ids in ids_by_type.items():
+        item = ITEM_TYPES[target_type]
+        columns = [item.model.id, item.model.title] + [column for column in (item.slug, item.excerpt) if column is not None]
+        query = db.query(item.model).options(load_only(*columns)).filter(item.model.id.in_(ids))
+        if item.published is not None:
+            query = query.filter(item.published)
+        for target in query:
+            found[(target_type, target.id)] = {
+                "type": target_type,
+                "id": target.id,
+                "title": target.title,
+                "slug": getattr(target, item.slug.key) if item.slug is not None else None,
+                "excerpt": getattr(target, item.excerpt.key) if item.excerpt is not None else None,
+            }
+    return [
+        {**found[(link.target_type, link.target_id)], "score": link.score}
+        for link in links if (link.target_type, link.target_id) in found
+    ]
+
+
+def get_related_content_stats() -> dict:
+    with _lock:
+        index = _index
+        return {
+            **_stats,
+            "indexed_items": len(index.rows) if index is not None else None,
+            "terms": len(index.vocabulary) if index is not None else None,
+            "top_n": RELATED_TOP_N,
+        }
+
+
+def _indexed_fields_changed(obj, item: _ItemType) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[field].history.has_changes() for field in item.text_fields)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_content_writes(session, flush_context):
+    # Pending state and attribute history are still intact here, and new rows have ids
+    for objects, state in ((session.new, "new"), (session.dirty, "dirty"), (session.deleted, "deleted")):
+        for obj in objects:
+            item = _TYPE_BY_MODEL.get(type(obj))
+            if item is None or obj.id is None:
+                continue
+            if state == "dirty" and not _indexed_fields_changed(obj, item):
+                continue  # counters such as views and likes
+            changed, removed = session.info.setdefault(_PENDING_KEY, (set(), set()))
+            if state == "deleted":
+                removed.add((item.name, obj.id))
+                changed.discard((item.name, obj.id))
+            else:
+                changed.add((item.name, obj.id))
+
+
+@event.listens_for(Session, "after_commit")
+def _queue_content_refresh(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        changed, removed = pending
+        submit_refresh(changed - removed, removed)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_content_writes(session, previous_transaction):
+    session.info.pop(_PENDING_KEY, None)
@@ -1,5 +1,4 @@
 import os
-import httpx
 from urllib.parse import urlencode
 
 # Google Configuration
@@ -27,6 +26,8 @@ async def get_google_login_url():
     return f"https://accounts.google.com/o/oauth2/v2/auth?{urlencode(params)}"
 
 async def get_google_user_info(code: str):
+    import httpx  # only needed for social sign-in; kept off the startup path
+
     async with httpx.AsyncClient() as client:
         # Exchange code for token
         token_url = "https://oauth2.googleapis.com/token"
@@ -63,6 +64,8 @@ async def get_outlook_login_url():
     return f"https://login.microsoftonline.com/common/oauth2/v2.0/authorize?{urlencode(params)}"
 
 async def get_outlook_user_info(code: str):
+    import httpx  # only needed for social sign-in; kept off the startup path
+
     async with httpx.AsyncClient() as client:
         # Exchange code for token
         token_url = "https://login.microsoftonline.com/common/oauth2/v2.0/token"
@@ -0,0 +1,227 @@
+"""
+Normalized tags for jobs, blogs and discussions.
+
+The API keeps accepting and returning comma-separated `tags` strings; this
+module mirrors them into the tags / entity_tags tables so listings can
+filter on an exact tag with an indexed join (tag name -> tag id ->
+entity_tags primary key -> entity) instead of a substring scan, which also
+matched "archive" for "arch".
+
+Association rows are written from SQLAlchemy session events inside the
+same flush as the entity itself, so they commit or roll back together.
+Per-type tag counts for tag clouds are adjusted by the same writes and
+only count entities that are publicly listed (published jobs and blogs,
+all discussions). Bulk query().update() statements on the tags or status
+columns are not tracked; rerun migrate_tags.py after one.
+"""
+
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import and_, delete, event, func, inspect, literal, select, update
+from sqlalchemy.orm import Query, Session
+
+import schemas
+from database import Blog, Discussion, EntityTag, Job, Tag, TagCount
+
+MAX_TAG_LENGTH = 50
+_CHUNK = 500
+
+# entity type -> (model, status that makes it publicly listed; None if always listed)
+TAGGED_MODELS = {
+    schemas.TaggedEntityType.JOB.value: (Job, schemas.JobStatus.PUBLISHED.value),
+    schemas.TaggedEntityType.BLOG.value: (Blog, schemas.BlogStatus.PUBLISHED.value),
+    schemas.TaggedEntityType.DISCUSSION.value: (Discussion, None),
+}
+_TYPE_BY_MODEL = {model: entity_type for entity_type, (model, _) in TAGGED_MODELS.items()}
+
+_tags = Tag.__table__
+_entity_tags = EntityTag.__table__
+_tag_counts = TagCount.__table__
+
+
+def normalize_tag(tag: str) -> str:
+    return " ".join(tag.lower().split())[:MAX_TAG_LENGTH]
+
+
+def parse_tags(value: Optional[str]) -> List[str]:
+    """Distinct normalized tags of a comma-separated string, in order"""
+    tags = (normalize_tag(tag) for tag in (value or "").split(","))
+    return list(dict.fromkeys(tag for tag in tags if tag))
+
+
+def _is_listed(entity_type: str, status) -> bool:
+    listed_status = TAGGED_MODELS[entity_type][1]
+    return listed_status is None or getattr(status, "value", status) == listed_status
+
+
+def _chunks(items: list) -> Iterable[list]:
+    for start in range(0, len(items), _CHUNK):
+        yield items[start:start + _CHUNK]
+
+
+def _insert_ignore(connection, table, rows: List[dict]):
+    if connection.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    if rows:
+        connection.execute(insert(table).on_conflict_do_nothing(), rows)
+
+
+def _tag_ids(connection, names: List[str]) -> Dict[str, int]:
+    """Tag ids by name, creating missing tags"""
+    ids = {}
+    now = datetime.utcnow()
+    for chunk in _chunks(names):
+        _insert_ignore(connection, _tags, [{"name": name, "created_at": now} for name in chunk])
+        ids.update(connection.execute(select(_tags.c.name, _tags.c.id).where(_tags.c.name.in_(chunk))).all())
+    return ids
+
+
+def _adjust_counts(connection, entity_type: str, deltas: Counter):
+    changed = [tag_id for tag_id, delta in deltas.items() if delta]
+    _insert_ignore(connection, _tag_counts, [{"entity_type": entity_type, "tag_id": tag_id, "count": 0} for tag_id in changed])
+    for delta in set(deltas[tag_id] for tag_id in changed):
+        connection.execute(
+            update(_tag_counts)
+            .where(and_(
+                _tag_counts.c.entity_type == entity_type,
+                _tag_counts.c.tag_id.in_([tag_id for tag_id in changed if deltas[tag_id] == delta]),
+            ))
+            .values(count=_tag_counts.c.count + delta)
+        )
+
+
+def retag(connection, entity_type: str, entity_id: int, names: List[str], listed: bool, was_listed: bool):
+    """Make an entity's association rows match names and move the tag counts accordingly"""
+    old_ids = set(connection.execute(
+        select(_entity_tags.c.tag_id)
+        .where(and_(_entity_tags.c.entity_type == entity_type, _entity_tags.c.entity_id == entity_id))
+    ).scalars())
+    new_ids = set(_tag_ids(connection, names).values())
+
+    if old_ids - new_ids:
+        connection.execute(delete(_entity_tags).where(and_(
+            _entity_tags.c.entity_type == entity_type,
+            _entity_tags.c.entity_id == entity_id,
+            _entity_tags.c.tag_id.in_(old_ids - new_ids),
+        )))
+    if new_ids - old_ids:
+        connection.execute(_entity_tags.insert(), [
+            {"tag_id": tag_id, "entity_type": entity_type, "entity_id": entity_id} for tag_id in new_ids - old_ids
+        ])
+
+    deltas = Counter()
+    if was_listed:
+        deltas.subtract(old_ids)
+    if listed:
+        deltas.update(new_ids)
+    _adjust_counts(connection, entity_type, deltas)
+
+
+def filter_by_tag(query: Query, entity_type: str, tag: str) -> Query:
+    """Restrict an entity query to rows carrying exactly this tag"""
+    model = TAGGED_MODELS[entity_type][0]
+    return (
+        query.join(EntityTag, and_(EntityTag.entity_type == entity_type, EntityTag.entity_id == model.id))
+        .join(Tag, Tag.id == EntityTag.tag_id)
+        .filter(Tag.name == normalize_tag(tag))
+    )
+
+
+def get_tag_cloud(db: Session, entity_type: Optional[str] = None, limit: int = 50) -> List[dict]:
+    """Most used tags with the number of listed entities carrying each"""
+    if entity_type:
+        rows = (
+            db.query(Tag.name, TagCount.count)
+            .join(TagCount, TagCount.tag_id == Tag.id)
+            .filter(TagCount.entity_type == entity_type, TagCount.count > 0)
+            .order_by(TagCount.count.desc(), Tag.name)
+        )
+    else:
+        total = func.sum(TagCount.count).label("count")
+        rows = (
+            db.query(Tag.name, total)
+            .join(TagCount, TagCount.tag_id == Tag.id)
+            .group_by(Tag.id, Tag.name)
+            .having(total > 0)
+            .order_by(total.desc(), Tag.name)
+        )
+    return [{"name": name, "count": count} for name, count in rows.limit(limit)]
+
+
+def backfill_tags(db: Session) -> Dict[str, int]:
+    """Rebuild all association rows and counts from the tags strings; returns tagged entities per type"""
+    connection = db.connection()
+    connection.execute(delete(_entity_tags))
+    connection.execute(delete(_tag_counts))
+
+    tagged = {}
+    for entity_type, (model, listed_status) in TAGGED_MODELS.items():
+        rows = [(entity_id, parse_tags(tags)) for entity_id, tags in db.query(model.id, model.tags).filter(model.tags.isnot(None))]
+        rows = [(entity_id, names) for entity_id, names in rows if names]
+        ids = _tag_ids(connection, list(dict.fromkeys(name for _, names in rows for name in names)))
+        associations = [
+            {"tag_id": ids[name], "entity_type": entity_type, "entity_id": entity_id}
+            for entity_id, names in rows for name in names
+        ]
+        for chunk in _chunks(associations):
+            connection.execute(_entity_tags.insert(), chunk)
+
+        counted = (
+            select(literal(entity_type), _entity_tags.c.tag_id, func.count())
+            .select_from(_entity_tags.join(model.__table__, model.id == _entity_tags.c.entity_id))
+            .where(_entity_tags.c.entity_type == entity_type)
+            .group_by(_entity_tags.c.tag_id)
+        )
+        if listed_status is not None:
+            counted = counted.where(model.status == listed_status)
+        connection.execute(_tag_counts.insert().from_select(["entity_type", "tag_id", "count"], counted))
+        tagged[entity_type] = len(rows)
+    db.commit()
+    return tagged
+
+
+def _tagging_changed(obj) -> bool:
+    attrs = inspect(obj).attrs
+    return attrs.tags.history.has_changes() or ("status" in attrs and attrs.status.history.has_changes())
+
+
+def _stored_status(connection, obj):
+    """Status as currently stored (the in-memory history lacks it when the attribute was expired)"""
+    if not hasattr(type(obj), "status"):
+        return None
+    table = type(obj).__table__
+    return connection.execute(select(table.c.status).where(table.c.id == obj.id)).scalar()
+
+
+@event.listens_for(Session, "before_flush")
+def _tag_changed_and_deleted(session, flush_context, instances):
+    # Existing rows still hold their previous status here
+    for obj in list(session.dirty) + list(session.deleted):
+        entity_type = _TYPE_BY_MODEL.get(type(obj))
+        if entity_type is None:
+            continue
+        deleted = obj in session.deleted
+        if not deleted and not _tagging_changed(obj):
+            continue  # counters and other columns
+        connection = session.connection()
+        was_listed = _is_listed(entity_type, _stored_status(connection, obj))
+        if deleted:
+            retag(connection, entity_type, obj.id, [], False, was_listed)
+        else:
+            listed = _is_listed(entity_type, getattr(obj, "status", None))
+            retag(connection, entity_type, obj.id, parse_tags(obj.tags), listed, was_listed)
+
+
+@event.listens_for(Session, "after_flush")
+def _tag_created(session, flush_context):
+    # New rows only have ids once flushed
+    for obj in session.new:
+        entity_type = _TYPE_BY_MODEL.get(type(obj))
+        if entity_type is not None and obj.id is not None:
+            listed = _is_listed(entity_type, getattr(obj, "status", None))
+            retag(session.connection(), entity_type, obj.id, parse_tags(obj.tags), listed, False)
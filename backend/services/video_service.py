@@ -0,0 +1,498 @@
+"""
+Background processing for uploaded lesson videos.
+
+Uploaded lesson videos are transcoded by a local ffmpeg binary into an
+adaptive-bitrate ladder (several H.264/AAC renditions of MPEG-TS segments,
+one media playlist each and a master playlist). The ladder is written under
+uploads/hls/<source sha256>/, so identical uploads share one ladder and every
+file under it can be served as immutable, and is recorded on the lesson.
+
+Jobs run in a small thread pool (each worker drives one ffmpeg process, which
+is itself multi-threaded) and report progress parsed from ffmpeg's
+-progress output; job state is kept in memory for the admin API.
+
+Every new lesson video is also probed (ffprobe, falling back to ffmpeg's
+input banner) in a separate pool so metadata doesn't wait behind long
+transcodes; duration, resolution, bitrate and codec are stored on the lesson
+and the course's total video duration is re-aggregated.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import subprocess
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+FFMPEG_BINARY = os.getenv("FFMPEG_BINARY", "ffmpeg")
+FFPROBE_BINARY = os.getenv("FFPROBE_BINARY", "ffprobe")
+PROBE_WORKERS = int(os.getenv("VIDEO_PROBE_WORKERS", "2"))
+PROBE_TIMEOUT = int(os.getenv("VIDEO_PROBE_TIMEOUT", "60"))
+# Presigned URL lifetime used when probing S3-hosted videos
+PROBE_URL_EXPIRATION = 600
+HLS_WORKERS = int(os.getenv("HLS_WORKERS", "1"))
+HLS_SEGMENT_SECONDS = int(os.getenv("HLS_SEGMENT_SECONDS", "6"))
+HLS_PRESET = os.getenv("HLS_PRESET", "veryfast")
+# Jobs still running after this long are killed
+HLS_JOB_TIMEOUT = int(os.getenv("HLS_JOB_TIMEOUT", "7200"))
+MAX_TRACKED_JOBS = 200
+
+# (height, video kbps, audio kbps); renditions taller than the source are skipped
+HLS_LADDER = (
+    (1080, 5000, 128),
+    (720, 2800, 128),
+    (480, 1400, 96),
+    (360, 800, 96),
+    (240, 400, 64),
+)
+
+HLS_DIR = Path("uploads") / "hls"
+HLS_URL_PREFIX = "/uploads/hls/"
+MASTER_PLAYLIST = "master.m3u8"
+
+# Lesson hls_status values
+HLS_STATUS_QUEUED = "queued"
+HLS_STATUS_PROCESSING = "processing"
+HLS_STATUS_READY = "ready"
+HLS_STATUS_FAILED = "failed"
+
+_DURATION_RE = re.compile(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
+_BITRATE_RE = re.compile(r"Duration: .*?bitrate: (\d+) kb/s")
+_VIDEO_STREAM_RE = re.compile(r"Stream #.*?Video: (\w+).*?, (\d{2,5})x(\d{2,5})")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_probe_executor: Optional[ThreadPoolExecutor] = None
+_jobs: "OrderedDict[str, dict]" = OrderedDict()
+_processes: Dict[str, subprocess.Popen] = {}
+_lock = threading.Lock()
+_probes_pending = 0
+
+
+def get_ffmpeg_path() -> Optional[str]:
+    """Resolve the configured ffmpeg binary, or None if it isn't installed"""
+    return shutil.which(FFMPEG_BINARY)
+
+
+def get_hls_executor() -> ThreadPoolExecutor:
+    """Return the shared transcoding pool, creating it on first use"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=HLS_WORKERS, thread_name_prefix="hls")
+    return _executor
+
+
+def get_probe_executor() -> ThreadPoolExecutor:
+    """Return the shared metadata probe pool, creating it on first use"""
+    global _probe_executor
+    if _probe_executor is None:
+        _probe_executor = ThreadPoolExecutor(max_workers=PROBE_WORKERS, thread_name_prefix="video-probe")
+    return _probe_executor
+
+
+def shutdown_hls_executor():
+    """Cancel queued jobs and stop running ffmpeg processes (called on application shutdown)"""
+    global _executor, _probe_executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+    if _probe_executor is not None:
+        _probe_executor.shutdown(wait=False, cancel_futures=True)
+        _probe_executor = None
+    with _lock:
+        processes = list(_processes.values())
+    for process in processes:
+        process.kill()
+
+
+def _source_digest(source_path: Path) -> str:
+    """Content hash of the source; content-addressed blobs are named by it already"""
+    if re.fullmatch(r"[0-9a-f]{64}", source_path.stem):
+        return source_path.stem
+    hasher = hashlib.sha256()
+    with open(source_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def _ffprobe(ffprobe: str, source: str) -> dict:
+    result = subprocess.run(
+        [ffprobe, "-v", "error", "-print_format", "json", "-show_format", "-show_streams", source],
+        capture_output=True, text=True, timeout=PROBE_TIMEOUT,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe exited with {result.returncode}: {result.stderr.strip()[-500:]}")
+    info = json.loads(result.stdout or "{}")
+    streams = info.get("streams", [])
+    video = next((st for st in streams if st.get("codec_type") == "video"), None)
+    if not video:
+        raise ValueError("No video stream found")
+    fmt = info.get("format", {})
+    duration = fmt.get("duration") or video.get("duration")
+    bit_rate = fmt.get("bit_rate") or video.get("bit_rate")
+    return {
+        "duration": float(duration) if duration else None,
+        "width": int(video["width"]),
+        "height": int(video["height"]),
+        "bitrate": int(bit_rate) // 1000 if bit_rate else None,
+        "codec": video.get("codec_name"),
+        "has_audio": any(st.get("codec_type") == "audio" for st in streams),
+    }
+
+
+def _ffmpeg_banner_probe(ffmpeg: str, source: str) -> dict:
+    # "ffmpeg -i" without an output prints the input description and exits non-zero
+    result = subprocess.run(
+        [ffmpeg, "-hide_banner", "-i", source],
+        capture_output=True, text=True, timeout=PROBE_TIMEOUT,
+    )
+    banner = result.stderr
+    duration = None
+    match = _DURATION_RE.search(banner)
+    if match:
+        hours, minutes, seconds = match.groups()
+        duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    video = _VIDEO_STREAM_RE.search(banner)
+    if not video:
+        raise ValueError("No video stream found")
+    bitrate = _BITRATE_RE.search(banner)
+    return {
+        "duration": duration,
+        "width": int(video.group(2)),
+        "height": int(video.group(3)),
+        "bitrate": int(bitrate.group(1)) if bitrate else None,
+        "codec": video.group(1),
+        "has_audio": "Audio:" in banner,
+    }
+
+
+def probe_video(source: str) -> dict:
+    """Duration (s), frame size, overall bitrate (kbps), video codec and audio presence of a file or URL"""
+    ffprobe = shutil.which(FFPROBE_BINARY)
+    if ffprobe:
+        return _ffprobe(ffprobe, source)
+    ffmpeg = get_ffmpeg_path()
+    if not ffmpeg:
+        raise RuntimeError(f"Neither '{FFPROBE_BINARY}' nor '{FFMPEG_BINARY}' is installed")
+    return _ffmpeg_banner_probe(ffmpeg, source)
+
+
+def plan_ladder(width: int, height: int) -> List[dict]:
+    """Pick the renditions for a source; it is never upscaled"""
+    rungs = [rung for rung in HLS_LADDER if rung[0] <= height]
+    if not rungs:
+        # Tiny source: a single rendition at its own (even) height
+        rungs = [(height - height % 2, HLS_LADDER[-1][1], HLS_LADDER[-1][2])]
+    return [
+        {
+            "name": f"{rung_height}p",
+            "height": rung_height,
+            # Matches scale=-2:<height>, which keeps the aspect ratio with an even width
+            "width": int(round(width * rung_height / height / 2)) * 2,
+            "video_bitrate": video_kbps,
+            "audio_bitrate": audio_kbps,
+        }
+        for rung_height, video_kbps, audio_kbps in rungs
+    ]
+
+
+def build_ffmpeg_command(ffmpeg: str, source_path: str, output_dir: Path, renditions: List[dict], has_audio: bool) -> List[str]:
+    """One ffmpeg invocation that decodes once and encodes every rendition"""
+    count = len(renditions)
+    splits = "".join(f"[v{i}]" for i in range(count))
+    filters = [f"[0:v]split={count}{splits}"]
+    filters += [f"[v{i}]scale=-2:{r['height']}[v{i}out]" for i, r in enumerate(renditions)]
+
+    command = [
+        ffmpeg, "-hide_banner", "-nostats", "-loglevel", "error", "-y",
+        "-i", source_path,
+        "-filter_complex", ";".join(filters),
+    ]
+    stream_map = []
+    for i, rendition in enumerate(renditions):
+        command += [
+            "-map", f"[v{i}out]",
+            f"-c:v:{i}", "libx264",
+            f"-b:v:{i}", f"{rendition['video_bitrate']}k",
+            f"-maxrate:v:{i}", f"{int(rendition['video_bitrate'] * 1.07)}k",
+            f"-bufsize:v:{i}", f"{rendition['video_bitrate'] * 2}k",
+        ]
+        entry = f"v:{i}"
+        if has_audio:
+            command += ["-map", "a:0", f"-c:a:{i}", "aac", f"-b:a:{i}", f"{rendition['audio_bitrate']}k", "-ac", "2"]
+            entry += f",a:{i}"
+        stream_map.append(f"{entry},name:{rendition['name']}")
+
+    command += [
+        "-preset", HLS_PRESET,
+        "-pix_fmt", "yuv420p",
+        # Keyframes on segment boundaries so every rendition switches cleanly
+        "-force_key_frames", f"expr:gte(t,n_forced*{HLS_SEGMENT_SECONDS})",
+        "-sc_threshold", "0",
+        "-f", "hls",
+        "-hls_time", str(HLS_SEGMENT_SECONDS),
+        "-hls_playlist_type", "vod",
+        "-hls_flags", "independent_segments",
+        "-hls_segment_filename", str(output_dir / "%v" / "segment_%05d.ts"),
+        "-master_pl_name", MASTER_PLAYLIST,
+        "-var_stream_map", " ".join(stream_map),
+        "-progress", "pipe:1",
+        str(output_dir / "%v" / "index.m3u8"),
+    ]
+    return command
+
+
+def _update_job(job_id: str, **values):
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is not None:
+            job.update(values)
+
+
+def _set_lesson_hls(lesson_id: int, video_url: str, **values) -> bool:
+    """Write HLS columns on a lesson unless its video was replaced meanwhile"""
+    from database import SessionLocal, CourseLesson
+
+    db = SessionLocal()
+    try:
+        lesson = db.query(CourseLesson).filter(CourseLesson.id == lesson_id).first()
+        if not lesson or lesson.video_url != video_url:
+            return False
+        for field, value in values.items():
+            setattr(lesson, field, value)
+        db.commit()
+        return True
+    except Exception as e:
+        logger.error(f"Failed to record HLS state for lesson {lesson_id}: {e}")
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+
+def _run_ffmpeg(job_id: str, command: List[str], duration: Optional[float]):
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    with _lock:
+        _processes[job_id] = process
+    watchdog = threading.Timer(HLS_JOB_TIMEOUT, process.kill)
+    watchdog.start()
+    try:
+        # -progress emits key=value blocks; out_time_us is the encoded position
+        for line in process.stdout:
+            key, _, value = line.strip().partition("=")
+            if key in ("out_time_us", "out_time_ms") and duration and value.isdigit():
+                percent = min(99.0, int(value) / 1_000_000 / duration * 100)
+                _update_job(job_id, progress=round(percent, 1))
+        stderr = process.stderr.read()
+        returncode = process.wait()
+    finally:
+        watchdog.cancel()
+        with _lock:
+            _processes.pop(job_id, None)
+    if returncode != 0:
+        raise RuntimeError(f"ffmpeg exited with {returncode}: {stderr.strip()[-500:]}")
+
+
+def _transcode_lesson(job_id: str, lesson_id: int, video_url: str):
+    """Worker body: package one lesson video and record the ladder on the lesson"""
+    _update_job(job_id, status="running", started_at=datetime.utcnow())
+    _set_lesson_hls(lesson_id, video_url, hls_status=HLS_STATUS_PROCESSING)
+    try:
+        ffmpeg = get_ffmpeg_path()
+        if not ffmpeg:
+            raise RuntimeError(f"ffmpeg binary '{FFMPEG_BINARY}' not found")
+
+        source_path = Path("." + video_url)
+        digest = _source_digest(source_path)
+        output_dir = HLS_DIR / digest
+        manifest_path = output_dir / "renditions.json"
+
+        if manifest_path.exists():
+            # Same content already packaged (shared upload or a re-run)
+            renditions = json.loads(manifest_path.read_text())
+        else:
+            source = probe_video(str(source_path))
+            renditions = plan_ladder(source["width"], source["height"])
+            # Build in a scratch directory so readers never see a partial ladder
+            work_dir = HLS_DIR / f".{digest}.{job_id}"
+            for rendition in renditions:
+                (work_dir / rendition["name"]).mkdir(parents=True, exist_ok=True)
+            try:
+                _run_ffmpeg(
+                    job_id,
+                    build_ffmpeg_command(ffmpeg, str(source_path), work_dir, renditions, source["has_audio"]),
+                    source["duration"],
+                )
+                for rendition in renditions:
+                    rendition["playlist_url"] = f"{HLS_URL_PREFIX}{digest}/{rendition['name']}/index.m3u8"
+                (work_dir / "renditions.json").write_text(json.dumps(renditions))
+                try:
+                    os.replace(work_dir, output_dir)
+                except OSError:
+                    # A concurrent job for the same content finished first
+                    if not manifest_path.exists():
+                        raise
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+        master_url = f"{HLS_URL_PREFIX}{digest}/{MASTER_PLAYLIST}"
+        _set_lesson_hls(
+            lesson_id, video_url,
+            hls_status=HLS_STATUS_READY,
+            hls_playlist_url=master_url,
+            hls_renditions=json.dumps(renditions),
+        )
+        _update_job(
+            job_id, status="completed", progress=100.0, playlist_url=master_url,
+            renditions=[r["name"] for r in renditions], finished_at=datetime.utcnow(),
+        )
+        logger.info(f"Packaged lesson {lesson_id} as HLS ({len(renditions)} renditions)")
+    except Exception as e:
+        logger.error(f"HLS packaging failed for lesson {lesson_id}: {e}")
+        _set_lesson_hls(lesson_id, video_url, hls_status=HLS_STATUS_FAILED)
+        _update_job(job_id, status="failed", error=str(e), finished_at=datetime.utcnow())
+
+
+def submit_hls_job(lesson_id: int, video_url: str) -> Optional[dict]:
+    """Queue HLS packaging for a lesson's local video; returns the job or None if not applicable"""
+    if not video_url or not video_url.startswith("/uploads/"):
+        return None  # remote (S3) videos are streamed as uploaded
+
+    job = {
+        "id": uuid.uuid4().hex,
+        "lesson_id": lesson_id,
+        "video_url": video_url,
+        "status": "queued",
+        "progress": 0.0,
+        "playlist_url": None,
+        "renditions": [],
+        "error": None,
+        "created_at": datetime.utcnow(),
+        "started_at": None,
+        "finished_at": None,
+    }
+    with _lock:
+        _jobs[job["id"]] = job
+        # Forget the oldest finished jobs once the registry is full
+        for job_id in [j for j, v in _jobs.items() if v["status"] in ("completed", "failed")]:
+            if len(_jobs) <= MAX_TRACKED_JOBS:
+                break
+            del _jobs[job_id]
+
+    _set_lesson_hls(lesson_id, video_url, hls_status=HLS_STATUS_QUEUED)
+    get_hls_executor().submit(_transcode_lesson, job["id"], lesson_id, video_url)
+    return dict(job)
+
+
+def get_hls_job(job_id: str) -> Optional[dict]:
+    with _lock:
+        job = _jobs.get(job_id)
+        return dict(job) if job else None
+
+
+def list_hls_jobs(lesson_id: Optional[int] = None) -> List[dict]:
+    """Tracked jobs, newest first"""
+    with _lock:
+        jobs = [dict(job) for job in reversed(_jobs.values())]
+    if lesson_id is not None:
+        jobs = [job for job in jobs if job["lesson_id"] == lesson_id]
+    return jobs
+
+
+def _probe_lesson(lesson_id: int, video_url: str):
+    """Worker body: probe a lesson video and store its metadata"""
+    import crud
+    from database import SessionLocal, CourseLesson
+
+    try:
+        if video_url.startswith("/uploads/"):
+            source = "." + video_url
+        else:
+            from aws_s3 import s3_manager
+            source = s3_manager.get_cached_presigned_url(video_url, expiration=PROBE_URL_EXPIRATION)
+            if not source:
+                raise RuntimeError("Could not presign video URL")
+        metadata = probe_video(source)
+    except Exception as e:
+        logger.error(f"Video probe failed for lesson {lesson_id}: {e}")
+        return
+
+    db = SessionLocal()
+    try:
+        lesson = db.query(CourseLesson).filter(CourseLesson.id == lesson_id).first()
+        # Skip if the lesson is gone or its video was replaced meanwhile
+        if not lesson or lesson.video_url != video_url:
+            return
+        if metadata["duration"] is not None:
+            lesson.video_duration = int(round(metadata["duration"]))
+        lesson.video_width = metadata["width"]
+        lesson.video_height = metadata["height"]
+        lesson.video_bitrate = metadata["bitrate"]
+        lesson.video_codec = metadata["codec"]
+        lesson.video_probed_at = datetime.utcnow()
+        db.commit()
+        crud.recompute_course_video_durations(db, course_ids=[lesson.course_id])
+    except Exception as e:
+        logger.error(f"Failed to record video metadata for lesson {lesson_id}: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def submit_video_probe(lesson_id: int, video_url: Optional[str]) -> bool:
+    """Queue metadata extraction for a lesson video off the request path"""
+    if not video_url:
+        return False
+    if not video_url.startswith("/uploads/"):
+        from aws_s3 import s3_manager
+        if not s3_manager.is_s3_url(video_url):
+            return False  # external pages (e.g. YouTube links) aren't media files
+    global _probes_pending
+    with _lock:
+        _probes_pending += 1
+    future = get_probe_executor().submit(_probe_lesson, lesson_id, video_url)
+    future.add_done_callback(_probe_done)
+    return True
+
+
+def _probe_done(future):
+    global _probes_pending
+    with _lock:
+        _probes_pending -= 1
+
+
+def get_video_queue_stats() -> dict:
+    """Packaging jobs and probes waiting or running in this process"""
+    with _lock:
+        statuses = [job["status"] for job in _jobs.values()]
+        return {
+            "hls_queued": statuses.count("queued"),
+            "hls_running": statuses.count("running"),
+            "probes_pending": _probes_pending,
+        }
+
+
+def release_hls_output(db, playlist_url: Optional[str]) -> bool:
+    """Delete a ladder from disk once no lesson points at it any more"""
+    from database import CourseLesson
+
+    if not playlist_url or not playlist_url.startswith(HLS_URL_PREFIX):
+        return False
+    still_used = db.query(CourseLesson.id).filter(CourseLesson.hls_playlist_url == playlist_url).first()
+    if still_used:
+        return False
+    digest = playlist_url[len(HLS_URL_PREFIX):].split("/", 1)[0]
+    if not re.fullmatch(r"[0-9a-f]{64}", digest):
+        return False
+    shutil.rmtree(HLS_DIR / digest, ignore_errors=True)
+    return True
@@ -0,0 +1,67 @@
+"""
+Keep a file-copy SQLite read replica in step with the primary database.
+
+Local stand-in for real replication when testing read/write session routing
+(services/db_routing.py). Each sync copies the primary into the replica file
+through SQLite's online backup API, so the API's replica connections always
+see a consistent snapshot and pick up the new contents on their next query.
+The interval between syncs is the replica's lag; keep READ_YOUR_WRITES_SECONDS
+above it.
+
+Usage:
+    python sync_sqlite_replica.py --replica ./replica.db              # sync once
+    python sync_sqlite_replica.py --replica ./replica.db --interval 2 # keep syncing
+    REPLICA_DATABASE_URLS=sqlite:///./replica.db uvicorn main:app
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+from sqlalchemy.engine import make_url
+
+PAGES_PER_STEP = 1024
+
+
+def sync(primary: Path, replica: Path) -> float:
+    """Copy primary into replica; returns seconds taken"""
+    started = time.perf_counter()
+    source = sqlite3.connect(f"{primary.resolve().as_uri()}?mode=ro", uri=True)
+    target = sqlite3.connect(replica)
+    try:
+        source.backup(target, pages=PAGES_PER_STEP)
+    finally:
+        target.close()
+        source.close()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync a SQLite read replica from the primary")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", "sqlite:///./architecture_academics.db"))
+    parser.add_argument("--replica", required=True, help="replica database file")
+    parser.add_argument("--interval", type=float, default=0, help="seconds between syncs; 0 syncs once")
+    args = parser.parse_args()
+
+    url = make_url(args.database_url)
+    if url.get_backend_name() != "sqlite" or not url.database:
+        print("❌ The primary must be a SQLite database file")
+        return 1
+    primary = Path(url.database)
+    replica = Path(args.replica)
+
+    while True:
+        elapsed = sync(primary, replica)
+        print(f"🔁 {primary} -> {replica} in {elapsed * 1000:.0f} ms")
+        if not args.interval:
+            return 0
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,64 @@
+"""
+Shared fixtures for the backend tests.
+
+DATABASE_URL is pointed at a throwaway SQLite file before anything imports
+database.py, so the tests never touch the development database.
+"""
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+_TEST_DIR = tempfile.mkdtemp(prefix="architecture-academics-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_TEST_DIR}/test.db"
+
+
+@pytest.fixture(scope="session")
+def engine():
+    from database import Base, engine
+
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+    shutil.rmtree(_TEST_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def db(engine):
+    from database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def make_user(db):
+    """Create users with unique emails"""
+    from database import User
+
+    created = []
+
+    def make(**fields):
+        n = len(created)
+        user = User(
+            email=f"user{n}-{os.urandom(4).hex()}@example.com",
+            first_name="Test",
+            last_name=f"User {n}",
+            hashed_password="not-a-real-hash",
+            **fields,
+        )
+        db.add(user)
+        db.commit()
+        created.append(user)
+        return user
+
+    return make
@@ -0,0 +1,96 @@
+"""End-to-end HLS packaging of a generated clip (skipped without ffmpeg)"""
+import re
+import subprocess
+import time
+from pathlib import Path
+
+import pytest
+
+import crud
+import schemas
+from database import Course, CourseLesson
+from services import video_service
+
+pytestmark = pytest.mark.skipif(video_service.get_ffmpeg_path() is None, reason="ffmpeg is not installed")
+
+CLIP_SECONDS = 5
+SEGMENT_SECONDS = 2
+JOB_TIMEOUT = 120
+
+
+def _make_clip(path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    subprocess.run(
+        [
+            video_service.get_ffmpeg_path(), "-hide_banner", "-loglevel", "error", "-y",
+            "-f", "lavfi", "-i", f"testsrc=duration={CLIP_SECONDS}:size=640x360:rate=25",
+            "-f", "lavfi", "-i", f"sine=frequency=440:duration={CLIP_SECONDS}",
+            "-c:v", "libx264", "-pix_fmt", "yuv420p", "-c:a", "aac", "-shortest",
+            str(path),
+        ],
+        check=True, capture_output=True, timeout=60,
+    )
+
+
+def _wait_for_job(job_id: str) -> dict:
+    deadline = time.monotonic() + JOB_TIMEOUT
+    while time.monotonic() < deadline:
+        job = video_service.get_hls_job(job_id)
+        if job["status"] in ("completed", "failed"):
+            return job
+        time.sleep(0.2)
+    pytest.fail(f"HLS job did not finish within {JOB_TIMEOUT}s")
+
+
+def _playlist_entries(playlist: Path):
+    return [line for line in playlist.read_text().splitlines() if line and not line.startswith("#")]
+
+
+def test_ladder_is_written_and_released_with_the_course(db, tmp_path, monkeypatch):
+    # Uploads and ladders are written relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(video_service, "HLS_SEGMENT_SECONDS", SEGMENT_SECONDS)
+    video_url = "/uploads/lessons/testsrc.mp4"
+    _make_clip(tmp_path / video_url.lstrip("/"))
+
+    course = Course(
+        title="HLS", description="Generated clip", level=schemas.CourseLevel.BEGINNER,
+        duration="1 week", price=0,
+    )
+    db.add(course)
+    db.commit()
+    lesson = CourseLesson(title="Clip", course_id=course.id, video_url=video_url)
+    db.add(lesson)
+    db.commit()
+
+    try:
+        job = _wait_for_job(video_service.submit_hls_job(lesson.id, video_url)["id"])
+    finally:
+        video_service.shutdown_hls_executor()
+    assert job["status"] == "completed", job["error"]
+
+    db.refresh(lesson)
+    assert lesson.hls_status == video_service.HLS_STATUS_READY
+    assert lesson.hls_playlist_url == job["playlist_url"]
+    master = tmp_path / lesson.hls_playlist_url.lstrip("/")
+    ladder_dir = master.parent
+
+    # A 360p source is never upscaled: 360p and 240p only
+    expected = [r["name"] for r in video_service.plan_ladder(640, 360)]
+    assert expected == ["360p", "240p"]
+    variant_playlists = _playlist_entries(master)
+    assert variant_playlists == [f"{name}/index.m3u8" for name in expected]
+
+    for entry in variant_playlists:
+        playlist = ladder_dir / entry
+        text = playlist.read_text()
+        assert "#EXT-X-ENDLIST" in text
+        target = int(re.search(r"#EXT-X-TARGETDURATION:(\d+)", text).group(1))
+        assert target <= SEGMENT_SECONDS + 1
+        segments = _playlist_entries(playlist)
+        assert len(segments) >= CLIP_SECONDS // SEGMENT_SECONDS
+        for segment in segments:
+            assert (playlist.parent / segment).stat().st_size > 0
+
+    assert crud.delete_course(db, course.id)
+    assert not ladder_dir.exists()
@@ -0,0 +1,76 @@
+"""Deleting an entity releases its image blobs"""
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import UploadFile
+
+import crud
+import schemas
+from database import Blog, Course, Event, StoredFile
+from utils.file_utils import save_uploaded_file
+
+
+def _upload(db, content: bytes, filename: str) -> str:
+    return save_uploaded_file(db, UploadFile(file=io.BytesIO(content), filename=filename))
+
+
+def _make_blog(db, author, image_url, variants):
+    blog = Blog(
+        title="Images", slug=f"images-{author.id}", content="...", author_id=author.id,
+        category=schemas.BlogCategory.ARCHITECTURE_NEWS,
+        featured_image=image_url, featured_image_variants=variants,
+    )
+    db.add(blog)
+    db.commit()
+    return lambda: crud.delete_blog(db, blog.id)
+
+
+def _make_event(db, author, image_url, variants):
+    event = Event(
+        title="Images", description="...", date=datetime.utcnow() + timedelta(days=7), duration=2,
+        image_url=image_url, image_variants=variants,
+    )
+    db.add(event)
+    db.commit()
+    return lambda: crud.delete_event(db, event.id)
+
+
+def _make_course(db, author, image_url, variants):
+    course = Course(
+        title="Images", description="...", level=schemas.CourseLevel.BEGINNER, duration="1 week", price=0,
+        image_url=image_url, image_variants=variants,
+    )
+    db.add(course)
+    db.commit()
+    return lambda: crud.delete_course(db, course.id)
+
+
+def _make_user(db, author, image_url, variants):
+    author.profile_image_url = image_url
+    author.profile_image_variants = variants
+    db.commit()
+    return lambda: crud.delete_admin_user(db, author.id)
+
+
+@pytest.mark.parametrize("make", [_make_blog, _make_event, _make_course, _make_user])
+def test_delete_releases_image_and_variants(db, make_user, tmp_path, monkeypatch, make):
+    # The blob store lives under the working directory
+    monkeypatch.chdir(tmp_path)
+    primary = _upload(db, b"large jpeg " + make.__name__.encode(), "w1280.jpg")
+    small = _upload(db, b"small webp " + make.__name__.encode(), "w64.webp")
+    shared = _upload(db, b"shared " + make.__name__.encode(), "other.jpg")
+    _upload(db, b"shared " + make.__name__.encode(), "other.jpg")  # A second owner keeps this one alive
+    variants = json.dumps([
+        {"url": url, "width": 64, "height": 64, "format": "jpeg"} for url in (primary, small, shared)
+    ])
+
+    delete = make(db, make_user(), primary, variants)
+    assert delete()
+
+    for url in (primary, small):
+        assert not (tmp_path / url.lstrip("/")).exists()
+        assert db.query(StoredFile).filter(StoredFile.url == url).count() == 0
+    assert (tmp_path / shared.lstrip("/")).exists()
+    assert db.query(StoredFile.ref_count).filter(StoredFile.url == shared).scalar() == 1
@@ -0,0 +1,20 @@
+"""Startup import time, measured with -X importtime against the recorded baseline"""
+import pytest
+
+import check_import_time
+
+
+@pytest.fixture(scope="module")
+def timings():
+    return check_import_time.measure_best("main", runs=3)
+
+
+def test_main_does_not_import_deferred_modules(timings):
+    assert "main" in timings
+    assert check_import_time.deferred_imports(timings) == []
+
+
+def test_main_import_time_within_baseline(timings):
+    baseline = check_import_time.load_baseline("main")
+    assert baseline is not None, "record one with: python check_import_time.py --record"
+    assert check_import_time.regression(timings, "main", baseline) is None
@@ -0,0 +1,66 @@
+"""Concurrent like toggles must keep likes_count equal to the like rows"""
+import threading
+from collections import Counter
+
+from sqlalchemy import func
+
+import crud
+import schemas
+from database import Blog, BlogLike, SessionLocal
+
+THREADS = 20
+TOGGLES_PER_THREAD = 3
+USERS = 3
+
+
+def test_concurrent_toggles_keep_count_and_rows_in_step(db, make_user):
+    author = make_user()
+    users = [make_user() for _ in range(USERS)]
+    blog = Blog(
+        title="Concurrency", slug=f"concurrency-{author.id}", content="...",
+        category=schemas.BlogCategory.ARCHITECTURE_NEWS, author_id=author.id,
+    )
+    db.add(blog)
+    db.commit()
+
+    barrier = threading.Barrier(THREADS)
+    errors = []
+
+    def hammer(user_id):
+        session = SessionLocal()
+        try:
+            barrier.wait()
+            for _ in range(TOGGLES_PER_THREAD):
+                if crud.toggle_blog_like(session, blog.id, user_id) is None:
+                    errors.append(f"toggle for user {user_id} found no blog")
+        except Exception as e:
+            errors.append(repr(e))
+        finally:
+            session.close()
+
+    assignments = [users[i % USERS].id for i in range(THREADS)]
+    threads = [threading.Thread(target=hammer, args=(user_id,)) for user_id in assignments]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+
+    db.expire_all()
+    rows = db.query(BlogLike.user_id).filter(BlogLike.blog_id == blog.id).all()
+    likes_count = db.query(Blog.likes_count).filter(Blog.id == blog.id).scalar()
+    assert likes_count == len(rows)
+
+    duplicates = (
+        db.query(BlogLike.blog_id, BlogLike.user_id)
+        .group_by(BlogLike.blog_id, BlogLike.user_id)
+        .having(func.count() > 1)
+        .all()
+    )
+    assert duplicates == []
+
+    # Toggles serialize, so a user ends up liking the post iff they toggled an odd number of times
+    toggles = Counter(assignments)
+    expected = {user_id for user_id, n in toggles.items() if n * TOGGLES_PER_THREAD % 2}
+    assert {user_id for (user_id,) in rows} == expected
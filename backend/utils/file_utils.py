@@ -1,35 +1,189 @@
 from fastapi import UploadFile
+from sqlalchemy import update, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
 from pathlib import Path
-import shutil
+from concurrent.futures import ThreadPoolExecutor
+import gzip
+import hashlib
+import os
+import threading
 import uuid
 
-def save_uploaded_file(file: UploadFile, directory: Path) -> str:
-    """Save uploaded file and return the file path"""
-    # Generate unique filename
-    file_extension = file.filename.split(".")[-1] if "." in file.filename else ""
-    unique_filename = f"{uuid.uuid4()}.{file_extension}"
-    file_path = directory / unique_filename
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+# Content-addressed blob store: uploads/blobs/<first two hex chars>/<sha256><ext>
+UPLOAD_DIR = Path("uploads")
+BLOB_DIR = UPLOAD_DIR / "blobs"
+UPLOAD_TMP_DIR = UPLOAD_DIR / ".tmp"
+CHUNK_SIZE = 1024 * 1024
+
+# Materials worth serving precompressed; .br/.gz siblings are written next to the blob
+COMPRESSIBLE_EXTENSIONS = {
+    ".txt", ".csv", ".json", ".md", ".html", ".htm", ".xml", ".svg",
+    ".rtf", ".doc", ".xls", ".ppt", ".pdf",
+}
+PRECOMPRESSED_SUFFIXES = (".br", ".gz")
+MIN_PRECOMPRESS_SIZE = 1024
+MIN_PRECOMPRESS_SAVING = 0.1  # Keep a sibling only if it is at least 10% smaller
+
+# Compression runs off the request path, one file at a time
+_precompress_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="precompress")
+
+# Serializes reference changes with the file moves/unlinks they imply, so a
+# blob being garbage-collected can't race a new upload of the same content
+_blob_lock = threading.Lock()
+
+def _add_reference(db: Session, digest: str):
+    """Increment a blob's reference count; returns its URL or None if unknown"""
+    from database import StoredFile
     
-    # Ensure directory exists
-    directory.mkdir(parents=True, exist_ok=True)
+    result = db.execute(
+        update(StoredFile)
+        .where(StoredFile.digest == digest)
+        .values(ref_count=StoredFile.ref_count + 1)
+    )
+    if result.rowcount == 0:
+        return None
+    db.commit()
+    return db.query(StoredFile.url).filter(StoredFile.digest == digest).scalar()
+
+def _write_sibling(blob_path: Path, suffix: str, data: bytes, original_size: int):
+    """Atomically write a compressed sibling if it is worth keeping"""
+    if len(data) > original_size * (1 - MIN_PRECOMPRESS_SAVING):
+        return
+    sibling = blob_path.with_name(blob_path.name + suffix)
+    tmp_path = UPLOAD_TMP_DIR / f"{uuid.uuid4().hex}{suffix}"
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, sibling)
+    # The blob may have been garbage-collected while we were compressing
+    if not blob_path.exists():
+        sibling.unlink(missing_ok=True)
+
+def precompress_file(blob_path: Path):
+    """Write .br/.gz siblings of a stored file for the static file server"""
+    try:
+        data = blob_path.read_bytes()
+        if BROTLI_AVAILABLE:
+            _write_sibling(blob_path, ".br", brotli.compress(data, quality=11), len(data))
+        _write_sibling(blob_path, ".gz", gzip.compress(data, compresslevel=9, mtime=0), len(data))
+    except Exception as e:
+        print(f"Failed to precompress {blob_path}: {e}")
+
+def _store_blob(db: Session, tmp_path: Path, digest: str, extension: str, size: int) -> str:
+    """Move a hashed temporary file into the blob store, or reference the stored copy"""
+    from database import StoredFile
     
-    # Save file
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    with _blob_lock:
+        existing_url = _add_reference(db, digest)
+        if existing_url:
+            return existing_url
+        
+        blob_path = BLOB_DIR / digest[:2] / f"{digest}{extension}"
+        blob_path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp_path, blob_path)
+        url = "/" + blob_path.as_posix()
+        
+        db.add(StoredFile(digest=digest, url=url, size=size, ref_count=1))
+        try:
+            db.commit()
+        except IntegrityError:
+            # Another process stored the same content first
+            db.rollback()
+            existing_url = _add_reference(db, digest)
+            if existing_url and existing_url != url:
+                blob_path.unlink(missing_ok=True)
+            return existing_url or url
     
-    # Return relative path for URL
-    return f"/uploads/{directory.name}/{unique_filename}"
+    if extension in COMPRESSIBLE_EXTENSIONS and size >= MIN_PRECOMPRESS_SIZE:
+        _precompress_executor.submit(precompress_file, blob_path)
+    return url
 
-def delete_uploaded_file(file_path: str) -> bool:
-    """Delete uploaded file"""
+def save_uploaded_file(db: Session, file: UploadFile) -> str:
+    """Store an upload by content hash and return its URL.
+    
+    Identical content is stored once and shared; every call adds a reference
+    that must be released with delete_uploaded_file.
+    """
+    extension = Path(file.filename or "").suffix.lower()
+    UPLOAD_TMP_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = UPLOAD_TMP_DIR / f"{uuid.uuid4().hex}.part"
+    
+    # Hash while streaming to disk so large files are read only once
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp_path, "wb") as buffer:
+            while True:
+                chunk = file.file.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                buffer.write(chunk)
+                size += len(chunk)
+        return _store_blob(db, tmp_path, hasher.hexdigest(), extension, size)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+def store_generated_file(db: Session, file_path: Path) -> str:
+    """Store a file the server wrote under UPLOAD_TMP_DIR (e.g. an image variant).
+    
+    The file is moved into the blob store (or removed if the content is
+    already stored) and, like an upload, holds one reference.
+    """
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        with open(file_path, "rb") as f:
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                size += len(chunk)
+        return _store_blob(db, file_path, hasher.hexdigest(), file_path.suffix.lower(), size)
+    finally:
+        file_path.unlink(missing_ok=True)
+
+def delete_uploaded_file(db: Session, file_path: str) -> bool:
+    """Release a reference to an uploaded file, deleting it with the last one"""
+    from database import StoredFile
+    
+    if not file_path or not file_path.startswith("/uploads/"):
+        return False
+    
     try:
-        if file_path.startswith("/uploads/"):
+        with _blob_lock:
+            result = db.execute(
+                update(StoredFile)
+                .where(StoredFile.url == file_path, StoredFile.ref_count > 0)
+                .values(ref_count=StoredFile.ref_count - 1)
+            )
+            if result.rowcount:
+                collected = db.execute(
+                    delete(StoredFile).where(StoredFile.url == file_path, StoredFile.ref_count <= 0)
+                ).rowcount
+                db.commit()
+                if not collected:
+                    return True  # Still referenced elsewhere
+            
+            elif file_path.startswith(f"/{BLOB_DIR.as_posix()}/"):
+                return False  # Unknown blob file; leave it
+            
+            # Last reference gone, or a legacy per-upload file outside the blob store
             full_path = Path("." + file_path)
+            for suffix in PRECOMPRESSED_SUFFIXES:
+                full_path.with_name(full_path.name + suffix).unlink(missing_ok=True)
             if full_path.exists():
                 full_path.unlink()
                 return True
-    except Exception:
-        pass
+    except Exception as e:
+        db.rollback()
+        print(f"Failed to delete uploaded file {file_path}: {e}")
     return False
 
 def validate_file_type(file: UploadFile, allowed_extensions: set) -> bool:
@@ -75,6 +75,7 @@ export default function CourseLearnPage({ params }: { params: Promise<{ id: stri
   const [materials, setMaterials] = useState<Material[]>([])
   const [enrollmentId, setEnrollmentId] = useState<number | null>(null)
   const [progress, setProgress] = useState<number>(0)
+  const [videoUrls, setVideoUrls] = useState<Record<number, string | null>>({})
   const [currentLesson, setCurrentLesson] = useState<Lesson | null>(null)
   const [currentVideoUrl, setCurrentVideoUrl] = useState<string>("")
   const [expandedSections, setExpandedSections] = useState<boolean>(true)
@@ -149,6 +150,30 @@ export default function CourseLearnPage({ params }: { params: Promise<{ id: stri
     return () => { cancelled = true }
   }, [id])
 
+  // Fetch video URLs for all accessible lessons in one call
+  useEffect(() => {
+    let cancelled = false
+    const loadVideoUrls = async () => {
+      try {
+        const token = localStorage.getItem('access_token')
+        const res = await fetch(`${API_BASE_URL}/api/courses/${id}/lessons/video-urls`, {
+          headers: token ? { 'Authorization': `Bearer ${token}` } : undefined
+        })
+        if (!res.ok) return
+        const data = await res.json()
+        const urls: Record<number, string | null> = {}
+        for (const l of data?.lessons || []) {
+          if (l.has_access) urls[l.lesson_id] = l.video_url || null
+        }
+        if (!cancelled) setVideoUrls(urls)
+      } catch {
+        // Per-lesson lookup below still works
+      }
+    }
+    loadVideoUrls()
+    return () => { cancelled = true }
+  }, [id, isEnrolled])
+
   // Resolve video URL for current lesson
   useEffect(() => {
     let cancelled = false
@@ -159,6 +184,11 @@ export default function CourseLearnPage({ params }: { params: Promise<{ id: stri
         setCurrentVideoUrl("")
         return
       }
+      if (currentLesson.id in videoUrls) {
+        const url = buildAbsoluteUrl(videoUrls[currentLesson.id] || currentLesson.video_url || undefined)
+        if (!cancelled) setCurrentVideoUrl(url)
+        return
+      }
       try {
         // Prefer dynamic video-url endpoint (for presigned or gated)
         const token = localStorage.getItem('access_token')
@@ -181,7 +211,7 @@ export default function CourseLearnPage({ params }: { params: Promise<{ id: stri
     }
     resolveVideo()
     return () => { cancelled = true }
-  }, [currentLesson, id, isEnrolled])
+  }, [currentLesson, id, isEnrolled, videoUrls])
 
   const toggleSection = () => setExpandedSections(s => !s)
 
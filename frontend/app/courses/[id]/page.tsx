@@ -81,14 +81,14 @@ export default function CourseDetail({ params }: { params: Promise<{ id: string
             lessons: response.data.lessons || [],
             materials: response.data.materials || [],
             students: response.data.students || response.data.enrolled_count || 0,
-            rating: response.data.rating || 0,
+            rating: response.data.rating_avg || response.data.rating || 0,
             duration: response.data.duration || 'N/A',
             totalLessons: response.data.totalLessons || (response.data.lessons?.length || 0),
             lastUpdated: response.data.lastUpdated || response.data.updated_at || 'Recently',
             thumbnail: response.data.thumbnail || response.data.image_url || 'https://placehold.co/800x450/png?text=Course+Image',
             isFree: response.data.isFree !== undefined ? response.data.isFree : (!response.data.price || response.data.price === 0),
             freeLessons: response.data.freeLessons || (response.data.lessons?.filter((l: any) => l.is_free).length || 1),
-            reviewCount: response.data.reviewCount || 0
+            reviewCount: response.data.rating_count || response.data.reviewCount || 0
           }
           setCourse(courseData)
         }
@@ -199,7 +199,7 @@ export default function CourseDetail({ params }: { params: Promise<{ id: string
           try {
             const cRes = await api.get(`/api/courses/${courseId}`)
             if (cRes && cRes.data) {
-              setCourse(prev => ({ ...prev, rating: cRes.data.rating || prev.rating, reviewCount: cRes.data.reviewCount || prev.reviewCount }))
+              setCourse(prev => ({ ...prev, rating: cRes.data.rating_avg || prev.rating, reviewCount: cRes.data.rating_count || prev.reviewCount }))
             }
           } catch (err) {
             // ignore
@@ -245,9 +245,23 @@ export default function CoursesPortal() {
     setSearchQuery("");
   };
 
-  const openCourseModal = (course: Course) => {
+  const openCourseModal = async (course: Course) => {
     setSelectedCourse(course);
     setShowModal(true);
+    // The list only carries a truncated description; load the full text and syllabus
+    try {
+      const response = await api.get(`/api/courses/${course.id}`)
+      const detail = response.data
+      if (detail) {
+        setSelectedCourse(current => current && current.id === course.id ? {
+          ...current,
+          description: detail.description || current.description,
+          syllabus: detail.syllabus ? [detail.syllabus] : [],
+        } : current)
+      }
+    } catch (error) {
+      console.error('Error fetching course details:', error)
+    }
   };
 
   const closeCourseModal = () => {
@@ -62,7 +62,7 @@ export default function EventsPortal() {
       const query = searchQuery.toLowerCase()
       filtered = filtered.filter(event => 
         event.title.toLowerCase().includes(query) ||
-        event.description.toLowerCase().includes(query) ||
+        event.short_description?.toLowerCase().includes(query) ||
         event.organizer?.toLowerCase().includes(query) ||
         event.tags?.some(tag => tag.toLowerCase().includes(query))
       )
@@ -100,9 +100,18 @@ export default function EventsPortal() {
   }, [searchQuery, filters, events])
 
   // Handle opening event details
-  const openEventDetails = (event: Event) => {
+  const openEventDetails = async (event: Event) => {
     setSelectedEvent(event)
     setShowDetailModal(true)
+    // The list omits the description, requirements and meeting link; load them for the modal
+    try {
+      const response = await api.get(`/events/${event.id}`)
+      if (response.data) {
+        setSelectedEvent(current => current && current.id === event.id ? { ...current, ...response.data } : current)
+      }
+    } catch (error) {
+      console.error('Error fetching event details:', error)
+    }
   }
 
   // Reset all filters
@@ -118,10 +118,9 @@ export default function NATACoursesPage() {
         course.title,
         course.description,
         course.instructor,
-        ...course.skills,
-        ...(course.syllabus?.map(s => s.module) || [])
+        ...(Array.isArray(course.skills) ? course.skills : [course.skills])
       ].some(text => 
-        text.toLowerCase().includes(searchQuery.toLowerCase())
+        text?.toLowerCase().includes(searchQuery.toLowerCase())
       )
       return matchesCategory && matchesSearch
     })